@@ -0,0 +1,87 @@
+"""Bytes per animation frame: legacy full-figure round trip vs clientside x-axis animation.
+
+Usage: python benchmarks/bench_animation_payload.py [--points 3000] [--frames 300] [--batches-per-second 10]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+from dash._utils import to_json
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import dash_app  # noqa: E402
+
+
+def build_browser_figure(points):
+    """The live-graph figure as the browser holds it once the buffer is full"""
+    fig = dash_app.create_initial_figure(dash_app.DISPLAY_WINDOW).to_plotly_json()
+    t = np.linspace(0, points / 100.0, points)
+    for trace in fig['data']:
+        trace['x'] = t.tolist()
+        trace['y'] = np.random.default_rng(0).normal(0, 1, points).tolist()
+    return fig
+
+
+def start_stream():
+    """Pretend the default device started streaming a minute ago (sets the x-axis origin)"""
+    session = dash_app.sessions.get(dash_app.device_sessions.DEFAULT_DEVICE_ID)
+    session.initial_wall_clock_time = time.time() - 60.0
+
+
+def measure_legacy(fig, frames):
+    """Request (State figure) + response (new figure) size and server time of animate_xaxis_view"""
+    start_stream()
+    up = down = 0
+    server_seconds = 0.0
+    for n in range(1, frames + 1):
+        request = {
+            'output': 'live-graph.figure',
+            'inputs': [{'id': 'animation-interval', 'property': 'n_intervals', 'value': n}],
+            'state': [{'id': 'window-slider', 'property': 'value', 'value': dash_app.DISPLAY_WINDOW},
+                      {'id': 'live-graph', 'property': 'figure', 'value': fig}],
+        }
+        start = time.perf_counter()
+        body = to_json(request)
+        new_fig = dash_app.animate_xaxis_view(n, dash_app.DISPLAY_WINDOW, fig)
+        response = to_json({'multi': True, 'response': {'live-graph': {'figure': new_fig}}})
+        server_seconds += time.perf_counter() - start
+        up += len(body)
+        down += len(response)
+    return up / frames, down / frames, server_seconds / frames
+
+
+def measure_clientside_sync():
+    """Size of the 'stream-clock' field piggybacked on each extendData response"""
+    start_stream()
+    return len(to_json({'stream-clock': {'data': dash_app.get_stream_clock()}}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--points', type=int, default=dash_app.BUFFER_SIZE, help='samples per trace in the figure')
+    parser.add_argument('--frames', type=int, default=300)
+    parser.add_argument('--batches-per-second', type=float, default=10.0, help='HTTP pushes per second from the phone')
+    args = parser.parse_args()
+
+    fps = 1000.0 / dash_app.UPDATE_INTERVAL
+    fig = build_browser_figure(args.points)
+
+    up, down, server_ms = measure_legacy(fig, args.frames)
+    sync_bytes = measure_clientside_sync()
+    sync_per_frame = sync_bytes * args.batches_per_second / fps
+
+    print(f"Figure: 3 traces x {args.points} points, animation at {fps:.1f} FPS")
+    print("Legacy 'figure' mode:")
+    print(f"  upload   {up / 1024:10.1f} KiB/frame")
+    print(f"  download {down / 1024:10.1f} KiB/frame")
+    print(f"  total    {(up + down) * fps / 1024 / 1024:10.2f} MiB/s per tab, {server_ms * 1000:.2f} ms server CPU/frame")
+    print("Clientside mode:")
+    print("  per frame           0 B (Plotly.relayout in the browser)")
+    print(f"  clock sync {sync_bytes:8d} B per extendData batch "
+          f"(~{sync_per_frame:.1f} B/frame at {args.batches_per_second:g} batches/s)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,243 @@
+"""Ingest throughput and end-to-end latency of /sensor with synthetic Sensor Logger pushes.
+
+Modes:
+  ingest  POST batches (paced or as fast as possible) and report requests/s, samples/s,
+          p50/p99 handler latency and RSS growth. --target simple uses simple.py's receive_data.
+  e2e     POST batches at the given rate while a consumer reads the live updates the browser
+          would get (SSE events, or the polling callbacks with --transport polling) and report
+          the time from POST to the extendData payload that first contains the batch.
+
+Requests go through the Flask test client in this process (no sockets), or to a running
+server with --url. Payloads are generated up front from a fixed seed.
+
+Usage: python benchmarks/bench_ingest.py [--mode ingest|e2e] [--target dash|simple] [--devices 1]
+           [--rate 500] [--batch 50] [--duration 10] [--transport sse|polling] [--jitter S] [--url URL]
+           [--json out.json]
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+import urllib.request
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+BASE_TIME_NS = 1_700_000_000_000_000_000
+UNTHROTTLED_SAMPLE_RATE = 500.0 # Hz of the generated timestamps when --rate 0
+
+
+def make_bodies(device_id, n_batches, batch, sample_rate, seed):
+    """JSON bodies in Sensor Logger's HTTP push format, as bytes"""
+    rng = np.random.default_rng(seed)
+    period_ns = int(1e9 / sample_rate)
+    bodies = []
+    for i in range(n_batches):
+        times = BASE_TIME_NS + (np.arange(batch) + i * batch) * period_ns
+        values = rng.normal(0.0, 1.0, (batch, 3)) + (0.0, 0.0, 9.81)
+        payload = [{'name': 'accelerometer', 'time': int(t), 'accuracy': 3,
+                    'values': {'x': float(x), 'y': float(y), 'z': float(z)}}
+                   for t, (x, y, z) in zip(times, values)]
+        bodies.append(json.dumps({'messageId': i, 'sessionId': 'bench', 'deviceId': device_id,
+                                  'payload': payload}).encode())
+    return bodies
+
+
+def rss_bytes():
+    """Resident set size of this process (Linux)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except OSError:
+        return 0
+
+
+def make_poster(args, flask_app):
+    """Return post(device_id, body) -> None for the in-process app or a remote --url"""
+    if args.url:
+        def post(device_id, body):
+            request = urllib.request.Request(args.url, data=body, method='POST',
+                                             headers={'Content-Type': 'application/json', 'X-Device-Id': device_id})
+            with urllib.request.urlopen(request) as response:
+                response.read()
+        return post
+
+    local = threading.local()
+
+    def post(device_id, body):
+        client = getattr(local, 'client', None)
+        if client is None:
+            client = local.client = flask_app.test_client()
+        response = client.post('/sensor', data=body, content_type='application/json',
+                               headers={'X-Device-Id': device_id})
+        if response.status_code != 200:
+            raise RuntimeError(f"/sensor returned {response.status_code}: {response.get_data()[:200]!r}")
+    return post
+
+
+def run_devices(args, post, on_sent=None):
+    """Send every device's batches from its own thread; returns (per-request latencies, wall seconds, requests)"""
+    sample_rate = args.rate or UNTHROTTLED_SAMPLE_RATE
+    n_batches = max(1, int(args.duration * sample_rate / args.batch))
+    devices = [f'bench{j}' for j in range(args.devices)]
+    bodies = {device_id: make_bodies(device_id, n_batches, args.batch, sample_rate, seed=j)
+              for j, device_id in enumerate(devices)}
+    period = args.batch / args.rate if args.rate else 0.0
+    latencies = [[] for _ in devices]
+
+    def send(j, device_id):
+        start = time.perf_counter()
+        for i, body in enumerate(bodies[device_id]):
+            if period:
+                delay = start + i * period - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            t0 = time.perf_counter()
+            post(device_id, body)
+            t1 = time.perf_counter()
+            latencies[j].append(t1 - t0)
+            if on_sent is not None:
+                on_sent(device_id, (i + 1) * args.batch, t0)
+
+    threads = [threading.Thread(target=send, args=(j, device_id)) for j, device_id in enumerate(devices)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return np.concatenate([np.asarray(l) for l in latencies]), time.perf_counter() - start, n_batches * len(devices)
+
+
+def percentiles_ms(values):
+    if len(values) == 0:
+        return {'p50_ms': None, 'p99_ms': None, 'max_ms': None}
+    p50, p99 = np.percentile(values, [50, 99])
+    return {'p50_ms': p50 * 1e3, 'p99_ms': p99 * 1e3, 'max_ms': float(np.max(values)) * 1e3}
+
+
+def bench_ingest(args):
+    if args.target == 'simple':
+        import simple
+        flask_app = simple.app
+        simple.reset_all_buffers()
+    else:
+        import dash_app
+        flask_app = dash_app.app.server
+        dash_app.sessions.clear()
+    post = make_poster(args, flask_app)
+
+    rss_before = rss_bytes()
+    latencies, wall, requests = run_devices(args, post)
+    rss_after = rss_bytes()
+    samples = requests * args.batch
+    return {
+        'mode': 'ingest', 'target': args.target, 'devices': args.devices, 'batch': args.batch,
+        'rate_per_device': args.rate, 'requests': requests, 'samples': samples, 'seconds': wall,
+        'requests_per_s': requests / wall, 'samples_per_s': samples / wall,
+        **percentiles_ms(latencies),
+        'rss_growth_mib': (rss_after - rss_before) / 2**20,
+    }
+
+
+def bench_e2e(args):
+    if args.target != 'dash' or args.url:
+        raise SystemExit("e2e mode measures dash_app in this process (--target dash, no --url)")
+    if not args.rate:
+        raise SystemExit("e2e mode needs a paced --rate")
+    import dash_app
+    dash_app.sessions.clear()
+    if args.jitter is not None: # The jitter buffer dominates e2e latency; 0 isolates the transport
+        dash_app.sessions.reassembly_options = {**(dash_app.sessions.reassembly_options or {}), 'jitter': args.jitter}
+    post = make_poster(args, dash_app.app.server)
+    devices = [f'bench{j}' for j in range(args.devices)]
+
+    # device -> list of (cumulative samples after the batch, POST start); a batch has reached the
+    # browser once an update carries a sequence number >= its cumulative count
+    sent = {device_id: [] for device_id in devices}
+    sent_lock = threading.Lock()
+    delays = []
+    stop = threading.Event()
+
+    def on_sent(device_id, cumulative, t_post):
+        with sent_lock:
+            sent[device_id].append((cumulative, t_post))
+
+    def delivered(seqs, t_update):
+        with sent_lock:
+            for device_id, seq in seqs.items():
+                pending = sent.get(device_id, [])
+                while pending and pending[0][0] <= seq:
+                    delays.append(t_update - pending.pop(0)[1])
+
+    def consume_sse():
+        window = dash_app.DISPLAY_WINDOW
+        width = dash_app.DEFAULT_PLOT_WIDTH
+        events = dash_app.live_stream_events(devices, {}, window / width, dash_app.LIVE_POINTS_PER_PIXEL * width)
+        for event in events:
+            if stop.is_set():
+                break
+            if event.startswith('id: '):
+                delivered(json.loads(event.split('\n', 1)[0][4:]), time.perf_counter())
+
+    def consume_polling():
+        seqs, last_count, arrival = {}, 0, 0
+        while not stop.is_set():
+            result = dash_app.update_data_arrival_trigger(None, last_count, arrival)
+            if result[0] is not dash_app.dash.no_update:
+                arrival, last_count = result
+                extend, seqs, _ = dash_app.extend_data_and_update_yaxis(
+                    arrival, seqs, devices, dash_app.DISPLAY_WINDOW, dash_app.DEFAULT_PLOT_WIDTH)
+                if extend is not dash_app.dash.no_update:
+                    delivered(seqs, time.perf_counter())
+            time.sleep(dash_app.DATA_CHECK_INTERVAL / 1000.0)
+
+    consumer = threading.Thread(target=consume_sse if args.transport == 'sse' else consume_polling, daemon=True)
+    consumer.start()
+    time.sleep(0.1)
+    latencies, wall, requests = run_devices(args, post, on_sent)
+    # Give the jitter buffer time to release the tail, then wake the SSE generator one last time
+    deadline = time.perf_counter() + 3.0
+    while time.perf_counter() < deadline and any(sent.values()):
+        time.sleep(0.05)
+    stop.set()
+    dash_app.sessions.notify_ingest()
+    consumer.join(timeout=2.0)
+
+    delays = np.asarray(delays)
+    return {
+        'mode': 'e2e', 'transport': args.transport, 'devices': args.devices, 'batch': args.batch,
+        'rate_per_device': args.rate, 'requests': requests, 'batches_delivered': len(delays),
+        'reassembly_jitter_s': (dash_app.sessions.reassembly_options or {}).get('jitter'),
+        **{f'post_{key}': value for key, value in percentiles_ms(latencies).items()},
+        **{f'e2e_{key}': value for key, value in percentiles_ms(delays).items()},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--mode', choices=('ingest', 'e2e'), default='ingest')
+    parser.add_argument('--target', choices=('dash', 'simple'), default='dash')
+    parser.add_argument('--devices', type=int, default=1, help='Concurrent devices, one sender thread each')
+    parser.add_argument('--rate', type=float, default=0.0, help='Samples/s per device (0 = as fast as possible)')
+    parser.add_argument('--batch', type=int, default=50, help='Samples per POST')
+    parser.add_argument('--duration', type=float, default=10.0, help='Seconds of sensor time per device')
+    parser.add_argument('--transport', choices=('sse', 'polling'), default='sse', help='e2e: live update path')
+    parser.add_argument('--jitter', type=float, help='e2e: override the reassembly jitter (s) of dash_app')
+    parser.add_argument('--url', help='POST to a running server instead, e.g. http://localhost:8080/sensor')
+    parser.add_argument('--json', help='Also write the results to this file')
+    args = parser.parse_args()
+
+    results = bench_ingest(args) if args.mode == 'ingest' else bench_e2e(args)
+    for key, value in results.items():
+        print(f"{key:>22}: {value:.3f}" if isinstance(value, float) else f"{key:>22}: {value}")
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+    os._exit(0) # Skip waiting for the app's background threads
+
+
+if __name__ == '__main__':
+    main()
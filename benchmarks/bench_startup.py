@@ -0,0 +1,115 @@
+"""Cold start of dash_app: import time, memory and the deferred first page load, checked against a budget.
+
+Every run imports dash_app in a fresh interpreter and reports the import
+wall time, the peak RSS after the import, and the time of the first page
+load (GET / and /_dash-layout through the Flask test client), which now
+builds the layout and its figures. The optional subsystems must stay
+unloaded until they are used: scipy.signal (filters, spectrogram), zmq
+(ZeroMQ receivers) and the shared-memory store. --top lists the modules
+dash_app imports directly by their cumulative import time
+(python -X importtime), the place to look when the budget is exceeded.
+
+Exits with status 1 if the median import time exceeds --budget or a
+deferred module was loaded at import.
+
+Usage: python benchmarks/bench_startup.py [--runs 5] [--warmup 1] [--budget 1.5] [--top 10] [--json out.json]
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+REPO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+# Measured at about 1.0 s on a 1-CPU box, of which dash/flask/plotly take 0.8 s; it was 2.3 s before
+# scipy.signal, zmq and the figures were deferred
+DEFAULT_BUDGET = 1.5 # s, median import time
+DEFERRED_MODULES = ('scipy.signal', 'zmq', 'shared_store')
+RESULT_PREFIX = 'STARTUP '
+
+CHILD = f"""
+import json, os, resource, sys, time
+start = time.perf_counter()
+import dash_app
+imported = time.perf_counter() - start
+rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+loaded = [name for name in {DEFERRED_MODULES!r} if name in sys.modules]
+client = dash_app.server.test_client()
+start = time.perf_counter()
+statuses = [client.get('/').status_code, client.get('/_dash-layout').status_code]
+first_page = time.perf_counter() - start
+print({RESULT_PREFIX!r} + json.dumps({{'import_seconds': imported, 'rss_mb': rss_kb / 1024, 'deferred_loaded': loaded,
+                                      'first_page_seconds': first_page, 'statuses': statuses}}), flush=True)
+os._exit(0) # Skip waiting for the app's background threads
+"""
+
+
+def run_child():
+    output = subprocess.run([sys.executable, '-c', CHILD], cwd=REPO_DIR, capture_output=True, text=True, check=True).stdout
+    line = next(line for line in output.splitlines() if line.startswith(RESULT_PREFIX))
+    return json.loads(line[len(RESULT_PREFIX):])
+
+
+def direct_imports(top):
+    """(module, cumulative seconds) of dash_app's direct imports, slowest first"""
+    stderr = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import dash_app'], cwd=REPO_DIR,
+                            capture_output=True, text=True, check=True).stderr
+    modules = []
+    for line in stderr.splitlines():
+        match = re.match(r'import time:\s+\d+ \|\s+(\d+) \|( +)(\S+)', line)
+        if match and len(match.group(2)) == 3: # One level below dash_app
+            modules.append((match.group(3), int(match.group(1)) / 1e6))
+    return sorted(modules, key=lambda module: module[1], reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--warmup', type=int, default=1, help='Runs discarded first (bytecode compilation, disk cache)')
+    parser.add_argument('--budget', type=float, default=DEFAULT_BUDGET, help='Median import seconds allowed')
+    parser.add_argument('--top', type=int, default=10, help='Slowest direct imports listed, 0 = none')
+    parser.add_argument('--json', help='Also write the results to this file')
+    args = parser.parse_args()
+
+    for _ in range(args.warmup):
+        run_child()
+    runs = [run_child() for _ in range(args.runs)]
+    import_seconds = [run['import_seconds'] for run in runs]
+    deferred_loaded = sorted({name for run in runs for name in run['deferred_loaded']})
+    results = {
+        'runs': args.runs,
+        'import_median_seconds': statistics.median(import_seconds),
+        'import_min_seconds': min(import_seconds),
+        'import_max_seconds': max(import_seconds),
+        'first_page_median_seconds': statistics.median(run['first_page_seconds'] for run in runs),
+        'rss_median_mb': statistics.median(run['rss_mb'] for run in runs),
+        'budget_seconds': args.budget,
+        'deferred_loaded': deferred_loaded,
+    }
+    for key, value in results.items():
+        print(f"{key:>26}: {value:.3f}" if isinstance(value, float) else f"{key:>26}: {value}")
+    if args.top:
+        results['direct_imports'] = direct_imports(args.top)
+        print("Slowest direct imports of dash_app (cumulative):")
+        for name, seconds in results['direct_imports']:
+            print(f"    {seconds:7.3f} s  {name}")
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    failures = []
+    if results['import_median_seconds'] > args.budget:
+        failures.append(f"median import {results['import_median_seconds']:.3f} s over the {args.budget:g} s budget")
+    if deferred_loaded:
+        failures.append(f"loaded at import: {', '.join(deferred_loaded)}")
+    for failure in failures:
+        print(f"FAIL {failure}")
+    if not failures:
+        print("OK")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,42 @@
+"""Throughput of the streaming STFT at realistic batch sizes, compared with the 500 Hz live rate.
+
+Usage: python benchmarks/bench_stft.py [--rate 500] [--seconds 600] [--batch 25] [--window 256] [--hop 64]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from spectrogram import StreamingSTFT  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rate', type=float, default=500.0, help='Sample rate in Hz')
+    parser.add_argument('--seconds', type=float, default=600.0, help='Length of the synthetic stream')
+    parser.add_argument('--batch', type=int, default=25, help='Samples per ingested batch')
+    parser.add_argument('--window', type=int, default=256)
+    parser.add_argument('--hop', type=int, default=64)
+    args = parser.parse_args()
+
+    n = int(args.rate * args.seconds)
+    t = np.arange(n) / args.rate
+    rng = np.random.default_rng(0)
+    samples = np.column_stack([t, np.sin(2 * np.pi * 50 * t), 9.81 + rng.normal(0, 0.1, n), rng.normal(0, 0.1, n)])
+
+    engine = StreamingSTFT(window_size=args.window, hop=args.hop)
+    start = time.perf_counter()
+    for i in range(0, n, args.batch):
+        engine.update(samples[i:i + args.batch])
+    elapsed = time.perf_counter() - start
+
+    print(f"{n} samples in {elapsed:.3f} s, {engine.columns.total_written} spectral columns")
+    print(f"{n / elapsed:,.0f} samples/s = {n / elapsed / args.rate:,.0f}x real time at {args.rate:g} Hz "
+          f"({100 * elapsed / args.seconds:.3f}% of one core)")
+
+
+if __name__ == '__main__':
+    main()
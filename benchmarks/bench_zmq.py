@@ -0,0 +1,116 @@
+"""Throughput of the ZeroMQ ingest path of dash_app, binary batches vs JSON messages.
+
+A producer thread sends --messages batches of --batch samples to dash_app's ZeroMQ receiver
+(PUSH -> bound PULL by default, or PUB -> SUB with --pattern sub), which ingests them through
+the same path as /sensor (reassembly, filter, live buffer, recorder). Reports messages/s and
+samples/s from the first send until the receiver has ingested the last message, plus how many
+messages a PUB/SUB run lost to the high-water mark. Compare with
+`python benchmarks/bench_ingest.py --batch N` for the HTTP endpoint.
+
+Usage: python benchmarks/bench_zmq.py [--encoding binary|json] [--pattern pull|sub] [--batch 50]
+           [--messages 20000] [--devices 1] [--hwm 1000] [--json out.json]
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+import zmq
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import ingest_broker  # noqa: E402
+
+ENDPOINT = 'tcp://127.0.0.1:{port}'
+BASE_TIME_NS = 1_700_000_000_000_000_000
+SAMPLE_PERIOD_NS = 2_000_000 # 500 Hz
+
+
+def make_messages(n_messages, batch, devices, encoding, seed=0):
+    """Multipart messages, round robin over the devices, generated up front"""
+    rng = np.random.default_rng(seed)
+    messages = []
+    for i in range(n_messages):
+        device_id = f'zmq{i % devices}'
+        first = (i // devices) * batch
+        times_ns = BASE_TIME_NS + (np.arange(batch, dtype=np.int64) + first) * SAMPLE_PERIOD_NS
+        values = rng.normal(0.0, 1.0, (batch, 3)) + (0.0, 0.0, 9.81)
+        if encoding == 'binary':
+            messages.append(ingest_broker.encode_batch(device_id, times_ns, values))
+        else:
+            points = [{'time': int(t), 'x': float(x), 'y': float(y), 'z': float(z)}
+                      for t, (x, y, z) in zip(times_ns, values)]
+            messages.append([json.dumps({'type': 'accelerometer_data', 'deviceId': device_id, 'data': points}).encode()])
+    return messages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--encoding', choices=('binary', 'json'), default='binary')
+    parser.add_argument('--pattern', choices=('pull', 'sub'), default='pull')
+    parser.add_argument('--batch', type=int, default=50, help='Samples per message')
+    parser.add_argument('--messages', type=int, default=20000)
+    parser.add_argument('--devices', type=int, default=1)
+    parser.add_argument('--hwm', type=int, default=1000, help='High-water mark of both sockets')
+    parser.add_argument('--port', type=int, default=5599)
+    parser.add_argument('--json', help='Also write the results to this file')
+    args = parser.parse_args()
+
+    import dash_app
+    dash_app.sessions.clear()
+    endpoint = ENDPOINT.format(port=args.port)
+    messages = make_messages(args.messages, args.batch, args.devices, args.encoding)
+    context = zmq.Context.instance()
+    if args.pattern == 'pull':
+        receiver = dash_app.start_zmq_receiver(endpoint, 'pull', args.hwm)
+        sender = context.socket(zmq.PUSH)
+        sender.setsockopt(zmq.SNDHWM, args.hwm)
+        sender.connect(endpoint)
+    else:
+        sender = context.socket(zmq.PUB)
+        sender.setsockopt(zmq.SNDHWM, args.hwm)
+        sender.bind(endpoint)
+        receiver = dash_app.start_zmq_receiver(endpoint, 'sub', args.hwm)
+    time.sleep(0.5) # Let the connection (and subscription) settle
+
+    done = threading.Event()
+    start = time.perf_counter()
+
+    def send_all():
+        for message in messages:
+            sender.send_multipart(message, copy=False)
+        done.set()
+
+    threading.Thread(target=send_all, daemon=True).start()
+    done.wait()
+    send_seconds = time.perf_counter() - start
+    # Wait for the receiver to drain; a PUB socket may have dropped messages, so stop once it goes quiet
+    last_count, last_change = -1, time.perf_counter()
+    while receiver.batches < args.messages and time.perf_counter() - last_change < 1.0:
+        if receiver.batches != last_count:
+            last_count, last_change = receiver.batches, time.perf_counter()
+        time.sleep(0.001)
+    seconds = (time.perf_counter() if receiver.batches >= args.messages else last_change) - start
+
+    received = receiver.batches
+    results = {
+        'encoding': args.encoding, 'pattern': args.pattern, 'batch': args.batch, 'devices': args.devices,
+        'hwm': args.hwm, 'messages_sent': args.messages, 'messages_received': received,
+        'decode_errors': receiver.errors, 'bytes_per_message': float(np.mean([sum(len(f) for f in m) for m in messages])),
+        'send_seconds': send_seconds, 'seconds': seconds,
+        'messages_per_s': received / seconds, 'samples_per_s': received * args.batch / seconds,
+        'samples_stored': dash_app.sessions.total_points_received,
+    }
+    for key, value in results.items():
+        print(f"{key:>18}: {value:.3f}" if isinstance(value, float) else f"{key:>18}: {value}")
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+    os._exit(0) # Skip waiting for the app's background threads
+
+
+if __name__ == '__main__':
+    main()
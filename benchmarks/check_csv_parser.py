@@ -0,0 +1,122 @@
+"""Checks recording_format.read_csv against the csv module on generated CSV files.
+
+Every case writes random samples as CSV text in some dialect and parses it
+with read_csv, split into chunks of several sizes (down to a few bytes, so
+rows and quoted cells straddle chunk boundaries). The result must equal
+csv.DictReader with float() per cell, which the upload parser used before.
+The dialects cover the column order, extra (text) columns, CRLF line
+endings, a UTF-8 BOM, blank lines, a missing final newline and quoted
+cells, both all quoted and some quoted. Bad files (missing column, text in
+a number column, short row) must raise ValueError.
+
+Exits with status 1 if any case fails.
+
+Usage: python benchmarks/check_csv_parser.py [--rows 500] [--seed 0]
+"""
+import argparse
+import csv
+import io
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import recording_format
+
+CHUNK_SIZES = (7, 64, 4096, recording_format.CSV_CHUNK_BYTES)
+
+
+def chunked(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+def reference(text):
+    """(n, 4) array the way csv.DictReader + float() reads the text"""
+    reader = csv.DictReader(io.StringIO(text.lstrip('﻿')))
+    reader.fieldnames = [name.strip().lower() for name in reader.fieldnames]
+    rows = [[float(row[column]) for column in recording_format.COLUMNS] for row in reader
+            if any((cell or '').strip() for cell in row.values())]
+    return np.array(rows, dtype=np.float64).reshape(len(rows), len(recording_format.COLUMNS))
+
+
+def make_csv(samples, rng, order=recording_format.COLUMNS, extra=False, quote=None, newline='\n',
+             bom=False, blank_lines=False, final_newline=True):
+    """CSV text of samples; quote is None, 'all' or 'some'"""
+    names = list(order) + (['note'] if extra else [])
+    lines = [','.join(f'"{name}"' if quote == 'all' else name for name in names)]
+    index = [recording_format.COLUMNS.index(name) for name in order]
+    for row in samples:
+        cells = [repr(float(row[i])) for i in index]
+        if extra:
+            cells.append('"tap, then hold"' if rng.random() < 0.5 else 'ok')
+        if quote == 'all':
+            cells = [cell if cell.startswith('"') else f'"{cell}"' for cell in cells]
+        elif quote == 'some':
+            cells = [f'"{cell}"' if not cell.startswith('"') and rng.random() < 0.3 else cell for cell in cells]
+        lines.append(','.join(cells))
+        if blank_lines and rng.random() < 0.05:
+            lines.append('')
+    text = newline.join(lines) + (newline if final_newline else '')
+    return ('﻿' if bom else '') + text
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=500)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    samples = np.column_stack([np.cumsum(rng.uniform(0.001, 0.02, args.rows)), rng.normal(0, 3, (args.rows, 3))])
+    shuffled = tuple(rng.permutation(recording_format.COLUMNS))
+    cases = {
+        'plain': {},
+        'column order': {'order': shuffled},
+        'extra text column': {'order': shuffled, 'extra': True},
+        'crlf': {'newline': '\r\n'},
+        'bom': {'bom': True},
+        'blank lines': {'blank_lines': True},
+        'no final newline': {'final_newline': False},
+        'quoted cells': {'quote': 'all'},
+        'some quoted cells': {'quote': 'some', 'newline': '\r\n'},
+        'quoted with extra column': {'quote': 'some', 'order': shuffled, 'extra': True},
+    }
+    failures = []
+    for name, options in cases.items():
+        text = make_csv(samples, rng, **options)
+        expected = reference(text)
+        for size in CHUNK_SIZES:
+            try:
+                parsed = recording_format.read_csv(chunked(text.encode('utf-8'), size))
+            except ValueError as e:
+                failures.append(f"{name} (chunks of {size}): {e}")
+                continue
+            if parsed.shape != expected.shape or not np.array_equal(parsed, expected):
+                failures.append(f"{name} (chunks of {size}): differs from the csv module")
+        print(f"{name:>30}: {len(expected)} rows")
+
+    good = make_csv(samples[:20], rng)
+    bad_files = {
+        'missing column': good.replace('az', 'bz', 1),
+        'text in a number column': good.replace(repr(float(samples[10, 2])), 'x', 1),
+        'quoted text in a number column': make_csv(samples[:20], rng, quote='all').replace(repr(float(samples[10, 2])), 'x', 1),
+        'short quoted row': good + '"1.0","2.0"\n',
+    }
+    for name, text in bad_files.items():
+        try:
+            recording_format.read_csv(chunked(text.encode('utf-8'), 64))
+            failures.append(f"{name}: accepted")
+        except ValueError as e:
+            print(f"{name:>30}: ValueError ({e})")
+
+    for failure in failures:
+        print(f"FAIL {failure}")
+    if not failures:
+        print("OK")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
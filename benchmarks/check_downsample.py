@@ -0,0 +1,96 @@
+"""Checks downsample.m4 against a per-bucket brute force on random live batches.
+
+Random batches (irregular times, repeated timestamps, tied values, widths
+from a fraction of a sample to the whole batch) are downsampled per axis.
+For every aligned time bucket (floor(t / bucket_width)) the kept points must
+include the bucket's first and last sample. They must also include a sample
+with the bucket's min and one with its max, found by a Python loop over the
+bucket. No more than 4 points per bucket may be kept, every kept point must
+be a raw sample, in time order. Batches with at most 4 samples per bucket
+must come back unchanged.
+
+Exits with status 1 on the first mismatch.
+
+Usage: python benchmarks/check_downsample.py [--batches 2000] [--seed 0]
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import downsample
+
+
+def random_batch(rng):
+    k = int(rng.integers(1, 400))
+    times = rng.uniform(0, 100) + np.cumsum(rng.exponential(0.002, k))
+    if rng.random() < 0.2:
+        times[rng.integers(0, k, k // 4)] = times[0] # Repeated timestamps
+        times.sort()
+    values = rng.normal(0, 1, (k, 3))
+    if rng.random() < 0.2:
+        values = np.round(values) # Many ties
+    return times, values
+
+
+def check_axis(times, values, kept_times, kept_values, bucket_width):
+    buckets = np.floor(times / bucket_width).astype(np.int64)
+    kept_buckets = np.floor(kept_times / bucket_width).astype(np.int64)
+    if np.any(np.diff(kept_times) < 0):
+        return "kept points not in time order"
+    raw = set(zip(times.tolist(), values.tolist()))
+    if not set(zip(kept_times.tolist(), kept_values.tolist())) <= raw:
+        return "a kept point is not a raw sample"
+    for bucket in np.unique(buckets):
+        rows = [(t, v) for t, v, b in zip(times.tolist(), values.tolist(), buckets.tolist()) if b == bucket]
+        kept = [(t, v) for t, v, b in zip(kept_times.tolist(), kept_values.tolist(), kept_buckets.tolist()) if b == bucket]
+        if len(kept) > 4:
+            return f"bucket {bucket}: {len(kept)} points kept"
+        if rows[0] not in kept or rows[-1] not in kept:
+            return f"bucket {bucket}: first or last sample missing"
+        kept_values_of_bucket = [v for _, v in kept]
+        if min(v for _, v in rows) not in kept_values_of_bucket or max(v for _, v in rows) not in kept_values_of_bucket:
+            return f"bucket {bucket}: min or max missing"
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--batches', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    reduced = passthrough = 0
+    for i in range(args.batches):
+        times, values = random_batch(rng)
+        span = max(times[-1] - times[0], 1e-3)
+        bucket_width = span * float(rng.choice([1e-4, 1e-2, 0.1, 0.5, 2.0]))
+        result = downsample.m4(times, values, bucket_width)
+        if len(result) != 3:
+            print(f"FAIL batch {i}: {len(result)} axes returned")
+            sys.exit(1)
+        buckets = np.floor(times / bucket_width).astype(np.int64)
+        if len(times) <= 4 * (buckets[-1] - buckets[0] + 1):
+            passthrough += 1
+            if not all(np.array_equal(t, times) and np.array_equal(v, values[:, axis]) for axis, (t, v) in enumerate(result)):
+                print(f"FAIL batch {i}: a batch with at most 4 samples per bucket was changed")
+                sys.exit(1)
+            continue
+        reduced += 1
+        for axis, (kept_times, kept_values) in enumerate(result):
+            failure = check_axis(times, values[:, axis], kept_times, kept_values, bucket_width)
+            if failure:
+                print(f"FAIL batch {i}, axis {axis} (bucket width {bucket_width:g}): {failure}")
+                sys.exit(1)
+
+    print(f"{reduced} batches reduced, {passthrough} passed through")
+    print("OK")
+    sys.exit(0)
+
+
+if __name__ == '__main__':
+    main()
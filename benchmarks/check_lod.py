@@ -0,0 +1,129 @@
+"""Checks lod.MinMaxPyramid against brute-force bucket extrema and raw slices.
+
+Random recordings (irregular sample times, sizes around the LEVEL_FACTOR
+powers, some built from an np.memmap in small chunks) are summarized.
+Every bucket of every level must have the first/last time and per-axis
+min/max of its raw samples, computed one bucket at a time. Random queries
+must then return:
+  - the raw rows around the range when they fit in max_points;
+  - otherwise points whose time span covers the range, at most max_points
+    + 4 (the partial buckets at the edges; the coarsest level alone has up
+    to 2 * LEVEL_FACTOR). Their min/max on every axis must equal the raw
+    extrema of the buckets they cover, so no peak in the range is lost.
+
+Exits with status 1 on the first mismatch.
+
+Usage: python benchmarks/check_lod.py [--queries 300] [--seed 0]
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import lod
+
+SIZES = (0, 1, lod.LEVEL_FACTOR, lod.LEVEL_FACTOR + 1, 1000, lod.LEVEL_FACTOR ** 4, lod.LEVEL_FACTOR ** 4 + 3, 50000)
+
+
+def make_recording(rng, n):
+    times = np.cumsum(rng.exponential(0.01, n))
+    values = rng.normal(0, 1, (n, 3))
+    spikes = rng.integers(0, max(n, 1), min(n, 5))
+    values[spikes] *= 50 # Isolated peaks that decimation must keep
+    return np.column_stack([times, values])
+
+
+def check_levels(pyramid, samples):
+    n = len(samples)
+    for bucket_size, t_first, t_last, vmin, vmax in pyramid.levels:
+        starts = range(0, n, bucket_size)
+        if len(t_first) != len(starts):
+            return f"level {bucket_size}: {len(t_first)} buckets, expected {len(starts)}"
+        for j, start in enumerate(starts):
+            rows = samples[start:start + bucket_size]
+            if (t_first[j], t_last[j]) != (rows[0, 0], rows[-1, 0]) \
+                    or not np.array_equal(vmin[j], rows[:, 1:].min(axis=0)) \
+                    or not np.array_equal(vmax[j], rows[:, 1:].max(axis=0)):
+                return f"level {bucket_size}, bucket {j} differs from its raw samples"
+    return None
+
+
+def check_query(pyramid, samples, t_start, t_end, max_points):
+    times, values = pyramid.query(t_start, t_end, max_points)
+    all_times = samples[:, 0]
+    lo = max(int(np.searchsorted(all_times, t_start, side='left')) - 1, 0)
+    hi = min(int(np.searchsorted(all_times, t_end, side='right')) + 1, len(samples))
+    if hi - lo <= max_points or not pyramid.levels:
+        if not (np.array_equal(times, samples[lo:hi, 0]) and np.array_equal(values, samples[lo:hi, 1:])):
+            return "raw query differs from the samples around the range"
+        return None
+    if len(times) > max(max_points, 2 * lod.LEVEL_FACTOR) + 4:
+        return f"{len(times)} points for max_points={max_points}"
+    if np.any(np.diff(times) < 0):
+        return "decimated times not sorted"
+    if times[0] > all_times[lo] or times[-1] < all_times[hi - 1]:
+        return "decimated points do not cover the range"
+    # The covered buckets span whole buckets around [lo, hi); their extrema are what the points must show
+    first = int(np.searchsorted(all_times, times[0], side='left'))
+    last = int(np.searchsorted(all_times, times[-1], side='right'))
+    covered = samples[first:last, 1:]
+    if not (np.array_equal(values.min(axis=0), covered.min(axis=0)) and np.array_equal(values.max(axis=0), covered.max(axis=0))):
+        return "decimated extrema differ from the raw extrema of the covered buckets"
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--queries', type=int, default=300, help='Random queries per recording')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    failures = []
+    with tempfile.TemporaryDirectory() as directory:
+        for n in SIZES:
+            samples = make_recording(rng, n)
+            sources = {'array': samples}
+            if n:
+                path = os.path.join(directory, f'{n}.f8')
+                samples.tofile(path)
+                sources['memmap'] = np.memmap(path, dtype=np.float64, mode='r', shape=samples.shape)
+            for source_name, source in sources.items():
+                chunk_rows = lod.BUILD_CHUNK_ROWS
+                if source_name == 'memmap':
+                    lod.BUILD_CHUNK_ROWS = 1000 # Build in many chunks, as from a large file
+                try:
+                    pyramid = lod.MinMaxPyramid(source)
+                finally:
+                    lod.BUILD_CHUNK_ROWS = chunk_rows
+                label = f"{n} rows from {source_name}"
+                failure = check_levels(pyramid, samples)
+                span = pyramid.time_span
+                for _ in range(args.queries if n else 1):
+                    if failure:
+                        break
+                    t_start, t_end = np.sort(rng.uniform(span[0] - 1, span[1] + 1, 2))
+                    if rng.random() < 0.3: # Zoomed in
+                        t_end = t_start + (span[1] - span[0]) * rng.uniform(0, 0.01)
+                    max_points = int(rng.choice([10, 100, 1000, 4000]))
+                    failure = check_query(pyramid, samples, t_start, t_end, max_points)
+                    if failure:
+                        failure = f"query [{t_start:.3f}, {t_end:.3f}] max_points={max_points}: {failure}"
+                if failure:
+                    failures.append(f"{label}: {failure}")
+                print(f"{label:>24}: {len(pyramid.levels)} levels")
+            sources.clear() # Close the memmap before the directory is removed
+
+    for failure in failures:
+        print(f"FAIL {failure}")
+    if not failures:
+        print("OK")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
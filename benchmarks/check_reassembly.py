@@ -0,0 +1,193 @@
+"""Checks reassembly.Reassembler against a sample-by-sample model and the ideal stream.
+
+Random Sensor Logger-like streams (100 Hz, batches of 10) are pushed in a
+shuffled arrival order with retried batches, wall clock gaps and
+flush_stale calls between arrivals. Two checks run on every stream:
+
+  - model: a plain Python model of the documented rules, one sample at a
+    time with sets and dicts. Samples are released once they are `jitter`
+    behind the newest one, or all at once after `max_hold` (before the next
+    batch is merged). A repeated time in a batch, or the time of a pending
+    or remembered released sample, is a duplicate. Anything else behind the
+    release point is dropped. The released samples and the
+    late/duplicate/dropped counters must match exactly, with any arrival
+    delays.
+  - ideal: when every batch arrives within the jitter window, nothing may
+    be dropped. The released samples must be exactly the sorted,
+    de-duplicated input, with the values of the first copy to arrive.
+
+Exits with status 1 on the first mismatch.
+
+Usage: python benchmarks/check_reassembly.py [--streams 200] [--seed 0]
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from reassembly import Reassembler
+
+RATE = 100.0 # Hz
+BATCH = 10
+JITTER = 0.25 # s
+MAX_HOLD = 1.0 # s
+
+
+class Model:
+    """The Reassembler rules, one sample at a time (history large enough to remember every release)"""
+
+    def __init__(self, jitter, max_hold):
+        self.jitter_ns = int(jitter * 1e9)
+        self.max_hold = max_hold
+        self.pending = {}
+        self.released = set()
+        self.watermark = self.newest = self.held_since = None
+        self.late = self.duplicate = self.dropped = 0
+
+    def push(self, times_ns, values, now):
+        out = self.release(now) if self.pending and now - self.held_since >= self.max_hold else []
+        seen = set()
+        kept = []
+        for i in sorted(range(len(times_ns)), key=lambda i: times_ns[i]): # Stable: the first copy wins
+            t = int(times_ns[i])
+            if t in seen:
+                self.duplicate += 1
+                continue
+            seen.add(t)
+            if self.watermark is not None and t <= self.watermark:
+                if t in self.released:
+                    self.duplicate += 1
+                else:
+                    self.dropped += 1
+            elif t in self.pending:
+                self.duplicate += 1
+            else:
+                kept.append((t, tuple(values[i])))
+        if kept:
+            if self.newest is not None:
+                self.late += sum(t < self.newest for t, _ in kept)
+            if not self.pending:
+                self.held_since = now
+            self.pending.update(kept)
+            self.newest = max([t for t, _ in kept] + ([] if self.newest is None else [self.newest]))
+        return out + self.release(now)
+
+    def release(self, now, everything=False):
+        if not self.pending:
+            return []
+        if everything or now - self.held_since >= self.max_hold:
+            ready = sorted(self.pending)
+        else:
+            ready = sorted(t for t in self.pending if t <= self.newest - self.jitter_ns)
+        if not ready:
+            return []
+        out = [(t, self.pending.pop(t)) for t in ready]
+        if self.pending:
+            self.held_since = now
+        self.watermark = ready[-1]
+        self.released.update(ready)
+        return out
+
+
+def make_arrivals(rng, batches, max_delay, retries):
+    """[(arrival wall time, times_ns, values)] of a stream, in arrival order"""
+    arrivals = []
+    t0 = rng.uniform(0, 1000)
+    for b in range(batches):
+        times = t0 + (b * BATCH + np.arange(BATCH)) / RATE
+        times_ns = (times * 1e9).astype(np.int64)
+        values = rng.normal(0, 1, (BATCH, 3))
+        arrival = times[-1] + rng.uniform(0, max_delay)
+        arrivals.append((arrival, times_ns, values))
+        if rng.random() < retries: # Retried request: same samples, possibly other values read back
+            arrivals.append((arrival + rng.uniform(0, 3 * max_delay + 0.5), times_ns.copy(), values + rng.normal(0, 1, values.shape)))
+        if rng.random() < 0.02: # The phone pauses longer than max_hold
+            t0 += rng.uniform(MAX_HOLD, 5 * MAX_HOLD)
+    if rng.random() < 0.5: # Shuffled within a batch
+        for _, times_ns, values in arrivals:
+            order = rng.permutation(BATCH)
+            times_ns[:], values[:] = times_ns[order], values[order]
+    arrivals.sort(key=lambda arrival: arrival[0])
+    return arrivals
+
+
+def run(arrivals, rng, model=None):
+    """Push the arrivals; returns (released times, values, reassembler), checking the model on the way"""
+    reassembler = Reassembler(JITTER, MAX_HOLD, history=1 << 30)
+    out_times, out_values = [], []
+    for i, (now, times_ns, values) in enumerate(arrivals):
+        released = [reassembler.push(times_ns, values, now=now)]
+        expected = model.push(times_ns, values, now) if model else None
+        if rng.random() < 0.5: # The periodic flush, somewhere before the next arrival
+            flush_time = rng.uniform(now, arrivals[i + 1][0] if i + 1 < len(arrivals) else now + 2 * MAX_HOLD)
+            released.append(reassembler.flush_stale(now=flush_time))
+            if model:
+                expected += model.release(flush_time)
+        got = []
+        for t, v in released:
+            got.extend(zip(t.tolist(), map(tuple, v.tolist())))
+        out_times.extend(t for t, _ in got)
+        out_values.extend(v for _, v in got)
+        if model:
+            if got != expected:
+                raise AssertionError(f"arrival {i}: released {len(got)} samples, the model {len(expected)}")
+            counters = (reassembler.late_samples, reassembler.duplicate_samples, reassembler.dropped_samples)
+            if counters != (model.late, model.duplicate, model.dropped):
+                raise AssertionError(f"arrival {i}: counters {counters}, the model {(model.late, model.duplicate, model.dropped)}")
+    t, v = reassembler.flush()
+    out_times.extend(t.tolist())
+    out_values.extend(map(tuple, v.tolist()))
+    if model:
+        expected = model.release(None, everything=True)
+        if list(zip(t.tolist(), map(tuple, v.tolist()))) != expected:
+            raise AssertionError("final flush differs from the model")
+    return out_times, out_values, reassembler
+
+
+def ideal(arrivals):
+    """Sorted unique input, first copy to arrive wins"""
+    first = {}
+    for _, times_ns, values in arrivals:
+        for t, v in zip(times_ns.tolist(), map(tuple, values.tolist())):
+            first.setdefault(t, v)
+    return sorted(first), [first[t] for t in sorted(first)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--streams', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    totals = np.zeros(3, dtype=np.int64)
+    for stream in range(args.streams):
+        batches = int(rng.integers(1, 200))
+        try:
+            # Any delays: compare with the model
+            arrivals = make_arrivals(rng, batches, max_delay=float(rng.choice([0.1, 0.5, 2.0])), retries=0.1)
+            times, _, reassembler = run(arrivals, rng, Model(JITTER, MAX_HOLD))
+            totals += (reassembler.late_samples, reassembler.duplicate_samples, reassembler.dropped_samples)
+            if any(b <= a for a, b in zip(times, times[1:])):
+                raise AssertionError("released times not strictly increasing")
+            # Within the jitter window: nothing dropped, the ideal stream comes out
+            arrivals = make_arrivals(rng, batches, max_delay=JITTER - BATCH / RATE - 0.01, retries=0.1)
+            times, values, reassembler = run(arrivals, rng)
+            if reassembler.dropped_samples:
+                raise AssertionError(f"{reassembler.dropped_samples} samples dropped within the jitter window")
+            if (times, values) != ideal(arrivals):
+                raise AssertionError("released stream differs from the sorted, de-duplicated input")
+        except AssertionError as e:
+            print(f"FAIL stream {stream}: {e}")
+            sys.exit(1)
+
+    print(f"{args.streams} streams; late, duplicate, dropped samples with any delays: {', '.join(map(str, totals))}")
+    print("OK")
+    sys.exit(0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+"""Checks rolling_stats.RollingStats against a brute-force computation over the window.
+
+A random stream of blocks (irregular sizes and rates, gaps longer than the
+window, an offset like gravity on z, occasional spikes and clear() calls) is
+fed to RollingStats. After every block the snapshot is compared with the
+statistics recomputed from every sample in [latest - window, latest]:
+  - count, duration and peak-to-peak must be exact;
+  - mean and RMS come from running sums with subtractions, so they keep a
+    rounding error relative to the largest values that went through the
+    sums. The mean must agree within 1e-12 of the largest |value| in the
+    stream, the mean square (RMS squared) within 1e-12 of its square. The
+    crest factor (peak / RMS) must agree within the error that this
+    allows.
+
+Exits with status 1 on the first mismatch; prints the largest error in units of the tolerance.
+
+Usage: python benchmarks/check_rolling_stats.py [--blocks 20000] [--window 2.0] [--seed 0]
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from rolling_stats import RollingStats
+
+TOLERANCE = 1e-12 # Of the largest |value| (squared for the mean square) seen, for the values from running sums
+
+
+def brute_force(samples, window_seconds):
+    latest = samples[-1, 0]
+    rows = samples[samples[:, 0] >= latest - window_seconds]
+    values = rows[:, 1:]
+    rms = np.sqrt(np.mean(values * values, axis=0))
+    low, high = values.min(axis=0), values.max(axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        crest = np.where(rms > 0, np.maximum(np.abs(low), np.abs(high)) / rms, np.nan)
+    return {
+        'count': len(rows),
+        'duration': float(latest - rows[0, 0]),
+        'mean': values.mean(axis=0),
+        'rms': rms,
+        'peak_to_peak': high - low,
+        'crest_factor': crest,
+    }
+
+
+def error_ratio(got, expected, tolerance):
+    """Largest |got - expected| / tolerance (per-axis arrays); NaN on both sides counts as equal"""
+    got, expected = np.asarray(got, dtype=np.float64), np.asarray(expected, dtype=np.float64)
+    with np.errstate(invalid='ignore'):
+        ratio = np.abs(got - expected) / tolerance
+    return float(np.max(np.where(np.isnan(got) & np.isnan(expected), 0.0, np.nan_to_num(ratio, nan=np.inf))))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--blocks', type=int, default=20000)
+    parser.add_argument('--window', type=float, default=2.0, help='window_seconds')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    stats = RollingStats(args.window)
+    history = [] # Blocks since the last clear
+    t = 0.0
+    worst = 0.0
+    largest = 0.0 # Largest |value| so far
+    for i in range(args.blocks):
+        if rng.random() < 0.001:
+            stats.clear()
+            history = []
+        if rng.random() < 0.01:
+            t += rng.uniform(0, 3 * args.window) # Gap, sometimes longer than the window
+        k = int(rng.integers(1, 60))
+        times = t + np.cumsum(rng.uniform(0, 0.02, k)) # Repeated times included (zero steps are possible)
+        t = times[-1]
+        values = rng.normal(0, 1, (k, 3)) + (0.0, 0.0, 9.81)
+        if rng.random() < 0.02:
+            values[rng.integers(0, k)] *= rng.choice([-30, 30])
+        if rng.random() < 0.01:
+            values[:] = values[0] # Constant block: RMS and mean exact, crest well defined
+        block = np.column_stack([times, values])
+        largest = max(largest, float(np.abs(values).max()))
+        stats.update(block)
+        history.append(block)
+        # Keep the reference bounded: only blocks that can still reach into the window
+        while len(history) > 1 and history[1][0, 0] < t - args.window:
+            history.pop(0)
+
+        snapshot = stats.snapshot()
+        expected = brute_force(np.concatenate(history), args.window)
+        exact = (snapshot['count'], snapshot['duration'], snapshot['peak_to_peak']) == \
+                (expected['count'], expected['duration'], expected['peak_to_peak'].tolist())
+        square_tolerance = TOLERANCE * largest ** 2
+        with np.errstate(divide='ignore', invalid='ignore'):
+            crest_tolerance = expected['crest_factor'] * (square_tolerance / expected['rms'] ** 2 + 1e-12)
+        errors = [error_ratio(snapshot['mean'], expected['mean'], TOLERANCE * largest),
+                  error_ratio(np.square(snapshot['rms']), expected['rms'] ** 2, square_tolerance),
+                  error_ratio(snapshot['crest_factor'], expected['crest_factor'], crest_tolerance)]
+        worst = max([worst] + errors)
+        if not exact or max(errors) > 1.0:
+            print(f"FAIL block {i}: snapshot {snapshot}, expected {expected}")
+            sys.exit(1)
+
+    print(f"{args.blocks} blocks, largest error {worst:.2e} of the tolerance")
+    print("OK")
+    sys.exit(0)
+
+
+if __name__ == '__main__':
+    main()
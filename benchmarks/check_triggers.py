@@ -0,0 +1,169 @@
+"""Checks triggers.TriggerEngine against a sample-by-sample scan of the whole stream.
+
+A random stream (batches of irregular length and duration, repeated
+timestamps, bursts that cross the levels) is fed block by block, with
+raw values that differ from the displayed ones (gravity on z, as with the
+gravity-removal filter). The events the engine hands to the writer are
+captured and compared with a plain Python scan of the displayed samples:
+  - an armed engine triggers on the first sample meeting any condition,
+    the earlier condition winning a tie. Slopes are taken against the
+    previous sample, across batches, and are 0 for repeated times;
+  - the trigger time, condition and value must match;
+  - the window must hold exactly the raw samples from trigger -
+    pre_seconds to trigger + post_seconds. It is complete once a batch
+    reaches past the post-trigger time, and detection re-arms with the
+    next batch. The event still open at the end is saved by flush() with
+    what arrived.
+
+Exits with status 1 on the first mismatch.
+
+Usage: python benchmarks/check_triggers.py [--streams 100] [--seed 0]
+"""
+import argparse
+import math
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import triggers
+
+GRAVITY = 9.81
+
+
+class CapturingWriter:
+    """Stands in for the process-wide EventWriter: keeps the submitted windows instead of writing files"""
+
+    def __init__(self):
+        self.windows = []
+
+    def submit(self, filename, block, file_format, metadata):
+        self.windows.append((metadata, np.array(block)))
+        return True
+
+
+def make_stream(rng):
+    """[(raw block, displayed block)] in time order"""
+    blocks = []
+    t = rng.uniform(0, 100)
+    for _ in range(int(rng.integers(1, 150))):
+        k = int(rng.integers(1, 40))
+        step = float(rng.choice([0.001, 0.01, 0.05]))
+        times = t + np.cumsum(rng.uniform(0, 2 * step, k))
+        if rng.random() < 0.1:
+            times[rng.integers(0, k)] = times[0] # Repeated timestamp (kept sorted: the first is the smallest)
+            times.sort()
+        t = times[-1] + rng.uniform(0, 3 * step)
+        displayed = rng.normal(0, 1, (k, 3))
+        if rng.random() < 0.05:
+            displayed[rng.integers(0, k):] *= rng.uniform(3, 10) # A shock
+        raw = displayed + (0.0, 0.0, GRAVITY)
+        blocks.append((np.column_stack([times, raw]), np.column_stack([times, displayed])))
+    return blocks
+
+
+def random_conditions(rng):
+    pool = [('threshold', 'any', 4.0), ('threshold', 'z', 3.5), ('magnitude', 6.0),
+            ('slope', 'any', 1500.0), ('slope', 'x', 400.0)]
+    picks = rng.choice(len(pool), int(rng.integers(1, 4)), replace=False)
+    return [pool[i] for i in sorted(picks)]
+
+
+def measure(condition, row, previous):
+    """Value of a condition at one displayed [t, x, y, z] row, and whether it is met"""
+    kind, *args = condition
+    values = row[1:]
+    if kind == 'magnitude':
+        value = math.sqrt(sum(v * v for v in values))
+        return value, value >= args[0]
+    axis, level = args
+    if kind == 'slope':
+        if previous is None or row[0] - previous[0] <= 0:
+            values = [0.0, 0.0, 0.0]
+        else:
+            values = [(v - p) / (row[0] - previous[0]) for v, p in zip(values, previous[1:])]
+    values = [abs(v) for v in values]
+    if axis != 'any':
+        values = [values[triggers.AXES[axis]]]
+    return max(values), any(v >= level for v in values)
+
+
+def expected_events(blocks, conditions, pre_seconds, post_seconds):
+    """[(trigger_time, condition, value, raw window)] by scanning every sample"""
+    events = []
+    pending = None
+    previous = None
+    arrived = []
+    for raw, displayed in blocks:
+        arrived.append(raw)
+        rows = displayed.tolist()
+        if pending is None: # An event being captured takes the whole batch; detection re-arms with the next one
+            for i, row in enumerate(rows):
+                for condition in conditions:
+                    value, met = measure(condition, row, rows[i - 1] if i else previous)
+                    if met:
+                        pending = (row[0], condition, value)
+                        break
+                if pending is not None:
+                    break
+        previous = rows[-1]
+        if pending is not None and raw[-1, 0] >= pending[0] + post_seconds:
+            events.append(window(pending, arrived, pre_seconds, post_seconds))
+            pending = None
+    if pending is not None:
+        events.append(window(pending, arrived, pre_seconds, post_seconds))
+    return events
+
+
+def window(pending, arrived, pre_seconds, post_seconds):
+    trigger_time, condition, value = pending
+    data = np.concatenate(arrived)
+    times = data[:, 0]
+    return trigger_time, condition, value, data[(times >= trigger_time - pre_seconds) & (times <= trigger_time + post_seconds)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--streams', type=int, default=100)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    writer = triggers._writer = CapturingWriter() # event_writer() returns it instead of starting a thread
+    event_count = 0
+    for stream in range(args.streams):
+        blocks = make_stream(rng)
+        conditions = random_conditions(rng)
+        pre_seconds, post_seconds = float(rng.choice([0.0, 0.05, 0.3])), float(rng.choice([0.0, 0.1, 0.5]))
+        writer.windows.clear()
+        engine = triggers.TriggerEngine(conditions, lambda timestamp: os.devnull, pre_seconds, post_seconds)
+        for raw, displayed in blocks:
+            engine.process(raw, displayed.copy())
+        engine.flush()
+
+        expected = expected_events(blocks, conditions, pre_seconds, post_seconds)
+        got = [(metadata['trigger_time'], metadata['trigger'], metadata['trigger_value'], data) for metadata, data in writer.windows]
+        failure = None
+        if len(got) != len(expected):
+            failure = f"{len(got)} events, expected {len(expected)}"
+        for i, ((t, label, value, data), (t_expected, condition, value_expected, data_expected)) in enumerate(zip(got, expected)):
+            if failure:
+                break
+            if (t, label) != (t_expected, triggers.describe(condition)) or not math.isclose(value, value_expected, rel_tol=1e-12):
+                failure = f"event {i}: {label} at {t} ({value}), expected {triggers.describe(condition)} at {t_expected} ({value_expected})"
+            elif not np.array_equal(data, data_expected):
+                failure = f"event {i} at {t}: {len(data)} samples captured, expected {len(data_expected)}"
+        if failure:
+            print(f"FAIL stream {stream} (conditions {conditions}, pre {pre_seconds}, post {post_seconds}): {failure}")
+            sys.exit(1)
+        event_count += len(got)
+
+    print(f"{args.streams} streams, {event_count} events")
+    print("OK")
+    sys.exit(0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,222 @@
+"""Concurrency stress test of the ingest path: concurrent POSTs, resets and live reads, checked for torn rows.
+
+Every generated sample encodes its own index i in the stream of its device:
+time = BASE + i * period, x = i, y = -i, z = i + 0.5. Poster threads POST
+batches to /sensor (Flask test client, one thread per device) while a reset
+thread clears the sessions and reader threads read what the dashboard would
+send. Every row a reader sees must satisfy y == -x and z == x + 0.5 (no row
+mixes columns of two writes), the times of each read must advance with x at
+the sample period (no time/value misalignment), and consecutive reads of one
+session must continue exactly where the previous one stopped (no skipped or
+repeated samples) unless the reader fell more than a buffer behind.
+
+--target dash reads with DeviceSession.read_since (the live stream's read)
+and also runs collect_live_traces. --target simple reads simple.py's
+display data, published by its display update loop, the way animate() does.
+
+Exits with status 1 if any check failed.
+
+Usage: python benchmarks/stress_ingest.py [--target dash|simple] [--devices 4] [--readers 2]
+           [--batch 25] [--duration 5] [--reset-interval 0.5]
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+BASE_TIME_NS = 1_700_000_000_000_000_000
+SAMPLE_RATE = 500.0 # Hz of the generated timestamps
+PERIOD_NS = int(1e9 / SAMPLE_RATE)
+MAX_REPORTED = 10 # Failures printed per check
+
+
+class Checker:
+    """Counts checked rows and collects failures from many threads"""
+
+    def __init__(self):
+        self.rows = 0
+        self.reads = 0
+        self.lapped = 0
+        self.failures = {}
+        self._lock = threading.Lock()
+
+    def fail(self, check, detail):
+        with self._lock:
+            self.failures.setdefault(check, []).append(detail)
+
+    def check_rows(self, rows):
+        """Columns of every row and times against values within one read"""
+        with self._lock:
+            self.reads += 1
+            self.rows += len(rows)
+        if len(rows) == 0:
+            return
+        t, x, y, z = rows[:, 0], rows[:, 1], rows[:, 2], rows[:, 3]
+        torn = np.flatnonzero((y != -x) | (z != x + 0.5))
+        if len(torn):
+            self.fail('torn rows', rows[torn[0]].tolist())
+        steps = (x - x[0]) - np.round((t - t[0]) * SAMPLE_RATE)
+        misaligned = np.flatnonzero(np.abs(steps) > 1e-3)
+        if len(misaligned):
+            self.fail('times misaligned with values', (rows[0].tolist(), rows[misaligned[0]].tolist()))
+        if len(rows) > 1 and np.any(np.diff(x) != 1):
+            bad = int(np.flatnonzero(np.diff(x) != 1)[0])
+            self.fail('non-contiguous read', rows[bad:bad + 2, 1].tolist())
+
+
+def sample_block(first, batch):
+    index = np.arange(first, first + batch, dtype=np.int64)
+    times_ns = BASE_TIME_NS + index * PERIOD_NS
+    values = np.column_stack([index, -index, index + 0.5]).astype(np.float64)
+    return times_ns, values
+
+
+def make_body(device_id, first, batch):
+    times_ns, values = sample_block(first, batch)
+    payload = [{'name': 'accelerometer', 'time': int(t), 'values': {'x': x, 'y': y, 'z': z}}
+               for t, (x, y, z) in zip(times_ns.tolist(), values.tolist())]
+    return json.dumps({'messageId': first // batch, 'deviceId': device_id, 'payload': payload}).encode()
+
+
+def poster(flask_app, device_id, batch, stop, counts):
+    client = flask_app.test_client()
+    first = 0
+    while not stop.is_set():
+        response = client.post('/sensor', data=make_body(device_id, first, batch), content_type='application/json',
+                               headers={'X-Device-Id': device_id})
+        if response.status_code != 200:
+            raise RuntimeError(f"/sensor returned {response.status_code}")
+        first += batch
+        counts[device_id] = first
+
+
+def dash_reader(dash_app, device_ids, checker, stop):
+    """Reads each session like the live stream does and checks that reads continue each other"""
+    state = {} # device_id -> (session, seq, last x)
+    while not stop.is_set():
+        for device_id in device_ids:
+            session = dash_app.sessions.peek(device_id)
+            if session is None:
+                continue
+            previous_session, seq, last_x = state.get(device_id, (None, 0, None))
+            if session is not previous_session: # Reset: a new session starts from its first sample
+                seq, last_x = 0, None
+            rows, total = session.read_since(seq)
+            checker.check_rows(rows)
+            if len(rows):
+                if total - seq > session.buffer.capacity: # Fell more than a buffer behind; the gap is expected
+                    checker.lapped += 1
+                elif last_x is not None and rows[0, 1] != last_x + 1:
+                    checker.fail('skipped or repeated samples between reads', (last_x, rows[0, 1]))
+                last_x = rows[-1, 1]
+            state[device_id] = (session, total, last_x)
+        time.sleep(0.001)
+
+
+def dash_trace_reader(dash_app, device_ids, checker, stop):
+    """Runs the live stream's trace builder; each axis must get as many times as values"""
+    extended_seqs = {}
+    while not stop.is_set():
+        xs, ys, trace_indices = dash_app.collect_live_traces(device_ids, extended_seqs, 0.002)
+        for times, values, trace in zip(xs, ys, trace_indices):
+            if len(times) != len(values):
+                checker.fail('trace length mismatch', (trace, len(times), len(values)))
+        time.sleep(0.005)
+
+
+def dash_resetter(dash_app, interval, stop, counts):
+    while not stop.wait(interval):
+        dash_app.sessions.clear()
+        counts['resets'] += 1
+
+
+def simple_display_updater(simple, stop):
+    while not stop.is_set():
+        simple.update_display_data()
+        time.sleep(0.001)
+
+
+def simple_reader(simple, checker, stop):
+    """Reads the display data like animate() does"""
+    while not stop.is_set():
+        data = simple.display_data
+        checker.check_rows(data[data[:, 3] != 0]) # Generated samples never have z == 0, the empty placeholder does
+        time.sleep(0.001)
+
+
+def simple_resetter(simple, interval, stop, counts):
+    while not stop.wait(interval):
+        simple.RESET_NEEDED = True # Honoured by the next POST, as after a pause in the data flow
+        counts['resets'] += 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--target', choices=('dash', 'simple'), default='dash')
+    parser.add_argument('--devices', type=int, default=4, help='Devices, one poster thread each (simple.py has one)')
+    parser.add_argument('--readers', type=int, default=2)
+    parser.add_argument('--batch', type=int, default=25, help='Samples per POST')
+    parser.add_argument('--duration', type=float, default=5.0, help='Seconds')
+    parser.add_argument('--reset-interval', type=float, default=0.5, help='Seconds between resets, 0 = none')
+    args = parser.parse_args()
+
+    checker = Checker()
+    stop = threading.Event()
+    counts = {'resets': 0}
+    threads = []
+    quiet = contextlib.redirect_stdout(io.StringIO()) # Both apps log every request
+    with quiet:
+        if args.target == 'dash':
+            import dash_app
+            dash_app.sessions.clear()
+            flask_app = dash_app.server
+            device_ids = [f'stress{i}' for i in range(args.devices)]
+            threads += [threading.Thread(target=dash_reader, args=(dash_app, device_ids, checker, stop))
+                        for _ in range(args.readers)]
+            threads.append(threading.Thread(target=dash_trace_reader, args=(dash_app, device_ids, checker, stop)))
+            resetter = dash_resetter
+            target_module = dash_app
+        else:
+            import simple
+            flask_app = simple.app
+            device_ids = ['simple']
+            threads.append(threading.Thread(target=simple_display_updater, args=(simple, stop)))
+            threads += [threading.Thread(target=simple_reader, args=(simple, checker, stop)) for _ in range(args.readers)]
+            resetter = simple_resetter
+            target_module = simple
+        threads += [threading.Thread(target=poster, args=(flask_app, device_id, args.batch, stop, counts))
+                    for device_id in device_ids]
+        if args.reset_interval > 0:
+            threads.append(threading.Thread(target=resetter, args=(target_module, args.reset_interval, stop, counts)))
+
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+        time.sleep(args.duration)
+        stop.set()
+        for thread in threads:
+            thread.join(timeout=10)
+
+    posted = sum(count for key, count in counts.items() if key != 'resets')
+    print(f"target: {args.target}, {len(device_ids)} devices, {args.readers} readers, {args.duration:g} s")
+    print(f"samples posted: {posted}, resets: {counts['resets']}")
+    print(f"reads checked: {checker.reads}, rows checked: {checker.rows}, reads after falling a buffer behind: {checker.lapped}")
+    for check, details in checker.failures.items():
+        print(f"FAIL {check}: {len(details)}")
+        for detail in details[:MAX_REPORTED]:
+            print(f"    {detail}")
+    if not checker.failures:
+        print("OK")
+    os._exit(1 if checker.failures else 0) # Skip waiting for the app's background threads
+
+
+if __name__ == '__main__':
+    main()
@@ -1,24 +1,33 @@
 import dash
-from dash import dcc, html
+from dash import dcc, html, Patch
 from dash.dependencies import Input, Output, State
 import plotly.graph_objs as go
 from plotly.subplots import make_subplots # Added for subplots
-from collections import deque
-import zmq
-import threading
 import time
+import threading
+import functools
 import json
 import numpy as np
-from scipy import signal # For STFT
 import flask
 from flask import jsonify
-import csv # Added for CSV writing
 from datetime import datetime # Added for timestamp in filename
 import logging
 import os
 import base64
-import io
 import socket # Added for getting local IP
+import ingest # Batch decoding of Sensor Logger payloads
+import sessions as device_sessions # Per-device buffers, time bases and recorders
+import recording_format # Binary .accrec recordings
+import lod # Min/max decimation pyramid for the recording viewer
+import downsample # M4 downsampling of live batches
+import spectrogram # Streaming STFT for the spectrogram panel
+import filters # Stateful IIR filter chains applied on ingest
+import metrics # Counters/histograms exposed on /metrics
+import ingest_broker # Batches forwarded by serve.py's ingest worker processes
+import serve # Production WSGI serving
+import replay # Playback of recordings through the live ingest path
+import triggers # Threshold/magnitude/slope event capture
+import status_cache # Status fields computed once per tick for all tabs
 
 # Loglama seviyesini ayarla - sadece hata ve kritik mesajları göster
 logging.getLogger('werkzeug').setLevel(logging.ERROR)
@@ -26,47 +35,103 @@ logging.getLogger('dash').setLevel(logging.ERROR)
 logging.getLogger('flask').setLevel(logging.ERROR)
 
 # ZeroMQ Bağlantı Ayarları
+ZMQ_ENABLED = False # Also receive batches over ZeroMQ (serve.py --zmq sets this up too)
 ZMQ_SERVER = "tcp://localhost:5555"
+ZMQ_PATTERN = 'sub' # 'sub': connect to a PUB socket at ZMQ_SERVER, 'pull': bind ZMQ_SERVER for PUSH senders
+ZMQ_RCVHWM = 1000 # Messages ZeroMQ queues before it drops them (sub) or blocks the senders (pull)
 
 # Veri Tamponları - DAHA KÜÇÜK BUFFER (performans için)
-BUFFER_SIZE = 3000  # Dash'i hızlandırmak için tampon boyutunu azalt
-times_buffer = deque(maxlen=BUFFER_SIZE)
-x_buffer = deque(maxlen=BUFFER_SIZE)
-y_buffer = deque(maxlen=BUFFER_SIZE)
-z_buffer = deque(maxlen=BUFFER_SIZE)
+BUFFER_SIZE = 3000  # Dash'i hızlandırmak için tampon boyutunu azalt (per device)
+# HTTP batches are put back in time order per device: held for 'jitter' s of sensor time so late batches
+# can be merged in, released after 'max_hold' s of wall clock time at the latest; retried batches are dropped
+REASSEMBLY_OPTIONS = {'jitter': 0.25, 'max_hold': 1.0}
+REASSEMBLY_FLUSH_INTERVAL = 0.25 # s, how often held samples of devices that went quiet are checked
+sessions = device_sessions.SessionRegistry(BUFFER_SIZE, reassembly_options=REASSEMBLY_OPTIONS) # One buffer/time base/recorder per sensor source
+ZMQ_DEVICE_ID = 'zmq'
 
 # Görüntüleme ve Animasyon Ayarları
 DISPLAY_WINDOW = 10.0
 UPDATE_INTERVAL = 33  # ms (approx 30 FPS for animation)
 DATA_CHECK_INTERVAL = 25 # ms (Reverted: how often to check for new data to update traces)
+STATUS_UPDATE_INTERVAL = 1000 # ms, connection/data count/recording time and the other status fields
+# 'clientside': the browser slides the x-axis itself via Plotly.relayout, only a small clock sync is sent by the server
+# 'figure': legacy server-side animation, the whole figure is sent browser->server->browser on every frame
+ANIMATION_MODE = 'clientside'
+# 'sse': new samples are pushed to the browser over Server-Sent Events (/live-stream) as soon as they are ingested
+# 'polling': the browser polls for new samples every DATA_CHECK_INTERVAL ms
+# SSE needs the clientside animation, the legacy figure animation always polls
+LIVE_TRANSPORT = 'sse'
+USE_SSE = LIVE_TRANSPORT == 'sse' and ANIMATION_MODE == 'clientside'
+SSE_KEEPALIVE_INTERVAL = 15.0 # s, comment line sent on idle streams so dead connections are noticed
+SSE_MIN_EVENT_INTERVAL = 0.02 # s, batches arriving faster than this are coalesced into one event
+# Live traces are M4-downsampled to one bucket per pixel column (window seconds / plot width)
+DEFAULT_PLOT_WIDTH = 1000 # px, used until the browser reports the real plot width
+LIVE_POINTS_PER_PIXEL = 8 # extendData keeps at most this many points per pixel column per trace
+
+# Spectrogram panel: FFT window/hop in samples, spectral columns kept per device, refresh period
+SPECTROGRAM_WINDOW_SIZES = [128, 256, 512, 1024]
+SPECTROGRAM_HOPS = [16, 32, 64, 128, 256]
+SPECTROGRAM_COLUMNS = spectrogram.DEFAULT_COLUMNS
+SPECTROGRAM_UPDATE_INTERVAL = 250 # ms, only runs while the panel is shown
+SPECTROGRAM_DB_RANGE = (-80, 0) # Color scale limits in dB
 
 # Global state variables
-last_update_time = 0
-is_receiving_data = False
-total_points_received = 0
 receiver_active = True
-base_time = None
-initial_wall_clock_time = None
 
 # Recording state variables
 is_recording = False
 current_filename = "accelerometer_data.csv" # Default filename
-csv_writer_object = None
-output_file_stream = None
+DATA_DIRECTORY = "data"
+# Background CSV writer: flush/fsync intervals in seconds (fsync None = leave it to the OS), queue bound in blocks
+RECORDER_OPTIONS = {'flush_interval': 1.0, 'fsync_interval': 5.0, 'max_queue_blocks': 1024}
 
 # Live stream control
 live_stream_active = True
 
 # Uploaded data buffer and state
-uploaded_data_buffer = {'t': [], 'x': [], 'y': [], 'z': []}
+uploaded_recording = None # lod.MinMaxPyramid of the uploaded/opened recording
 displaying_uploaded_data = False
+LOD_MAX_POINTS = 4000 # Points per trace sent for the visible range of a recording
+
+# Trigger events are written to data/<TRIGGER_BASE_NAME>[_<device>]_<timestamp with ms>.csv/.accrec
+TRIGGER_BASE_NAME = triggers.DEFAULT_BASE_NAME
+
+# Replay of a recording from data/ through the live ingest path as device 'replay' (speed 0 = as fast as possible)
+REPLAY_SPEEDS = {1: '1×', 10: '10×', 0: 'Max'}
+replayer = None # replay.Replayer of the recording being played back
 
 # Y ekseni için başlangıç değerleri
 y_min_value = -0.1  # Y ekseni için minimum değer (artık kullanılmıyor olabilir)
 y_max_value = 0.1   # Y ekseni için maksimum değer
 
-# Performans iyileştirmeleri
-PREPROCESS_DATA = False  # Preprocessing'i bypass et, doğrudan ham veriyi göster
+# Filtreleme: filters.PRESETS içinden başlangıç zinciri, kenar çubuğundan değiştirilebilir ('none' = ham veri)
+FILTER_PRESET = 'none'
+sessions.configure_filter(filters.PRESETS[FILTER_PRESET])
+# Mean, RMS, peak-to-peak and crest factor per axis over the display window, updated on ingest (rolling_stats.py)
+sessions.configure_stats({'window_seconds': DISPLAY_WINDOW})
+
+# Metrics served on /metrics (Prometheus text format); cheap enough to stay on
+SENSOR_REQUEST_SECONDS = metrics.histogram('accel_sensor_request_seconds', 'Time to handle a /sensor POST')
+SENSOR_REQUEST_BYTES = metrics.counter('accel_sensor_request_bytes_total', 'Body bytes received on /sensor')
+SENSOR_ERRORS = metrics.counter('accel_sensor_errors_total', '/sensor requests that failed')
+SENSOR_BATCH_SIZE = metrics.histogram('accel_sensor_batch_samples', 'Accelerometer samples per /sensor POST', buckets=metrics.SIZE_BUCKETS)
+SAMPLES_INGESTED = metrics.counter('accel_samples_ingested_total', 'Accelerometer samples received', ['device'])
+CALLBACK_SECONDS = metrics.histogram('accel_callback_seconds', 'Duration of server-side callbacks and live update builds', ['callback'])
+LIVE_UPDATE_BYTES = metrics.counter('accel_live_update_bytes_total', 'Bytes of live graph updates sent over SSE')
+DASH_CALLBACK_BYTES = metrics.counter('accel_dash_callback_bytes_total', 'Bytes of Dash callback requests/responses', ['output', 'direction'])
+active_live_streams = set() # Open /live-stream connections
+broker_receiver = None # ingest_broker.BatchReceiver when serve.py runs ingest workers
+zmq_receiver = None # ingest_broker.BatchReceiver of the external ZeroMQ source
+metrics.gauge('accel_live_stream_clients', 'Open /live-stream connections', lambda: len(active_live_streams))
+metrics.gauge('accel_buffer_fill_ratio', 'Live buffer fill per device', lambda: {s.device_id: len(s.buffer) / s.buffer.capacity for s in sessions.sessions()}, ['device'])
+metrics.gauge('accel_buffered_samples_total', 'Samples appended to the live buffers since the last reset', lambda: {s.device_id: s.buffer.total_written for s in sessions.sessions()}, ['device'])
+metrics.gauge('accel_reassembly_samples', 'Samples the jitter buffers reordered, dropped as duplicates or dropped as too late', lambda: sessions.reassembly_counters, ['kind'])
+metrics.gauge('accel_recorder_backlog_samples', 'Samples queued for disk', lambda: {s.device_id: s.recorder.backlog for s in sessions.sessions() if s.recorder is not None}, ['device'])
+metrics.gauge('accel_recorder_written_samples', 'Samples written by the active recorders', lambda: {s.device_id: s.recorder.samples_written for s in sessions.sessions() if s.recorder is not None}, ['device'])
+metrics.gauge('accel_zmq_messages', 'Messages received from the ZeroMQ source, and undecodable ones', lambda: zmq_receiver and {'received': zmq_receiver.batches, 'error': zmq_receiver.errors}, ['kind'])
+metrics.gauge('accel_broker_batches', 'Batches received from the ingest workers, and malformed ones', lambda: broker_receiver and {'received': broker_receiver.batches, 'error': broker_receiver.errors}, ['kind'])
+metrics.gauge('accel_recorder_dropped_samples', 'Samples dropped by the active recorders because the queue was full', lambda: {s.device_id: s.recorder.samples_dropped for s in sessions.sessions() if s.recorder is not None}, ['device'])
+metrics.gauge('accel_status_snapshots_computed', 'Status snapshots computed for all open tabs', lambda: status_snapshots.computed)
 
 # Dash Uygulaması - Daha sessiz çalışması için bazı ayarlar
 app = dash.Dash(
@@ -78,6 +143,8 @@ app = dash.Dash(
     meta_tags=[{"name": "viewport", "content": "width=device-width, initial-scale=1"}]
 )
 
+server = app.server # WSGI entry point (serve.py, or e.g. `waitress-serve dash_app:server`)
+
 # Define CSS styles manually
 styles = {
     'status-row': {
@@ -98,6 +165,11 @@ styles = {
         'fontSize': '0.9em', # Reduced font size
         'fontWeight': 'bold'
     },
+    'stats-table': {
+        'fontSize': '0.7em',
+        'fontFamily': 'monospace',
+        'lineHeight': '1.2'
+    },
     'control-panel': {
         'display': 'flex',
         'flexWrap': 'wrap', # Allow items to wrap
@@ -165,7 +237,8 @@ styles = {
     }
 }
 
-# Function to get local IP address
+# Function to get local IP address (looked up when first shown, not at import)
+@functools.lru_cache(maxsize=None)
 def get_local_ip():
     try:
         s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
@@ -182,10 +255,17 @@ def get_local_ip():
             s.close()
     return ip
 
-LOCAL_IP_ADDRESS = get_local_ip()
+# Trace colors per overlaid device: the first device keeps the classic X/Y/Z colors
+DEVICE_TRACE_COLORS = [
+    ('blue', 'red', 'green'),
+    ('#17becf', '#ff7f0e', '#bcbd22'),
+    ('#9467bd', '#e377c2', '#8c564b'),
+    ('#1f77b4', '#d62728', '#2ca02c'),
+]
 
 # Initial figure structure for the graph (now with subplots)
-def create_initial_figure(display_window_seconds):
+# Traces are ordered per device: device j owns traces 3j (X), 3j+1 (Y) and 3j+2 (Z)
+def create_initial_figure(display_window_seconds, device_ids=(device_sessions.DEFAULT_DEVICE_ID,)):
     fig = make_subplots(
         rows=3, cols=1, 
         shared_xaxes=True, 
@@ -193,13 +273,16 @@ def create_initial_figure(display_window_seconds):
         vertical_spacing=0.05 # Reduced spacing
     )
 
-    fig.add_trace(go.Scattergl(x=[], y=[], name='X', mode='lines', line=dict(color='blue', width=1)), row=1, col=1)
-    fig.add_trace(go.Scattergl(x=[], y=[], name='Y', mode='lines', line=dict(color='red', width=1)), row=2, col=1)
-    fig.add_trace(go.Scattergl(x=[], y=[], name='Z', mode='lines', line=dict(color='green', width=1)), row=3, col=1)
+    device_ids = list(device_ids) or [device_sessions.DEFAULT_DEVICE_ID]
+    for j, device_id in enumerate(device_ids):
+        colors = DEVICE_TRACE_COLORS[j % len(DEVICE_TRACE_COLORS)]
+        for row, (axis_name, color) in enumerate(zip(('X', 'Y', 'Z'), colors), start=1):
+            name = axis_name if len(device_ids) == 1 else f'{device_id} {axis_name}'
+            fig.add_trace(go.Scattergl(x=[], y=[], name=name, legendgroup=device_id, showlegend=(row == 1), mode='lines', line=dict(color=color, width=1)), row=row, col=1)
 
     fig.update_layout(
         title_text="Accelerometer Data - Awaiting Data",
-        showlegend=False,
+        showlegend=len(device_ids) > 1,
         margin=dict(l=50, r=30, t=50, b=30), 
         uirevision='constant',
         plot_bgcolor='white'  # Set plot background to white
@@ -219,241 +302,433 @@ def create_initial_figure(display_window_seconds):
     
     return fig
 
-initial_figure = create_initial_figure(DISPLAY_WINDOW)
+# Spectrogram panel: one heatmap per axis on the same time axis as the live traces.
+# z is stored [column][frequency] and transposed for display, so new columns can be appended with extendData.
+def create_spectrogram_figure(display_window_seconds):
+    fig = make_subplots(
+        rows=3, cols=1,
+        shared_xaxes=True,
+        subplot_titles=('X Spectrum', 'Y Spectrum', 'Z Spectrum'),
+        vertical_spacing=0.05
+    )
+    for row in range(1, 4):
+        fig.add_trace(go.Heatmap(
+            x=[], y=[], z=[], transpose=True, colorscale='Viridis',
+            zmin=SPECTROGRAM_DB_RANGE[0], zmax=SPECTROGRAM_DB_RANGE[1],
+            showscale=(row == 1), colorbar=dict(title='dB', thickness=10)
+        ), row=row, col=1)
+    fig.update_layout(
+        margin=dict(l=50, r=30, t=50, b=30),
+        uirevision='constant',
+        plot_bgcolor='white'
+    )
+    fig.update_xaxes(range=[0, display_window_seconds], showgrid=False, showticklabels=False)
+    fig.update_yaxes(title_text='Hz', showgrid=False)
+    return fig
 
-# Uygulama Düzeni
-app.layout = html.Div([
-    # New Main Flex Container for Two-Column Layout
-    html.Div([
-        # Left Column (Main Content: Title, Status, Graph)
+# Uygulama Düzeni: built on the first page load rather than at import, the two plotly figures alone take
+# about 0.3 s to build; the same layout is served to every later page load
+@functools.lru_cache(maxsize=None)
+def create_layout():
+    return html.Div([
+        # New Main Flex Container for Two-Column Layout
         html.Div([
-            html.H1("Accelerometer Data", style={'textAlign': 'center', 'marginBottom': '10px'}),
+            # Left Column (Main Content: Title, Status, Graph)
             html.Div([
-                html.Div([html.H4("Connection Status:", style={'fontSize': '0.8em', 'marginTop': '0', 'marginBottom': '3px'}), html.Div(id="connection-status", style=styles['status-indicator'])], style=styles['status-container']),
-                html.Div([html.H4("Data Points:", style={'fontSize': '0.8em', 'marginTop': '0', 'marginBottom': '3px'}), html.Div(id="data-count", style=styles['status-indicator'])], style=styles['status-container']),
-                html.Div([html.H4("Last Update:", style={'fontSize': '0.8em', 'marginTop': '0', 'marginBottom': '3px'}), html.Div(id="last-update", style=styles['status-indicator'])], style=styles['status-container']),
-                html.Div([html.H4("Recording Time:", style={'fontSize': '0.8em', 'marginTop': '0', 'marginBottom': '3px'}), html.Div(id="recording-duration-display", style=styles['status-indicator'])], style=styles['status-container']),
-                html.Div([html.H4("Server IP:", style={'fontSize': '0.8em', 'marginTop': '0', 'marginBottom': '3px'}), html.Div(LOCAL_IP_ADDRESS, style=styles['status-indicator'])], style=styles['status-container'])
-            ], style=styles['status-row']),
-            dcc.Graph(id='live-graph', figure=initial_figure, config={'displayModeBar': True, 'scrollZoom': True}, style={'height': 'calc(100vh - 115px)'}, clear_on_unhover=True),
-        ], style={'flex': '1', 'paddingRight': '15px'}),
-
-        # Right Column (Sidebar: Control Panel)
-        html.Div([
-            html.Div([ # This is the existing control-panel div
-                html.Div([html.Label("Display Window (seconds):"), dcc.Slider(id='window-slider', min=2, max=30, step=1, value=DISPLAY_WINDOW, marks={str(i): str(i) for i in range(5, 35, 5)}, updatemode='mouseup')], style=styles['control-item']),
-                html.Div([html.Button('Reset', id='reset-button', n_clicks=0, style={**styles['generic-button-style'], **styles['reset-button-custom-style']})], style=styles['control-item']),
-                html.Div([html.Button("Stop Stream", id='stream-toggle-button', n_clicks=0, style=styles['generic-button-style'])], style=styles['control-item']),
+                html.H1("Accelerometer Data", style={'textAlign': 'center', 'marginBottom': '10px'}),
                 html.Div([
-                    html.Label("Recording File Name:"), 
-                    dcc.Input(id='filename-input', type='text', placeholder='recording_data.csv', value=current_filename, style=styles['filename-input-style'])
-                ], style=styles['control-item']),
+                    html.Div([html.H4("Connection Status:", style={'fontSize': '0.8em', 'marginTop': '0', 'marginBottom': '3px'}), html.Div(id="connection-status", style=styles['status-indicator'])], style=styles['status-container']),
+                    html.Div([html.H4("Data Points:", style={'fontSize': '0.8em', 'marginTop': '0', 'marginBottom': '3px'}), html.Div(id="data-count", style=styles['status-indicator'])], style=styles['status-container']),
+                    html.Div([html.H4(id="axis-stats-title", children="Axis Stats:", style={'fontSize': '0.8em', 'marginTop': '0', 'marginBottom': '3px'}), html.Div(id="axis-stats", children="--", style=styles['stats-table'])], style=styles['status-container']),
+                    html.Div([html.H4("Last Update:", style={'fontSize': '0.8em', 'marginTop': '0', 'marginBottom': '3px'}), html.Div(id="last-update", style=styles['status-indicator'])], style=styles['status-container']),
+                    html.Div([html.H4("Recording Time:", style={'fontSize': '0.8em', 'marginTop': '0', 'marginBottom': '3px'}), html.Div(id="recording-duration-display", style=styles['status-indicator'])], style=styles['status-container']),
+                    html.Div([html.H4("Server IP:", style={'fontSize': '0.8em', 'marginTop': '0', 'marginBottom': '3px'}), html.Div(get_local_ip(), style=styles['status-indicator'])], style=styles['status-container'])
+                ], style=styles['status-row']),
                 html.Div([
-                    html.Button('Start Recording', id='record-button', n_clicks=0, style=styles['record-button-style'])
-                ], style=styles['control-item']), # Removed textAlign:center from here, control-item handles alignment
-                html.Div(id='recording-status-message', children="Recording Stopped", style={**styles['recording-status-message-style'], 'width':'100%', 'textAlign':'left'}), # Ensure this message is also full width and aligned
-                html.Div([ # File Upload Section
-                    dcc.Upload(
-                        id='upload-data-component',
-                        children=html.Div(['Drag and Drop or ', html.A('Select CSV File')]),
-                        style={
-                            'width': '100%', 'height': '60px', 'lineHeight': '60px',
-                            'borderWidth': '1px', 'borderStyle': 'dashed',
-                            'borderRadius': '5px', 'textAlign': 'center', 'margin': '10px 0' 
-                        },
-                        multiple=False 
-                    ),
-                    html.Div(id='uploaded-file-info', style={'textAlign': 'center', 'fontSize': '0.9em', 'width':'100%'})
-                ], style=styles['control-item']), # control-item style applied
-                html.Div([
-                    html.Button("Clear and Return to Stream", id='clear-uploaded-button', n_clicks=0, style=styles['generic-button-style']) # generic-button-style now has width:100%
-                ], style=styles['control-item']) # control-item style applied
-            ], style={**styles['control-panel'], 'flexDirection': 'column', 'height': 'calc(100vh - 40px)', 'overflowY':'auto', 'padding':'10px'}) 
-        ], style={'width': '350px', 'minWidth':'320px', 'paddingLeft': '15px', 'borderLeft': '1px solid #ccc'}) # Sidebar has a fixed base width, can grow slightly if needed, main content takes rest
-    ], style={'display': 'flex', 'flexDirection': 'row'}), # Main flex container for columns
-    
-    # These are kept outside the two-column layout, usually for global things like intervals/stores
-    dcc.Interval(id='animation-interval', interval=UPDATE_INTERVAL, n_intervals=0),
-    dcc.Interval(id='data-check-interval', interval=DATA_CHECK_INTERVAL, n_intervals=0), 
-    dcc.Interval(id='status-update-interval', interval=1000, n_intervals=0),
-    
-    dcc.Store(id='data-arrival-counter', data=0),
-    dcc.Store(id='total-points-extended-to-graph', data=0),
-    dcc.Store(id='last-processed-point-count', data=0),
-    html.Div(id='hidden-total-points-div', style={'display': 'none'})
-], style=styles['main-container']) # Removed main-container style from the top level, applied to main flex container
-
-# ZeroMQ Veri Alıcı İş Parçacığı
-def zmq_receiver():
-    global times_buffer, x_buffer, y_buffer, z_buffer, last_update_time, is_receiving_data, total_points_received, receiver_active
-    
-    context = zmq.Context()
-    socket = context.socket(zmq.SUB)
-    socket.connect(ZMQ_SERVER)
-    socket.setsockopt_string(zmq.SUBSCRIBE, "")  # Tüm mesajları al
-    socket.setsockopt(zmq.RCVTIMEO, 1000)  # 1 saniye timeout
+                    dcc.Graph(id='live-graph', figure=create_initial_figure(DISPLAY_WINDOW), config={'displayModeBar': True, 'scrollZoom': True}, style={'height': 'calc(100vh - 115px)', 'flex': '1', 'minWidth': '0'}, clear_on_unhover=True),
+                    # Hidden until the spectrogram is switched on in the sidebar
+                    html.Div([
+                        dcc.Graph(id='spectrogram-graph', figure=create_spectrogram_figure(DISPLAY_WINDOW), config={'displayModeBar': False}, style={'height': 'calc(100vh - 115px)'})
+                    ], id='spectrogram-container', style={'display': 'none'}),
+                ], style={'display': 'flex', 'flexDirection': 'row'}),
+            ], style={'flex': '1', 'paddingRight': '15px'}),
+
+            # Right Column (Sidebar: Control Panel)
+            html.Div([
+                html.Div([ # This is the existing control-panel div
+                    html.Div([
+                        html.Label("Devices:"),
+                        dcc.Dropdown(id='device-selector', options=[], value=[], multi=True, placeholder='Waiting for devices...')
+                    ], style=styles['control-item']),
+                    html.Div([
+                        dcc.Checklist(id='spectrogram-toggle', options=[{'label': ' Show Spectrogram', 'value': 'on'}], value=[]),
+                        html.Label("FFT Window / Hop (samples):"),
+                        html.Div([
+                            dcc.Dropdown(id='spectrogram-window', options=[{'label': str(n), 'value': n} for n in SPECTROGRAM_WINDOW_SIZES], value=spectrogram.DEFAULT_WINDOW_SIZE, clearable=False, style={'flex': '1'}),
+                            dcc.Dropdown(id='spectrogram-hop', options=[{'label': str(n), 'value': n} for n in SPECTROGRAM_HOPS], value=spectrogram.DEFAULT_HOP, clearable=False, style={'flex': '1'})
+                        ], style={'display': 'flex', 'gap': '5px'})
+                    ], style=styles['control-item']),
+                    html.Div([
+                        html.Label("Filter:"),
+                        dcc.Dropdown(id='filter-selector', options=[{'label': filters.PRESET_LABELS[name], 'value': name} for name in filters.PRESETS], value=FILTER_PRESET, clearable=False),
+                        html.Div(id='filter-info', style={'fontSize': '0.8em', 'color': '#555'})
+                    ], style=styles['control-item']),
+                    html.Div([html.Label("Display Window (seconds):"), dcc.Slider(id='window-slider', min=2, max=30, step=1, value=DISPLAY_WINDOW, marks={str(i): str(i) for i in range(5, 35, 5)}, updatemode='mouseup')], style=styles['control-item']),
+                    html.Div([html.Button('Reset', id='reset-button', n_clicks=0, style={**styles['generic-button-style'], **styles['reset-button-custom-style']})], style=styles['control-item']),
+                    html.Div([html.Button("Stop Stream", id='stream-toggle-button', n_clicks=0, style=styles['generic-button-style'])], style=styles['control-item']),
+                    html.Div([
+                        html.Label("Recording File Name:"), 
+                        dcc.Input(id='filename-input', type='text', placeholder='recording_data.csv', value=current_filename, style=styles['filename-input-style'])
+                    ], style=styles['control-item']),
+                    html.Div([
+                        html.Label("Recording Format:"),
+                        dcc.RadioItems(id='record-format', options=[{'label': ' CSV', 'value': 'csv'}, {'label': ' Binary (.accrec)', 'value': 'binary'}], value='csv', inline=True, labelStyle={'marginRight': '10px'})
+                    ], style=styles['control-item']),
+                    html.Div([
+                        html.Button('Start Recording', id='record-button', n_clicks=0, style=styles['record-button-style'])
+                    ], style=styles['control-item']), # Removed textAlign:center from here, control-item handles alignment
+                    html.Div(id='recording-status-message', children="Recording Stopped", style={**styles['recording-status-message-style'], 'width':'100%', 'textAlign':'left'}), # Ensure this message is also full width and aligned
+                    html.Div([
+                        dcc.Checklist(id='trigger-toggle', options=[{'label': ' Capture Events to data/', 'value': 'on'}], value=[]),
+                        html.Label("Trigger levels (m/s², m/s³; empty = off):"),
+                        html.Div([
+                            dcc.Input(id='trigger-threshold', type='number', min=0, placeholder='|x/y/z| ≥', style={'flex': '1', 'minWidth': '0'}),
+                            dcc.Input(id='trigger-magnitude', type='number', min=0, placeholder='|a| ≥', style={'flex': '1', 'minWidth': '0'}),
+                            dcc.Input(id='trigger-slope', type='number', min=0, placeholder='slope ≥', style={'flex': '1', 'minWidth': '0'})
+                        ], style={'display': 'flex', 'gap': '5px'}),
+                        html.Label("Pre / post-trigger (seconds):"),
+                        html.Div([
+                            dcc.Input(id='trigger-pre', type='number', min=0, value=triggers.DEFAULT_PRE_SECONDS, style={'flex': '1', 'minWidth': '0'}),
+                            dcc.Input(id='trigger-post', type='number', min=0, value=triggers.DEFAULT_POST_SECONDS, style={'flex': '1', 'minWidth': '0'})
+                        ], style={'display': 'flex', 'gap': '5px'}),
+                        html.Div(id='trigger-info', style={'fontSize': '0.8em', 'color': '#555'}),
+                        html.Div(id='trigger-events', style={'fontSize': '0.8em'})
+                    ], style=styles['control-item']),
+                    html.Div([ # File Upload Section
+                        dcc.Upload(
+                            id='upload-data-component',
+                            children=html.Div(['Drag and Drop or ', html.A('Select CSV File')]),
+                            style={
+                                'width': '100%', 'height': '60px', 'lineHeight': '60px',
+                                'borderWidth': '1px', 'borderStyle': 'dashed',
+                                'borderRadius': '5px', 'textAlign': 'center', 'margin': '10px 0' 
+                            },
+                            multiple=False 
+                        ),
+                        html.Div(id='uploaded-file-info', style={'textAlign': 'center', 'fontSize': '0.9em', 'width':'100%'})
+                    ], style=styles['control-item']), # control-item style applied
+                    html.Div([
+                        html.Label("Recordings in data/:"),
+                        dcc.Dropdown(id='recording-file-selector', options=[], placeholder='Select a recording'),
+                        html.Button("Open Recording", id='open-recording-button', n_clicks=0, style={**styles['generic-button-style'], 'marginTop': '5px'})
+                    ], style=styles['control-item']),
+                    html.Div([
+                        html.Label("Replay Selected Recording:"),
+                        dcc.RadioItems(id='replay-speed', options=[{'label': f' {label}', 'value': speed} for speed, label in REPLAY_SPEEDS.items()], value=1, inline=True, labelStyle={'marginRight': '10px'}),
+                        html.Div([
+                            html.Button("Replay", id='replay-button', n_clicks=0, style=styles['generic-button-style']),
+                            html.Button("Stop Replay", id='stop-replay-button', n_clicks=0, style=styles['generic-button-style'])
+                        ], style={'display': 'flex', 'gap': '5px', 'marginTop': '5px'}),
+                        html.Div([
+                            dcc.Input(id='replay-seek-input', type='number', min=0, placeholder='Seek to (s)', style={'flex': '1', 'minWidth': '0'}),
+                            html.Button("Seek", id='replay-seek-button', n_clicks=0, style={**styles['generic-button-style'], 'width': 'auto'})
+                        ], style={'display': 'flex', 'gap': '5px', 'marginTop': '5px'}),
+                        html.Div(id='replay-status', style={'fontSize': '0.8em', 'color': '#555'})
+                    ], style=styles['control-item']),
+                    html.Div([
+                        html.Button("Clear and Return to Stream", id='clear-uploaded-button', n_clicks=0, style=styles['generic-button-style']) # generic-button-style now has width:100%
+                    ], style=styles['control-item']) # control-item style applied
+                ], style={**styles['control-panel'], 'flexDirection': 'column', 'height': 'calc(100vh - 40px)', 'overflowY':'auto', 'padding':'10px'}) 
+            ], style={'width': '350px', 'minWidth':'320px', 'paddingLeft': '15px', 'borderLeft': '1px solid #ccc'}) # Sidebar has a fixed base width, can grow slightly if needed, main content takes rest
+        ], style={'display': 'flex', 'flexDirection': 'row'}), # Main flex container for columns
     
-    # print(f"ZeroMQ alıcısı {ZMQ_SERVER} adresine bağlandı") # Keep this one if ZMQ is re-enabled
+        # These are kept outside the two-column layout, usually for global things like intervals/stores
+        dcc.Interval(id='animation-interval', interval=UPDATE_INTERVAL, n_intervals=0),
+        dcc.Interval(id='data-check-interval', interval=DATA_CHECK_INTERVAL, n_intervals=0, disabled=USE_SSE), # Idle with SSE push
+        dcc.Interval(id='status-update-interval', interval=STATUS_UPDATE_INTERVAL, n_intervals=0),
+        dcc.Interval(id='spectrogram-interval', interval=SPECTROGRAM_UPDATE_INTERVAL, n_intervals=0, disabled=True),
     
-    # Ana alıcı döngüsü
+        dcc.Store(id='data-arrival-counter', data=0),
+        dcc.Store(id='total-points-extended-to-graph', data={}), # {device_id: buffer sequence number already sent to this tab}
+        dcc.Store(id='last-processed-point-count', data=0),
+        dcc.Store(id='stream-clock', data=None), # {'epoch': initial_wall_clock_time, 'elapsed': seconds since epoch at send time}
+        dcc.Store(id='animation-sink', data=None), # Dummy output for the clientside animation callback
+        dcc.Store(id='live-stream-sink', data=None), # Dummy output for the clientside SSE connection callback
+        dcc.Store(id='status-version', data=None), # status_cache version of the status fields this tab shows
+        dcc.Store(id='axis-stats-version', data=None), # Same for the axis statistics, the trigger events and the replay status
+        dcc.Store(id='trigger-events-version', data=None),
+        dcc.Store(id='replay-status-version', data=None),
+        dcc.Store(id='spectrogram-seq', data={}), # {device_id: spectral column sequence number already sent}
+        dcc.Store(id='plot-width', data=DEFAULT_PLOT_WIDTH), # Plot area width in px, reported by the browser
+        dcc.Store(id='viewer-active', data=False), # True while a recording is shown instead of the live stream
+        dcc.Store(id='viewer-range', data=None), # Visible x-range of the recording viewer, filtered from relayoutData
+        html.Div(id='hidden-total-points-div', style={'display': 'none'})
+    ], style=styles['main-container']) # Removed main-container style from the top level, applied to main flex container
+
+app.layout = create_layout
+
+# ZeroMQ Veri Alıcısı: batches (packed binary frames or JSON, see ingest_broker.decode_message) from an
+# external source, fed through the same path as /sensor. Started when ZMQ_ENABLED or by serve.py --zmq.
+def start_zmq_receiver(endpoint=ZMQ_SERVER, pattern=ZMQ_PATTERN, hwm=ZMQ_RCVHWM):
+    global zmq_receiver
+    zmq_receiver = ingest_broker.zmq_source(ingest_batch, endpoint, pattern, hwm, default_device_id=ZMQ_DEVICE_ID)
+    zmq_receiver.start()
+    return zmq_receiver
+
+# Releases samples still held in the jitter buffers once a device stops sending
+def reassembly_flusher():
     while receiver_active:
+        time.sleep(REASSEMBLY_FLUSH_INTERVAL)
         try:
-            # ZeroMQ'dan mesaj al
-            message = socket.recv_json()
-            
-            # Gelen veriyi işle
-            if message["type"] == "accelerometer_data":
-                data = message["data"]
-                times_buffer.append(data["time"])
-                x_buffer.append(data["x"])
-                y_buffer.append(data["y"])
-                z_buffer.append(data["z"])
-                
-                # Durum güncellemesi
-                is_receiving_data = True
-                last_update_time = time.time()
-                total_points_received += 1
-            
-        except zmq.Again:
-            # Zaman aşımı - veri gelmedi
-            if time.time() - last_update_time > 3.0 and last_update_time > 0:
-                is_receiving_data = False
+            sessions.flush_stale()
         except Exception as e:
-            print(f"ZeroMQ alıcı hatası: {e}")
-    
-    # Bağlantıyı kapat
-    socket.close()
-    context.term()
-
-# Callback to check for new data and update the data-arrival-counter
-@app.callback(
-    [Output('data-arrival-counter', 'data'),
-     Output('last-processed-point-count', 'data')],
-    [Input('data-check-interval', 'n_intervals')],
-    [State('last-processed-point-count', 'data'),
-     State('data-arrival-counter', 'data')]
-)
+            print(f"Reassembly flush error: {e}")
+
+reassembly_thread = threading.Thread(target=reassembly_flusher, name='reassembly-flusher', daemon=True)
+reassembly_thread.start()
+
+# Clock sync sent to the browser for the clientside x-axis animation
+def get_stream_clock():
+    origin = sessions.origin
+    if origin is None:
+        return None
+    return {'epoch': origin, 'elapsed': time.time() - origin}
+
+# New samples of the selected devices since the per-device sequence numbers in extended_seqs (updated in place),
+# as extendData lists. Each device j owns traces 3j..3j+2; bucket_width is the M4 bucket in seconds.
+def collect_live_traces(selected_devices, extended_seqs, bucket_width):
+    xs, ys, trace_indices = [], [], []
+    for j, device_id in enumerate(selected_devices):
+        session = sessions.peek(device_id)
+        if session is None:
+            continue
+        # Rows and sequence number are read together; a reset session starts over from its first sample
+        new_samples, extended_seqs[device_id] = session.read_since(extended_seqs.get(device_id, 0))
+        if len(new_samples) == 0:
+            continue
+
+        # Keep only the first/min/max/last sample per pixel column of each axis, then
+        # put every device on the shared x-axis (time since the first sample of any device)
+        time_offset = sessions.time_offset(session)
+        for axis, (times, values) in enumerate(downsample.m4(new_samples[:, 0], new_samples[:, 1:], bucket_width)):
+            xs.append((times + time_offset).tolist())
+            ys.append(values.tolist())
+            trace_indices.append(3 * j + axis)
+    return xs, ys, trace_indices
+
+# Polling transport: check for new data and update the data-arrival-counter
 def update_data_arrival_trigger(n_intervals, last_processed_count, current_arrival_count):
-    global total_points_received
+    total_points_received = sessions.total_points_received
     if total_points_received > last_processed_count:
         new_arrival_count = current_arrival_count + 1
         # print(f"DEBUG: update_data_arrival_trigger: New data confirmed. total_pts: {total_points_received} > last_proc: {last_processed_count}. New arrival_count: {new_arrival_count}")
         return new_arrival_count, total_points_received
     return dash.no_update, dash.no_update
 
-# MODIFIED Callback: Now re-enabling extendData, still no relayoutData for Y-axis/title
-@app.callback(
-    [Output('live-graph', 'extendData'), # Re-enabled
-     Output('total-points-extended-to-graph', 'data')], 
-    [Input('data-arrival-counter', 'data')], # Trigger only on new data batch arrival
-    [State('total-points-extended-to-graph', 'data'),
-     State('last-processed-point-count', 'data'), # total_points_received when batch was flagged
-     # Inputs y-scale and window-slider removed as they don't directly affect data extension logic here
-     # Their effect on y-axis/title will be handled separately if/when that logic is re-enabled.
-    ]
-)
+# Polling transport: extendData with the samples that arrived since the last call
+@CALLBACK_SECONDS.labels('extend_data_and_update_yaxis').time()
 def extend_data_and_update_yaxis(
     arrival_count, 
-    current_total_extended, 
-    last_batch_total_received
+    extended_seqs, 
+    selected_devices,
+    window_size_value,
+    plot_width
 ):
-    global times_buffer, x_buffer, y_buffer, z_buffer 
     global live_stream_active, displaying_uploaded_data # Added displaying_uploaded_data
 
-    extend_payload = dash.no_update
-    new_total_extended_val = dash.no_update
-
     if not live_stream_active or displaying_uploaded_data: # Added displaying_uploaded_data check
-        return dash.no_update, dash.no_update 
-
-    if arrival_count is None or arrival_count == 0: 
-        return dash.no_update, dash.no_update
-
-    points_in_new_batch = last_batch_total_received - current_total_extended
-
-    if points_in_new_batch > 0:
-        # Ensure we don't try to slice more than available in deques (safety, though logic should be sound)
-        points_to_slice = min(points_in_new_batch, len(times_buffer))
-        
-        if points_to_slice > 0:
-            new_times = list(times_buffer)[-points_to_slice:]
-            new_x = list(x_buffer)[-points_to_slice:]
-            new_y = list(y_buffer)[-points_to_slice:]
-            new_z = list(z_buffer)[-points_to_slice:]
-
-            extend_payload_data = {
-                'x': [new_times, new_times, new_times], 
-                'y': [new_x, new_y, new_z]
+        return dash.no_update, dash.no_update, dash.no_update
+
+    if arrival_count is None or arrival_count == 0 or not selected_devices: 
+        return dash.no_update, dash.no_update, dash.no_update
+
+    extended_seqs = dict(extended_seqs or {})
+    plot_width = max(int(plot_width or DEFAULT_PLOT_WIDTH), 1)
+    bucket_width = (window_size_value or DISPLAY_WINDOW) / plot_width # seconds per pixel column
+    xs, ys, trace_indices = collect_live_traces(selected_devices, extended_seqs, bucket_width)
+    if not trace_indices:
+        return dash.no_update, extended_seqs, dash.no_update
+
+    extend_payload = ({'x': xs, 'y': ys}, trace_indices, LIVE_POINTS_PER_PIXEL * plot_width)
+    return extend_payload, extended_seqs, get_stream_clock()
+
+# SSE transport: (re)connect whenever the live figure is replaced (reset, device selection, back from a recording).
+# A new connection first sends everything buffered for the selected devices, then each new batch as it is ingested.
+# The event id carries the sequence numbers sent so far, so EventSource's automatic reconnect resumes without duplicates.
+LIVE_STREAM_CLIENTSIDE = """
+    function(figure, viewerActive, selectedDevices, windowSize, plotWidth) {
+        const noUpdate = window.dash_clientside.no_update;
+        const state = window._accLiveStream = window._accLiveStream || {source: null};
+        if (state.source) {
+            state.source.close();
+            state.source = null;
+        }
+        if (viewerActive || !selectedDevices || !selectedDevices.length || !window.EventSource) {
+            return noUpdate;
+        }
+        const params = new URLSearchParams({devices: selectedDevices.join(','), width: plotWidth, window: windowSize});
+        const source = new EventSource('/live-stream?' + params.toString());
+        source.onmessage = function(event) {
+            const update = JSON.parse(event.data);
+            const extendData = [{x: update.x, y: update.y}, update.traces, update.maxPoints];
+            if (window.dash_clientside.set_props) {
+                window.dash_clientside.set_props('live-graph', {extendData: extendData});
+                window.dash_clientside.set_props('stream-clock', {data: update.clock});
+            } else {
+                const graphDiv = document.querySelector('#live-graph .js-plotly-plot');
+                if (graphDiv && window.Plotly) {
+                    window.Plotly.extendTraces(graphDiv, extendData[0], extendData[1], extendData[2]);
+                }
             }
-            extend_payload = (extend_payload_data, [0, 1, 2], BUFFER_SIZE) 
-            new_total_extended_val = current_total_extended + points_to_slice # Update with actual number sliced and sent
-            # print(f"DEBUG_EXTEND: Extending with {points_to_slice} new points. Total extended to graph: {new_total_extended_val}")
-        else:
-            # This case means points_in_new_batch > 0 but len(times_buffer) was 0, or points_to_slice became 0.
-            # Should ideally not happen if data pipeline is consistent.
-            # print(f"DEBUG_EXTEND: Warning - points_in_new_batch={points_in_new_batch} but points_to_slice={points_to_slice}")
-            pass # No data to send, new_total_extended_val remains dash.no_update or its previous value
-
-    # If new_total_extended_val wasn't updated, ensure it is dash.no_update or reflects no change
-    if new_total_extended_val == dash.no_update and current_total_extended is not None:
-        new_total_extended_val = current_total_extended # No change to the count
-        
-    return extend_payload, new_total_extended_val
+        };
+        state.source = source;
+        return noUpdate;
+    }
+    """
+
+if USE_SSE:
+    app.clientside_callback(
+        LIVE_STREAM_CLIENTSIDE,
+        Output('live-stream-sink', 'data'),
+        [Input('live-graph', 'figure'),
+         Input('viewer-active', 'data')],
+        [State('device-selector', 'value'),
+         State('window-slider', 'value'), # Window width and plot width set the downsampling bucket
+         State('plot-width', 'data')]
+    )
+else:
+    app.callback(
+        [Output('data-arrival-counter', 'data'),
+         Output('last-processed-point-count', 'data')],
+        [Input('data-check-interval', 'n_intervals')],
+        [State('last-processed-point-count', 'data'),
+         State('data-arrival-counter', 'data')]
+    )(update_data_arrival_trigger)
+    app.callback(
+        [Output('live-graph', 'extendData'),
+         Output('total-points-extended-to-graph', 'data'),
+         Output('stream-clock', 'data')], # Keeps the clientside x-axis animation in sync with the server clock
+        [Input('data-arrival-counter', 'data')], # Trigger only on new data batch arrival
+        [State('total-points-extended-to-graph', 'data'),
+         State('device-selector', 'value'),
+         State('window-slider', 'value'), # Window width and plot width set the downsampling bucket
+         State('plot-width', 'data')]
+    )(extend_data_and_update_yaxis)
 
 # NEW Callback for Reset button and Initial Figure Configuration
 @app.callback(
     [Output('live-graph', 'figure', allow_duplicate=True),
      Output('total-points-extended-to-graph', 'data', allow_duplicate=True),
      Output('data-arrival-counter', 'data', allow_duplicate=True),
-     Output('last-processed-point-count', 'data', allow_duplicate=True)],
+     Output('last-processed-point-count', 'data', allow_duplicate=True),
+     Output('stream-clock', 'data', allow_duplicate=True)],
     [Input('reset-button', 'n_clicks'),
-     Input('window-slider', 'value')],
+     Input('window-slider', 'value'),
+     Input('device-selector', 'value')],
+    [State('data-arrival-counter', 'data')],
     prevent_initial_call=True
 )
-def handle_reset_and_initial_figure(reset_clicks, window_size_value):
-    global times_buffer, x_buffer, y_buffer, z_buffer, base_time, initial_wall_clock_time, total_points_received, DISPLAY_WINDOW
+def handle_reset_and_initial_figure(reset_clicks, window_size_value, selected_devices, arrival_count):
+    global DISPLAY_WINDOW
 
     ctx = dash.callback_context
     triggered_id = ctx.triggered[0]['prop_id'].split('.')[0] if ctx.triggered else None
+    selected_devices = selected_devices or []
 
     if triggered_id == 'window-slider':
         DISPLAY_WINDOW = window_size_value
+        sessions.configure_stats({'window_seconds': DISPLAY_WINDOW}) # Fresh statistics over the new window
 
     if triggered_id == 'reset-button':
-        times_buffer.clear(); x_buffer.clear(); y_buffer.clear(); z_buffer.clear()
-        base_time = None
-        initial_wall_clock_time = None
-        total_points_received = 0 
+        sessions.clear() # Drops every device session (buffers, time bases); recording continues for new data
         
-        fig = create_initial_figure(DISPLAY_WINDOW) 
-        return fig, 0, 0, 0 
+        fig = create_initial_figure(DISPLAY_WINDOW, selected_devices) 
+        return fig, {}, 0, 0, None
 
-    if triggered_id == 'window-slider' and initial_wall_clock_time is None:
-        fig = create_initial_figure(DISPLAY_WINDOW) 
-        return fig, dash.no_update, dash.no_update, dash.no_update
+    if triggered_id == 'device-selector' and not displaying_uploaded_data:
+        # Rebuild the traces for the new selection and have the extend callback resend the buffered history
+        fig = create_initial_figure(DISPLAY_WINDOW, selected_devices)
+        return fig, {}, (arrival_count or 0) + 1, dash.no_update, dash.no_update
 
-    return dash.no_update, dash.no_update, dash.no_update, dash.no_update
+    if triggered_id == 'window-slider' and sessions.origin is None:
+        fig = create_initial_figure(DISPLAY_WINDOW, selected_devices) 
+        return fig, dash.no_update, dash.no_update, dash.no_update, dash.no_update
 
-# Callback for X-axis animation (now using full figure update) - more frequent
+    return dash.no_update, dash.no_update, dash.no_update, dash.no_update, dash.no_update
+
+# Keep the device list in the sidebar up to date; select the first device automatically
 @app.callback(
-    Output('live-graph', 'figure', allow_duplicate=True),
-    [Input('animation-interval', 'n_intervals')], 
-    [State('window-slider', 'value'), 
-     State('live-graph', 'figure')],
-    prevent_initial_call=True
+    [Output('device-selector', 'options'),
+     Output('device-selector', 'value')],
+    [Input('status-update-interval', 'n_intervals')],
+    [State('device-selector', 'options'),
+     State('device-selector', 'value')]
 )
+def update_device_selector(n_intervals, current_options, selected_devices):
+    device_ids = sessions.device_ids()
+    options = [{'label': device_id, 'value': device_id} for device_id in device_ids]
+    new_value = dash.no_update
+    if not selected_devices and device_ids:
+        new_value = [device_ids[0]]
+    if options == current_options:
+        options = dash.no_update
+    return options, new_value
+
+# Clientside X-axis animation: only the axis ranges change, nothing crosses the network per frame.
+# The browser keeps its own copy of the stream origin, re-synced from 'stream-clock' whenever
+# the epoch changes or the local estimate drifts by more than 250 ms.
+ANIMATE_XAXIS_CLIENTSIDE = """
+    function(n_intervals, windowSize, clock) {
+        const noUpdate = window.dash_clientside.no_update;
+        const state = window._accAnimation = window._accAnimation || {clock: null, origin: null};
+        if (!clock) {
+            state.clock = null;
+            state.origin = null;
+            return noUpdate;
+        }
+        const now = performance.now() / 1000;
+        if (clock !== state.clock) {
+            const origin = now - clock.elapsed;
+            if (state.origin === null || state.epoch !== clock.epoch || Math.abs(origin - state.origin) > 0.25) {
+                state.origin = origin;
+                state.epoch = clock.epoch;
+            }
+            state.clock = clock;
+        }
+        const graphDiv = document.querySelector('#live-graph .js-plotly-plot');
+        if (!graphDiv || !graphDiv._fullLayout || !window.Plotly) {
+            return noUpdate;
+        }
+        const end = now - state.origin;
+        const range = [Math.max(0, end - windowSize), end];
+        const ranges = {'xaxis.range': range, 'xaxis2.range': range, 'xaxis3.range': range};
+        window.Plotly.relayout(graphDiv, ranges);
+        // The spectrogram follows at a lower rate, redrawing its heatmaps every frame is wasted work
+        const spectrogramDiv = document.querySelector('#spectrogram-graph .js-plotly-plot');
+        if (spectrogramDiv && spectrogramDiv.offsetParent !== null && spectrogramDiv._fullLayout &&
+                !(now - (state.spectrogramTime || 0) < 0.1)) {
+            state.spectrogramTime = now;
+            window.Plotly.relayout(spectrogramDiv, ranges);
+        }
+        return noUpdate;
+    }
+    """
+
+# Legacy X-axis animation (full figure update), used when ANIMATION_MODE == 'figure'
+@CALLBACK_SECONDS.labels('animate_xaxis_view').time()
 def animate_xaxis_view(n_intervals, window_size_value, current_fig):
-    global initial_wall_clock_time, DISPLAY_WINDOW, displaying_uploaded_data
+    global DISPLAY_WINDOW, displaying_uploaded_data
 
     if displaying_uploaded_data: # If showing uploaded data, don't animate
         return dash.no_update
         
     DISPLAY_WINDOW = window_size_value
 
-    if initial_wall_clock_time is None or current_fig is None:
+    origin = sessions.origin
+    if origin is None or current_fig is None:
         return dash.no_update 
 
-    current_virtual_x_end = time.time() - initial_wall_clock_time
+    current_virtual_x_end = time.time() - origin
     x_axis_start = max(0, current_virtual_x_end - DISPLAY_WINDOW)
     
     new_xaxis_range = [x_axis_start, current_virtual_x_end]
@@ -488,48 +763,271 @@ def animate_xaxis_view(n_intervals, window_size_value, current_fig):
     
     return new_fig
 
-# Callback for status indicators
+if ANIMATION_MODE == 'clientside':
+    app.clientside_callback(
+        ANIMATE_XAXIS_CLIENTSIDE,
+        Output('animation-sink', 'data'),
+        [Input('animation-interval', 'n_intervals')],
+        [State('window-slider', 'value'),
+         State('stream-clock', 'data')],
+        prevent_initial_call=True
+    )
+else:
+    app.callback(
+        Output('live-graph', 'figure', allow_duplicate=True),
+        [Input('animation-interval', 'n_intervals')], 
+        [State('window-slider', 'value'), 
+         State('live-graph', 'figure')],
+        prevent_initial_call=True
+    )(animate_xaxis_view)
+
+# Change the filter chain of every device; samples are filtered once on ingest, so it applies from the next batch on
 @app.callback(
-    [Output('connection-status', 'children'),
-     Output('connection-status', 'style'),
-     Output('data-count', 'children'),
-     Output('last-update', 'children')],
-    [Input('status-update-interval', 'n_intervals')]
+    Output('filter-info', 'children'),
+    [Input('filter-selector', 'value')]
+)
+def select_filter(preset):
+    stages = filters.PRESETS.get(preset, [])
+    if stages != sessions.filter_stages:
+        sessions.configure_filter(stages)
+    if not stages:
+        return "Raw values"
+    return "Applied to new samples: " + " -> ".join(f"{btype} {cutoff:g} Hz" for btype, cutoff in stages)
+
+# Turn the spectrogram on/off or change its FFT settings; a fresh (empty) figure is shown whenever
+# the engines are replaced, the device selection changes or the stream is reset
+@app.callback(
+    [Output('spectrogram-graph', 'figure'),
+     Output('spectrogram-container', 'style'),
+     Output('spectrogram-interval', 'disabled'),
+     Output('spectrogram-seq', 'data')],
+    [Input('spectrogram-toggle', 'value'),
+     Input('spectrogram-window', 'value'),
+     Input('spectrogram-hop', 'value'),
+     Input('device-selector', 'value'),
+     Input('reset-button', 'n_clicks'),
+     Input('clear-uploaded-button', 'n_clicks')],
+    prevent_initial_call=True
 )
-def update_status_indicators(n_intervals):
-    global is_receiving_data, total_points_received, last_update_time
+def configure_spectrogram(toggle_value, window_size, hop, selected_devices, reset_clicks, clear_clicks):
+    enabled = 'on' in (toggle_value or [])
+    options = None
+    if enabled:
+        window_size = window_size or spectrogram.DEFAULT_WINDOW_SIZE
+        options = {'window_size': window_size, 'hop': min(hop or spectrogram.DEFAULT_HOP, window_size), 'columns': SPECTROGRAM_COLUMNS}
+    if options != sessions.spectrogram_options:
+        sessions.configure_spectrogram(options)
+    style = {'flex': '1', 'minWidth': '0'} if enabled else {'display': 'none'}
+    return create_spectrogram_figure(DISPLAY_WINDOW), style, not enabled, {}
+
+# Append the spectral columns computed since the last refresh (first selected device)
+@app.callback(
+    [Output('spectrogram-graph', 'extendData'),
+     Output('spectrogram-seq', 'data', allow_duplicate=True)],
+    [Input('spectrogram-interval', 'n_intervals')],
+    [State('spectrogram-seq', 'data'),
+     State('device-selector', 'value')],
+    prevent_initial_call=True
+)
+def update_spectrogram(n_intervals, spectrogram_seqs, selected_devices):
+    if displaying_uploaded_data or not selected_devices:
+        return dash.no_update, dash.no_update
+    device_id = selected_devices[0]
+    session = sessions.peek(device_id)
+    if session is None:
+        return dash.no_update, dash.no_update
+
+    with session.lock: # The engine is updated by ingest under the same lock
+        engine = session.spectrogram
+        if engine is None:
+            return dash.no_update, dash.no_update
+        sent_seq = spectrogram_seqs.get(device_id, 0)
+        if sent_seq > engine.columns.total_written: # Engine was replaced since the last refresh
+            sent_seq = 0
+        times, magnitudes = engine.since(sent_seq)
+        times, magnitudes = times.copy(), magnitudes.copy()
+        total_columns = engine.columns.total_written
+        frequencies = engine.frequencies
+    if len(times) == 0:
+        return dash.no_update, dash.no_update
+
+    times = (times + sessions.time_offset(session)).tolist()
+    update = {
+        'x': [times] * 3,
+        'z': [np.round(magnitudes[:, axis, :], 1).tolist() for axis in range(3)],
+    }
+    if sent_seq == 0: # First columns in this figure: also set the frequency axis
+        if frequencies is None:
+            frequencies = np.arange(magnitudes.shape[2])
+        update['y'] = [np.round(frequencies, 2).tolist()] * 3
+    max_columns = max(SPECTROGRAM_COLUMNS, magnitudes.shape[2]) # Also bounds y, which is extended only once
+    return (update, [0, 1, 2], max_columns), {device_id: total_columns}
+
+# Status fields shown by every tab: computed once per tick on the server (status_cache.SnapshotCache)
+# rather than once per tab, and sent to each tab only when they changed since what it shows
+STATUS_OUTPUTS = ['connection-status.children', 'connection-status.style', 'data-count.children',
+                  'last-update.children', 'recording-duration-display.children']
+
+def compute_status():
+    total_points_received = sessions.total_points_received
+    last_update_time = sessions.last_update_time
+    is_receiving_data = last_update_time > 0
+    device_count = len(sessions.device_ids())
+    now = time.time()
     
     status_text = "No Connection"
     status_style = {'color': 'red', 'fontSize': '1.2em', 'fontWeight': 'bold'}
-    if is_receiving_data and (time.time() - last_update_time < 5): # Add a timeout for "Bağlı" status
+    if is_receiving_data and (now - last_update_time < 5): # Add a timeout for "Bağlı" status
         status_text = "Connected"
         status_style['color'] = 'green'
     
     count_text = f"{total_points_received} points"
+    if device_count > 1:
+        count_text += f" ({device_count} devices)"
+    counters = sessions.reassembly_counters
+    if any(counters.values()):
+        count_text += f" (late {counters['late']}, dup {counters['duplicate']}, dropped {counters['dropped']})"
     
     time_text_val = "No data yet"
     if last_update_time > 0:
-        seconds_ago = time.time() - last_update_time
+        seconds_ago = now - last_update_time
         if seconds_ago < 1.5 and is_receiving_data : # show "şimdi" if very recent
              time_text_val = "updated just now"
         elif seconds_ago < 60:
             time_text_val = f"{seconds_ago:.1f} seconds ago"
         else:
             time_text_val = f"{seconds_ago/60:.1f} minutes ago"
-    
-    return status_text, status_style, count_text, time_text_val
 
-# Callback for Recording Duration display
+    duration_text = "-- seconds"
+    origin = sessions.origin
+    if origin is not None:
+        duration_text = f"{now - origin:.1f} seconds"
+        backlog = sessions.recorder_backlog # Samples waiting for the recorder threads
+        if backlog > 0:
+            duration_text += f" (write backlog: {backlog})"
+        recording_errors = sessions.recording_errors
+        if recording_errors:
+            duration_text += f" (recording failed: {'; '.join(recording_errors.values())})"
+
+    return dict(zip(STATUS_OUTPUTS, (status_text, status_style, count_text, time_text_val, duration_text)))
+
+status_snapshots = status_cache.SnapshotCache(compute_status, max_age=STATUS_UPDATE_INTERVAL / 1000)
+
+# Callback for status indicators
+@app.callback(
+    [Output(*key.split('.')) for key in STATUS_OUTPUTS]
+    + [Output('status-version', 'data')],
+    [Input('status-update-interval', 'n_intervals')],
+    [State('status-version', 'data')]
+)
+def update_status_indicators(n_intervals, known_version):
+    version, changed = status_snapshots.changes(known_version)
+    if version == known_version:
+        return [dash.no_update] * (len(STATUS_OUTPUTS) + 1) # Nothing changed: the response carries no outputs
+    return [changed.get(key, dash.no_update) for key in STATUS_OUTPUTS] + [version]
+
+# The other periodic panels use their own snapshots of plain values (comparable, unlike components); a tab that
+# already shows the current version gets no_update, and the components are built only when something changed
+def snapshot_outputs(snapshots, known_version, render, output_count):
+    version, values = snapshots.get()
+    if version == known_version:
+        return [dash.no_update] * (output_count + 1)
+    rendered = render(values)
+    return (list(rendered) if output_count > 1 else [rendered]) + [version]
+
+def compute_axis_stats(device_id):
+    session = sessions.peek(device_id)
+    snapshot = session.stats_snapshot() if session is not None else None
+    if snapshot is None:
+        return None
+    return {'rows': [[f"{snapshot[key][i]:.3f}" for key in ('mean', 'rms', 'peak_to_peak')] + [f"{snapshot['crest_factor'][i]:.2f}"]
+                     for i in range(3)],
+            'title': f"Axis Stats ({device_id}, {snapshot['duration']:.1f} s):"}
+
+axis_stats_snapshots = {} # device_id -> SnapshotCache, shared by the tabs showing that device
+
+def render_axis_stats(values):
+    if values is None:
+        return "--", "Axis Stats:"
+    cell = {'padding': '0 4px', 'textAlign': 'right'}
+    header = html.Tr([html.Th("", style=cell)] + [html.Th(name, style=cell) for name in ("mean", "RMS", "p-p", "crest")])
+    rows = [html.Tr([html.Th(axis, style=cell)] + [html.Td(text, style=cell) for text in row])
+            for axis, row in zip("XYZ", values['rows'])]
+    return html.Table([header] + rows, style={'margin': '0 auto', 'borderCollapse': 'collapse'}), values['title']
+
+# Compact per-axis statistics of the first selected device over the display window (kept up to date on ingest)
+@app.callback(
+    [Output('axis-stats', 'children'),
+     Output('axis-stats-title', 'children'),
+     Output('axis-stats-version', 'data')],
+    [Input('status-update-interval', 'n_intervals')],
+    [State('device-selector', 'value'),
+     State('axis-stats-version', 'data')]
+)
+def update_axis_stats(n_intervals, selected_devices, known_version):
+    if not selected_devices:
+        return "--", "Axis Stats:", None
+    device_id = selected_devices[0]
+    snapshots = axis_stats_snapshots.get(device_id)
+    if snapshots is None:
+        snapshots = axis_stats_snapshots.setdefault(device_id, status_cache.SnapshotCache(
+            lambda: compute_axis_stats(device_id), max_age=STATUS_UPDATE_INTERVAL / 1000))
+    return snapshot_outputs(snapshots, known_version, render_axis_stats, 2)
+
+# Event capture: any filled-in level arms a trigger on every device; captures use the recording format
+@app.callback(
+    Output('trigger-info', 'children'),
+    [Input('trigger-toggle', 'value'),
+     Input('trigger-threshold', 'value'),
+     Input('trigger-magnitude', 'value'),
+     Input('trigger-slope', 'value'),
+     Input('trigger-pre', 'value'),
+     Input('trigger-post', 'value'),
+     Input('record-format', 'value')]
+)
+def configure_event_triggers(toggle, threshold, magnitude, slope, pre_seconds, post_seconds, file_format):
+    conditions = []
+    if threshold:
+        conditions.append(('threshold', 'any', float(threshold)))
+    if magnitude:
+        conditions.append(('magnitude', float(magnitude)))
+    if slope:
+        conditions.append(('slope', 'any', float(slope)))
+    if 'on' not in (toggle or []) or not conditions:
+        sessions.configure_triggers(None)
+        return "Off" if 'on' not in (toggle or []) else "Enter at least one level"
+    sessions.configure_triggers({
+        'conditions': conditions,
+        'pre_seconds': pre_seconds if pre_seconds is not None else triggers.DEFAULT_PRE_SECONDS,
+        'post_seconds': post_seconds if post_seconds is not None else triggers.DEFAULT_POST_SECONDS,
+        'directory': DATA_DIRECTORY,
+        'base_name': TRIGGER_BASE_NAME,
+        'file_format': file_format,
+    })
+    return "Armed: " + ", ".join(triggers.describe(condition) for condition in conditions)
+
+def compute_trigger_events():
+    return [f"{time.strftime('%H:%M:%S', time.localtime(event['time']))} {event['device_id']}: "
+            f"{event['condition']} ({event['value']:.2f}) → "
+            + (os.path.basename(event['filename']) if event['filename'] else "not saved (writer busy)")
+            for event in sessions.trigger_events]
+
+trigger_event_snapshots = status_cache.SnapshotCache(compute_trigger_events, max_age=STATUS_UPDATE_INTERVAL / 1000)
+
+def render_trigger_events(lines):
+    if not lines:
+        return None
+    return html.Ul([html.Li(line) for line in lines], style={'paddingLeft': '15px', 'margin': '3px 0'})
+
+# Latest captured events, newest first
 @app.callback(
-    Output('recording-duration-display', 'children'),
-    [Input('status-update-interval', 'n_intervals')] # Uses the same 1-second interval as other status updates
+    [Output('trigger-events', 'children'),
+     Output('trigger-events-version', 'data')],
+    [Input('status-update-interval', 'n_intervals')],
+    [State('trigger-events-version', 'data')]
 )
-def update_recording_duration(n_intervals):
-    global initial_wall_clock_time
-    if initial_wall_clock_time is not None:
-        duration_seconds = time.time() - initial_wall_clock_time
-        return f"{duration_seconds:.1f} seconds"
-    return "-- seconds"
+def update_trigger_events(n_intervals, known_version):
+    return snapshot_outputs(trigger_event_snapshots, known_version, render_trigger_events, 1)
 
 # Callback to toggle recording
 @app.callback(
@@ -537,11 +1035,12 @@ def update_recording_duration(n_intervals):
      Output('recording-status-message', 'children'),
      Output('filename-input', 'value')],
     [Input('record-button', 'n_clicks')],
-    [State('filename-input', 'value')],
+    [State('filename-input', 'value'),
+     State('record-format', 'value')],
     prevent_initial_call=True
 )
-def toggle_recording(n_clicks, filename_from_input):
-    global is_recording, current_filename, csv_writer_object, output_file_stream
+def toggle_recording(n_clicks, filename_from_input, file_format):
+    global is_recording, current_filename
 
     button_label = "Start Recording"
     status_message = "Recording Stopped"
@@ -556,46 +1055,36 @@ def toggle_recording(n_clicks, filename_from_input):
             if not base_name:
                 base_name = "accelerometer_data"
             
-            # Remove .csv if present, then add timestamp and .csv
-            if base_name.lower().endswith('.csv'):
-                base_name = base_name[:-4]
+            # Remove .csv/.accrec if present, then add timestamp and the extension of the chosen format
+            for extension in (recording_format.CSV_EXTENSION, recording_format.BINARY_EXTENSION):
+                if base_name.lower().endswith(extension):
+                    base_name = base_name[:-len(extension)]
             
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            
-            # Define the data directory and create it if it doesn't exist
-            data_directory = "data"
-            os.makedirs(data_directory, exist_ok=True)
-            
-            current_filename = os.path.join(data_directory, f"{base_name}_{timestamp}.csv")
-            updated_filename_for_ui = current_filename # Update UI with new timestamped name
+            file_format = file_format or 'csv'
+            current_filename = device_sessions.recording_filename(DATA_DIRECTORY, base_name, timestamp, file_format, device_sessions.DEFAULT_DEVICE_ID)
             
             try:
-                file_exists = os.path.exists(current_filename)
-                output_file_stream = open(current_filename, mode='a', newline='')
-                csv_writer_object = csv.writer(output_file_stream)
-                
-                if not file_exists or os.path.getsize(current_filename) == 0:
-                    csv_writer_object.writerow(['timestamp', 'ax', 'ay', 'az'])
+                # Each device session records to its own file; devices that show up later start recording too
+                recorded_files = sessions.start_recording(DATA_DIRECTORY, base_name, timestamp, file_format, **RECORDER_OPTIONS)
+                if recorded_files:
+                    current_filename = recorded_files[0]
+                updated_filename_for_ui = current_filename # Update UI with new timestamped name
                 
                 button_label = "Stop Recording"
-                status_message = f"Recording to: {current_filename}"
+                status_message = f"Recording to: {', '.join(recorded_files) or current_filename}"
                 final_button_style.update(styles['record-button-stop-style']) # Change to red
             except Exception as e:
                 is_recording = False 
                 status_message = f"Error: {str(e)}"
                 updated_filename_for_ui = filename_from_input # Revert UI filename on error
-                if output_file_stream:
-                    output_file_stream.close()
-                csv_writer_object = None
-                output_file_stream = None
         else:
             # Stopping recording - current_filename already holds the name of the file that was being written to
-            if output_file_stream is not None:
-                output_file_stream.close()
-                output_file_stream = None
-            csv_writer_object = None
+            recording_errors = sessions.stop_recording()
             button_label = "Start Recording"
             status_message = f"Recording Stopped: {current_filename}" # Show the name of the file that was just saved
+            if recording_errors: # A writer failed (e.g. disk full): the file ends at the failure
+                status_message += " - write failed: " + "; ".join(f"{device}: {error}" for device, error in recording_errors.items())
             updated_filename_for_ui = current_filename # Keep the saved filename in the input field
             # Button style reverts to default green (already set)
     
@@ -623,116 +1112,212 @@ def toggle_live_stream(n_clicks):
     global live_stream_active
     if n_clicks > 0:
         live_stream_active = not live_stream_active
+        sessions.set_paused(not live_stream_active) # A separate ingest process drops batches while paused
     
     if live_stream_active:
         return "Stop Stream"
     else:
         return "Start Stream"
 
+# Figure for a recording: only a screen-resolution min/max view of the full time span is sent
+def create_recording_figure(viewer, graph_title):
+    fig = make_subplots(
+        rows=3, cols=1, 
+        shared_xaxes=True, 
+        subplot_titles=('X Axis (Uploaded)', 'Y Axis (Uploaded)', 'Z Axis (Uploaded)'),
+        vertical_spacing=0.05
+    )
+    min_time, max_time = viewer.time_span
+    if max_time - min_time < 0.1: 
+        max_time = min_time + 0.1 
+    times, values = viewer.query(min_time, max_time, LOD_MAX_POINTS)
+    fig.add_trace(go.Scattergl(x=times, y=values[:, 0], name='X (Uploaded)', mode='lines', line=dict(color='blue', width=1)), row=1, col=1)
+    fig.add_trace(go.Scattergl(x=times, y=values[:, 1], name='Y (Uploaded)', mode='lines', line=dict(color='red', width=1)), row=2, col=1)
+    fig.add_trace(go.Scattergl(x=times, y=values[:, 2], name='Z (Uploaded)', mode='lines', line=dict(color='green', width=1)), row=3, col=1)
+
+    fig.update_layout(
+        title_text=graph_title,
+        height=600, 
+        showlegend=False,
+        margin=dict(l=50, r=30, t=50, b=30),
+        plot_bgcolor='white',
+        uirevision=graph_title # Keep the user's zoom while the traces are refined
+    )
+    fig.update_xaxes(
+        range=[min_time, max_time], 
+        showgrid=False,
+        showticklabels=True 
+    ) 
+    fig.update_yaxes(
+        range=[-15, 15], 
+        autorange=False, 
+        showgrid=False
+    )
+    return fig
+
+# Switch the graph from the live stream to a (n, 4) [timestamp, ax, ay, az] recording
+def show_recording(samples, graph_title):
+    global uploaded_recording, live_stream_active, displaying_uploaded_data
+    uploaded_recording = lod.MinMaxPyramid(samples)
+    live_stream_active = False
+    sessions.set_paused(True)
+    displaying_uploaded_data = True # Set to true as we are now displaying this
+    return create_recording_figure(uploaded_recording, graph_title)
+
+# Decoded bytes of a base64 string, recording_format.CSV_CHUNK_BYTES at a time
+def base64_chunks(content_string, chunk_bytes=recording_format.CSV_CHUNK_BYTES):
+    step = chunk_bytes // 3 * 4 # Whole 4-character groups, so every slice decodes on its own
+    for start in range(0, len(content_string), step):
+        yield base64.b64decode(content_string[start:start + step])
+
 # Callback to parse uploaded CSV data
 @app.callback(
     [Output('uploaded-file-info', 'children'),
      Output('stream-toggle-button', 'children', allow_duplicate=True), # To update stream button text
-     Output('live-graph', 'figure', allow_duplicate=True)], # To clear graph AND PLOT UPLOADED DATA
+     Output('live-graph', 'figure', allow_duplicate=True), # To clear graph AND PLOT UPLOADED DATA
+     Output('stream-clock', 'data', allow_duplicate=True), # Stops the clientside x-axis animation
+     Output('viewer-active', 'data', allow_duplicate=True)],
     [Input('upload-data-component', 'contents')],
     [State('upload-data-component', 'filename')],
     prevent_initial_call=True
 )
+@CALLBACK_SECONDS.labels('parse_uploaded_data').time()
 def parse_uploaded_data(contents, filename):
-    global uploaded_data_buffer, live_stream_active, displaying_uploaded_data, initial_wall_clock_time, DISPLAY_WINDOW
-    
     content_type, content_string = contents.split(',') if contents else (None, None)
     stream_button_text = "Stop Stream" 
-    new_figure_on_upload = dash.no_update
-    upload_message = dash.no_update
 
     if content_string is not None and filename is not None:
         try:
-            if 'csv' in filename.lower():
-                decoded_bytes = base64.b64decode(content_string)
-                decoded_string = decoded_bytes.decode('utf-8')
-                
-                csvfile = io.StringIO(decoded_string)
-                reader = csv.DictReader(csvfile)
-                
-                temp_t, temp_x, temp_y, temp_z = [], [], [], []
-                for row in reader:
-                    try:
-                        temp_t.append(float(row['timestamp'])) 
-                        temp_x.append(float(row['ax']))
-                        temp_y.append(float(row['ay']))
-                        temp_z.append(float(row['az']))
-                    except KeyError as ke:
-                        return f"Error: Expected column not found in CSV ({ke}). Headers should be: timestamp, ax, ay, az.", stream_button_text, dash.no_update
-                    except ValueError as ve:
-                         return f"Error: Non-numeric data in CSV ({ve}). Row: {row}", stream_button_text, dash.no_update
-
-                uploaded_data_buffer['t'] = temp_t
-                uploaded_data_buffer['x'] = temp_x
-                uploaded_data_buffer['y'] = temp_y
-                uploaded_data_buffer['z'] = temp_z
-                
-                live_stream_active = False
-                displaying_uploaded_data = True # Set to true as we are now displaying this
-                initial_wall_clock_time = None 
-                stream_button_text = "Start Stream" 
-                
-                # Create and plot the figure for uploaded data directly
-                fig = make_subplots(
-                    rows=3, cols=1, 
-                    shared_xaxes=True, 
-                    subplot_titles=('X Axis (Uploaded)', 'Y Axis (Uploaded)', 'Z Axis (Uploaded)'),
-                    vertical_spacing=0.05
-                )
-                fig.add_trace(go.Scattergl(x=uploaded_data_buffer['t'], y=uploaded_data_buffer['x'], name='X (Uploaded)', mode='lines', line=dict(color='blue', width=1)), row=1, col=1)
-                fig.add_trace(go.Scattergl(x=uploaded_data_buffer['t'], y=uploaded_data_buffer['y'], name='Y (Uploaded)', mode='lines', line=dict(color='red', width=1)), row=2, col=1)
-                fig.add_trace(go.Scattergl(x=uploaded_data_buffer['t'], y=uploaded_data_buffer['z'], name='Z (Uploaded)', mode='lines', line=dict(color='green', width=1)), row=3, col=1)
-
-                graph_title = "Uploaded Accelerometer Data"
-                if filename:
-                    graph_title += f": {filename}"
-                
-                min_time = 0
-                max_time = DISPLAY_WINDOW 
-                if uploaded_data_buffer['t']:
-                    min_time = min(uploaded_data_buffer['t'])
-                    max_time = max(uploaded_data_buffer['t'])
-                    if max_time - min_time < 0.1: 
-                        max_time = min_time + 0.1 
-
-                fig.update_layout(
-                    title_text=graph_title,
-                    height=600, 
-                    showlegend=False,
-                    margin=dict(l=50, r=30, t=50, b=30),
-                    plot_bgcolor='white'
-                )
-                fig.update_xaxes(
-                    range=[min_time, max_time], 
-                    showgrid=False,
-                    showticklabels=True 
-                ) 
-                fig.update_yaxes(
-                    range=[-15, 15], 
-                    autorange=False, 
-                    showgrid=False
-                )
-                new_figure_on_upload = fig
-                upload_message = f'{filename} uploaded and plotted ({len(temp_t)} rows).'
-
-                return upload_message, stream_button_text, new_figure_on_upload
+            if filename.lower().endswith(recording_format.BINARY_EXTENSION):
+                # Binary recordings are used in place: the samples are a view into the decoded upload
+                _, samples = recording_format.recording_from_bytes(base64.b64decode(content_string))
+            elif 'csv' in filename.lower():
+                # Decoded and parsed a chunk at a time: the upload is never held decoded as a whole
+                try:
+                    samples = recording_format.read_csv(base64_chunks(content_string), size_hint=len(content_string) // 4 * 3)
+                except ValueError as ve:
+                    return f"Error: {ve}", stream_button_text, dash.no_update, dash.no_update, dash.no_update
             else:
-                upload_message = 'Error: Please upload a CSV file.'
-                # Ensure live graph isn't accidentally cleared if it's not a CSV
-                # but still allow stream button text to update if live_stream_active was toggled by logic above
-                # However, since we only change live_stream_active on successful CSV, this might be fine
-                return upload_message, stream_button_text, dash.no_update # Return current stream_button_text
+                upload_message = 'Error: Please upload a CSV or .accrec file.'
+                # Ensure live graph isn't accidentally cleared if it's not a recording
+                return upload_message, stream_button_text, dash.no_update, dash.no_update, dash.no_update # Return current stream_button_text
+
+            fig = show_recording(samples, f"Uploaded Accelerometer Data: {filename}")
+            upload_message = f'{filename} uploaded and plotted ({len(samples)} rows).'
+            return upload_message, "Start Stream", fig, None, True
         except Exception as e:
             print(f"File processing error: {e}")
             upload_message = f'File processing error: {str(e)}'
-            return upload_message, stream_button_text, dash.no_update # Return current stream_button_text
+            return upload_message, stream_button_text, dash.no_update, dash.no_update, dash.no_update # Return current stream_button_text
     
-    return dash.no_update, dash.no_update, dash.no_update
+    return dash.no_update, dash.no_update, dash.no_update, dash.no_update, dash.no_update
+
+# Callback to list the recordings in data/ (on page load and whenever recording starts or stops)
+@app.callback(
+    Output('recording-file-selector', 'options'),
+    [Input('record-button', 'n_clicks')]
+)
+def list_recording_files(n_clicks):
+    if not os.path.isdir(DATA_DIRECTORY):
+        return []
+    names = sorted(
+        (name for name in os.listdir(DATA_DIRECTORY)
+         if name.lower().endswith((recording_format.CSV_EXTENSION, recording_format.BINARY_EXTENSION))),
+        reverse=True
+    )
+    return [{'label': name, 'value': os.path.join(DATA_DIRECTORY, name)} for name in names]
+
+# Callback to open a recording from data/ directly; binary recordings are memory-mapped, not loaded
+@app.callback(
+    [Output('uploaded-file-info', 'children', allow_duplicate=True),
+     Output('stream-toggle-button', 'children', allow_duplicate=True),
+     Output('live-graph', 'figure', allow_duplicate=True),
+     Output('stream-clock', 'data', allow_duplicate=True),
+     Output('viewer-active', 'data', allow_duplicate=True)],
+    [Input('open-recording-button', 'n_clicks')],
+    [State('recording-file-selector', 'value')],
+    prevent_initial_call=True
+)
+def open_recording_file(n_clicks, path):
+    if not n_clicks or not path:
+        return dash.no_update, dash.no_update, dash.no_update, dash.no_update, dash.no_update
+    try:
+        if path.lower().endswith(recording_format.BINARY_EXTENSION):
+            _, samples = recording_format.open_recording(path)
+        else:
+            samples = recording_format.read_csv_file(path)
+        fig = show_recording(samples, f"Recording: {os.path.basename(path)}")
+        return f'{os.path.basename(path)} opened ({len(samples)} rows).', "Start Stream", fig, None, True
+    except Exception as e:
+        print(f"File processing error: {e}")
+        return f'File processing error: {str(e)}', dash.no_update, dash.no_update, dash.no_update, dash.no_update
+
+# Report the plot area width whenever Plotly relayouts (first render, window resize); unchanged widths are not sent
+app.clientside_callback(
+    """
+    function(relayoutData, currentWidth) {
+        const graphDiv = document.querySelector('#live-graph .js-plotly-plot');
+        if (!graphDiv || !graphDiv._fullLayout || !graphDiv._fullLayout._size) {
+            return window.dash_clientside.no_update;
+        }
+        const width = Math.round(graphDiv._fullLayout._size.w);
+        return width === currentWidth ? window.dash_clientside.no_update : width;
+    }
+    """,
+    Output('plot-width', 'data'),
+    [Input('live-graph', 'relayoutData')],
+    [State('plot-width', 'data')]
+)
+
+# Zoom/pan on a recording: only relayoutData events that carry an x-range are forwarded to the server,
+# so the clientside live animation (which also relayouts) never causes a round trip
+app.clientside_callback(
+    """
+    function(relayoutData, viewerActive) {
+        const noUpdate = window.dash_clientside.no_update;
+        if (!viewerActive || !relayoutData) {
+            return noUpdate;
+        }
+        for (const axis of ['xaxis', 'xaxis2', 'xaxis3']) {
+            if (relayoutData[axis + '.autorange']) {
+                return {autorange: true};
+            }
+            if (relayoutData[axis + '.range[0]'] !== undefined) {
+                return {range: [relayoutData[axis + '.range[0]'], relayoutData[axis + '.range[1]']]};
+            }
+            if (relayoutData[axis + '.range'] !== undefined) {
+                return {range: relayoutData[axis + '.range']};
+            }
+        }
+        return noUpdate;
+    }
+    """,
+    Output('viewer-range', 'data'),
+    [Input('live-graph', 'relayoutData')],
+    [State('viewer-active', 'data')],
+    prevent_initial_call=True
+)
+
+# Callback to serve the samples for the visible range of a recording at screen resolution
+@app.callback(
+    Output('live-graph', 'figure', allow_duplicate=True),
+    [Input('viewer-range', 'data')],
+    prevent_initial_call=True
+)
+def update_recording_view(viewer_range):
+    viewer = uploaded_recording
+    if viewer is None or not displaying_uploaded_data or not viewer_range:
+        return dash.no_update
+    if viewer_range.get('autorange'):
+        t_start, t_end = viewer.time_span
+    else:
+        t_start, t_end = (float(v) for v in viewer_range['range'])
+    times, values = viewer.query(t_start, t_end, LOD_MAX_POINTS)
+    patched_figure = Patch()
+    for i in range(3):
+        patched_figure['data'][i]['x'] = times
+        patched_figure['data'][i]['y'] = values[:, i]
+    return patched_figure
 
 # Callback to clear uploaded data and return to live stream mode
 @app.callback(
@@ -741,123 +1326,249 @@ def parse_uploaded_data(contents, filename):
      Output('uploaded-file-info', 'children', allow_duplicate=True),
      Output('total-points-extended-to-graph', 'data', allow_duplicate=True),
      Output('data-arrival-counter', 'data', allow_duplicate=True),
-     Output('last-processed-point-count', 'data', allow_duplicate=True)],
+     Output('last-processed-point-count', 'data', allow_duplicate=True),
+     Output('stream-clock', 'data', allow_duplicate=True),
+     Output('viewer-active', 'data', allow_duplicate=True)],
     [Input('clear-uploaded-button', 'n_clicks')],
+    [State('device-selector', 'value')],
     prevent_initial_call=True
 )
-def clear_uploaded_data_and_reset_stream(n_clicks):
-    global uploaded_data_buffer, displaying_uploaded_data, live_stream_active, initial_wall_clock_time
-    global times_buffer, x_buffer, y_buffer, z_buffer, base_time, total_points_received, DISPLAY_WINDOW
+def clear_uploaded_data_and_reset_stream(n_clicks, selected_devices):
+    global uploaded_recording, displaying_uploaded_data, live_stream_active
 
     if n_clicks == 0:
-        return dash.no_update, dash.no_update, dash.no_update, dash.no_update, dash.no_update, dash.no_update
+        return dash.no_update, dash.no_update, dash.no_update, dash.no_update, dash.no_update, dash.no_update, dash.no_update, dash.no_update
 
-    # Clear uploaded data buffer
-    uploaded_data_buffer = {'t': [], 'x': [], 'y': [], 'z': []}
+    # Clear uploaded recording
+    uploaded_recording = None
     displaying_uploaded_data = False
     
     # Reset states for live streaming
     live_stream_active = True
-    initial_wall_clock_time = None # Will be set on next live data packet
-    base_time = None
-    total_points_received = 0
+    sessions.set_paused(False)
     
-    # Clear live data buffers as well, similar to reset button
-    times_buffer.clear()
-    x_buffer.clear()
-    y_buffer.clear()
-    z_buffer.clear()
+    # Clear live device sessions as well, similar to reset button (time bases are set on the next live data packet)
+    sessions.clear()
 
-    fig = create_initial_figure(DISPLAY_WINDOW)
+    fig = create_initial_figure(DISPLAY_WINDOW, selected_devices or [])
     stream_button_text = "Stop Stream"
     uploaded_info_text = "Uploaded data cleared. Live stream active."
     
     # Reset counters
-    new_total_extended = 0
+    new_total_extended = {}
     new_arrival_count = 0
     new_last_processed_count = 0
 
-    return fig, stream_button_text, uploaded_info_text, new_total_extended, new_arrival_count, new_last_processed_count
+    return fig, stream_button_text, uploaded_info_text, new_total_extended, new_arrival_count, new_last_processed_count, None, False
+
+# Each device has its own buffer, time base and recorder; the whole batch is one block write.
+# Shared by /sensor and the batches forwarded by serve.py's ingest workers.
+def ingest_batch(device_id, times_ns, values):
+    if not live_stream_active:
+        return
+    sessions.ingest(device_id, times_ns, values)
+    SAMPLES_INGESTED.labels(device_id).inc(len(times_ns))
+
+# Receives the batches decoded by the ingest worker processes (serve.py --ingest-workers)
+def start_ingest_broker(endpoint=ingest_broker.DEFAULT_ENDPOINT):
+    global broker_receiver
+    broker_receiver = ingest_broker.BatchReceiver(ingest_batch, endpoint)
+    broker_receiver.start()
+    return broker_receiver
+
+# Plays a recording from data/ through ingest_batch, read lazily and paced at speed (0 = as fast as possible)
+def start_replay(path, speed=1, start_time=None):
+    global replayer
+    stop_replay()
+    replayer = replay.Replayer(path, ingest_batch, speed, start_time=start_time)
+    replayer.start()
+    return replayer
+
+def stop_replay():
+    if replayer is not None:
+        replayer.stop()
+
+def replay_status():
+    if replayer is None:
+        return "No replay"
+    state = f"error: {replayer.error}" if replayer.error else "finished" if replayer.finished else REPLAY_SPEEDS.get(replayer.speed, f"{replayer.speed:g}×")
+    text = f"{os.path.basename(replayer.path)} ({state}): {replayer.position:.1f} s, {replayer.samples} samples"
+    if not live_stream_active and not replayer.finished:
+        text += " - stream stopped, press Start Stream"
+    return text
+
+replay_status_snapshots = status_cache.SnapshotCache(replay_status, max_age=STATUS_UPDATE_INTERVAL / 1000)
+
+# Replay controls; the status line is refreshed with the other status fields
+@app.callback(
+    [Output('replay-status', 'children'),
+     Output('replay-status-version', 'data')],
+    [Input('replay-button', 'n_clicks'),
+     Input('stop-replay-button', 'n_clicks'),
+     Input('replay-seek-button', 'n_clicks'),
+     Input('replay-speed', 'value'),
+     Input('status-update-interval', 'n_intervals')],
+    [State('recording-file-selector', 'value'),
+     State('replay-seek-input', 'value'),
+     State('replay-status-version', 'data')],
+    prevent_initial_call=True
+)
+def control_replay(replay_clicks, stop_clicks, seek_clicks, speed, n_intervals, path, seek_time, known_version):
+    ctx = dash.callback_context
+    triggered_id = ctx.triggered[0]['prop_id'].split('.')[0] if ctx.triggered else None
+    if triggered_id == 'status-update-interval':
+        return snapshot_outputs(replay_status_snapshots, known_version, lambda text: text, 1)
+    running = replayer is not None and not replayer.finished
+    if triggered_id in ('replay-button', 'replay-seek-button') and not running:
+        if not path:
+            return "Select a recording in data/ first", None # Not a snapshot value: the next tick sends the status again
+        start_replay(path, speed, seek_time if triggered_id == 'replay-seek-button' else None)
+    elif triggered_id == 'replay-button':
+        start_replay(path or replayer.path, speed)
+    elif triggered_id == 'replay-seek-button' and seek_time is not None:
+        replayer.seek(seek_time)
+    elif triggered_id == 'replay-speed' and running:
+        replayer.set_speed(speed)
+    elif triggered_id == 'stop-replay-button':
+        stop_replay()
+    replay_status_snapshots.invalidate() # The tabs see the new state on their next tick, this one right away
+    return snapshot_outputs(replay_status_snapshots, None, lambda text: text, 1)
+
+# Reads the sessions from the shared memory of a separate ingest process (serve.py --ingest-process)
+def use_shared_store(prefix, control_endpoint, broker_endpoint, wakeup_endpoint):
+    global sessions
+    import shared_store
+    sessions = shared_store.SharedStoreClient(prefix, control_endpoint, broker_endpoint, reassembly_options=REASSEMBLY_OPTIONS,
+                                              wakeup_endpoint=wakeup_endpoint)
+    sessions.configure_stats({'window_seconds': DISPLAY_WINDOW}) # Computed in this process, from the shared buffers
+    return sessions
 
 # HTTP endpoint to receive sensor data
 @app.server.route('/sensor', methods=['POST'])
+@SENSOR_REQUEST_SECONDS.time()
 def receive_sensor_data():
-    global times_buffer, x_buffer, y_buffer, z_buffer, last_update_time, is_receiving_data, total_points_received, base_time, initial_wall_clock_time
-    global is_recording, csv_writer_object 
     global live_stream_active # Added live_stream_active global
-    data_str = ""
+    raw_body = b""
     try:
         if not live_stream_active:
             return "OK - Stream paused", 200 # Stream paused, do nothing with data
 
-        reception_time = time.time()
-        data_str = flask.request.data.decode('utf-8')
-        parsed = json.loads(data_str)
-        acc_data = [entry for entry in parsed.get('payload', []) if entry.get('name') == 'accelerometer']
-        if not acc_data: return "OK - No accelerometer data", 200
-
-        new_points_in_batch = 0
-        if base_time is None:
-            with threading.Lock(): 
-                if base_time is None:
-                    base_time = acc_data[0]['time']
-                    initial_wall_clock_time = time.time()
-                    # print(f"DEBUG: GLOBAL initial_wall_clock_time SET to: {initial_wall_clock_time:.3f} with base_time: {base_time}")
-        
-        for entry in acc_data:
-            if base_time is None: continue
-            real_time = (entry['time'] - base_time) / 1e9
-            times_buffer.append(real_time)
-            x_buffer.append(entry['values']['x'])
-            y_buffer.append(entry['values']['y'])
-            z_buffer.append(entry['values']['z'])
-            new_points_in_batch += 1
-
-            # Write to CSV if recording is active
-            if is_recording and csv_writer_object is not None:
-                csv_writer_object.writerow([real_time, entry['values']['x'], entry['values']['y'], entry['values']['z']])
-        
-        if new_points_in_batch > 0:
-            is_receiving_data = True
-            last_update_time = time.time()
-            total_points_received_before_add = total_points_received # For debug
-            total_points_received += new_points_in_batch
-            # print(f"DEBUG: Sensor data processed. Points in batch: {new_points_in_batch}, Total global: {total_points_received} (was {total_points_received_before_add})")
+        raw_body = flask.request.get_data()
+        SENSOR_REQUEST_BYTES.inc(len(raw_body))
+        parsed = ingest.loads(raw_body)
+        times_ns, values = ingest.accelerometer_columns(parsed)
+        SENSOR_BATCH_SIZE.observe(len(times_ns))
+        if len(times_ns) == 0: return "OK - No accelerometer data", 200
+
+        device_id = device_sessions.device_id_from_request(flask.request, parsed)
+        ingest_batch(device_id, times_ns, values)
         return "OK", 200
     except Exception as e:
-        print(f"Sensor data error: {e}, Data snippet: {data_str[:200]}") # Keep this important error message
+        SENSOR_ERRORS.inc()
+        print(f"Sensor data error: {e}, Data snippet: {raw_body[:200]!r}") # Keep this important error message
         return flask.jsonify({'success': False, 'message': str(e)}), 500
 
-# Basit bir root sayfası sağlamak için
-@app.callback(
-    Output('last-data', 'children'),
-    [Input('status-update-interval', 'n_intervals')]
-)
-def update_last_data(n):
-    return json.dumps({'total_points': total_points_received, 'buffer_size': len(times_buffer)})
+def format_sse_event(data, event_id=None):
+    lines = [] if event_id is None else [f"id: {event_id}"]
+    lines.append(f"data: {json.dumps(data, separators=(',', ':'))}")
+    return "\n".join(lines) + "\n\n"
 
-# ZeroMQ alıcı iş parçacığını başlat (If still needed, otherwise can be removed)
-# receiver_thread = threading.Thread(target=zmq_receiver)
-# receiver_thread.daemon = True
-# receiver_thread.start()
+# Server-Sent Events stream of new samples for one browser tab; blocks on the session registry
+# between batches, so an idle dashboard costs one keepalive line every SSE_KEEPALIVE_INTERVAL seconds
+def live_stream_events(device_ids, extended_seqs, bucket_width, max_points):
+    stream_token = object()
+    active_live_streams.add(stream_token)
+    try:
+        yield "retry: 1000\n\n"
+        yield from _live_stream_updates(device_ids, extended_seqs, bucket_width, max_points)
+    finally:
+        active_live_streams.discard(stream_token)
+
+def _live_stream_updates(device_ids, extended_seqs, bucket_width, max_points):
+    seen_count = None
+    last_event_time = 0.0
+    build_seconds = CALLBACK_SECONDS.labels('live_stream_event')
+    while True:
+        ingest_count = sessions.wait_for_ingest(seen_count, SSE_KEEPALIVE_INTERVAL)
+        if ingest_count == seen_count:
+            yield ": keepalive\n\n"
+            continue
+        # Let fast producers (e.g. per-sample ZeroMQ) accumulate into one event
+        wait = SSE_MIN_EVENT_INTERVAL - (time.monotonic() - last_event_time)
+        if wait > 0:
+            time.sleep(wait)
+            ingest_count = sessions.ingest_count
+        seen_count = ingest_count
+        if not live_stream_active or displaying_uploaded_data:
+            continue
+        with build_seconds.time():
+            xs, ys, trace_indices = collect_live_traces(device_ids, extended_seqs, bucket_width)
+            if not trace_indices:
+                continue
+            update = {'x': xs, 'y': ys, 'traces': trace_indices, 'maxPoints': max_points, 'clock': get_stream_clock()}
+            event = format_sse_event(update, json.dumps(extended_seqs, separators=(',', ':')))
+        last_event_time = time.monotonic()
+        LIVE_UPDATE_BYTES.inc(len(event))
+        yield event
+
+@app.server.route('/live-stream')
+def live_stream():
+    args = flask.request.args
+    device_ids = [device_id for device_id in args.get('devices', '').split(',') if device_id]
+    plot_width = max(args.get('width', DEFAULT_PLOT_WIDTH, type=int), 1)
+    window_seconds = args.get('window', DISPLAY_WINDOW, type=float)
+    # Resume after an automatic reconnect: the last event id holds the sequence numbers already delivered
+    try:
+        extended_seqs = json.loads(flask.request.headers.get('Last-Event-ID') or '{}')
+    except ValueError:
+        extended_seqs = None
+    if not isinstance(extended_seqs, dict):
+        extended_seqs = {}
+    events = live_stream_events(device_ids, extended_seqs, window_seconds / plot_width, LIVE_POINTS_PER_PIXEL * plot_width)
+    return flask.Response(events, mimetype='text/event-stream', headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+# Payload sizes of Dash callbacks (the polling transport, status updates, recording viewer...)
+@app.server.after_request
+def count_dash_callback_bytes(response):
+    if flask.request.path.endswith('/_dash-update-component'):
+        body = flask.request.get_json(silent=True) or {}
+        output = str(body.get('output', ''))[:200]
+        DASH_CALLBACK_BYTES.labels(output, 'request').inc(flask.request.content_length or 0)
+        DASH_CALLBACK_BYTES.labels(output, 'response').inc(response.calculate_content_length() or 0)
+    return response
+
+@app.server.route('/metrics')
+def metrics_endpoint():
+    return flask.Response(metrics.render(), content_type=metrics.CONTENT_TYPE)
+
+# ZeroMQ alıcı iş parçacığını başlat
+if ZMQ_ENABLED:
+    start_zmq_receiver()
 
 # Uygulama kapatılırken temizlik yapacak fonksiyon
 def cleanup():
     global receiver_active
     receiver_active = False
     print("Application shutting down...")
-    # if receiver_thread.is_alive():
-    #     receiver_thread.join()
+    for receiver in (broker_receiver, zmq_receiver):
+        if receiver is not None:
+            receiver.stop()
+    stop_replay()
 
 # Loglama mesajlarını bastır
 os.environ['DASH_SILENCE_ROUTES_LOGGING'] = 'true'
 
-# Uygulamayı başlat
+def print_startup_info(port=serve.DEFAULT_PORT, ingest_port=None):
+    sensor_port = ingest_port or port
+    local_ip = get_local_ip()
+    print(f"Access at: http://{local_ip}:{port} or http://localhost:{port}")
+    print(f"HTTP endpoint for sensor data: http://{local_ip}:{sensor_port}/sensor")
+    print(f"Display window: {DISPLAY_WINDOW}s, Animation interval: {UPDATE_INTERVAL}ms, Data check interval: {DATA_CHECK_INTERVAL}ms")
+
+# Uygulamayı başlat (ingest worker'ları ve bağlama adresi için: python serve.py --help)
 if __name__ == '__main__':
     import atexit
     atexit.register(cleanup)
     print("Starting Dash application...")
-    print(f"Access at: http://{LOCAL_IP_ADDRESS}:{app.server.config.get('PORT', 8080)} or http://localhost:{app.server.config.get('PORT', 8080)}")
-    print(f"HTTP endpoint for sensor data: http://{LOCAL_IP_ADDRESS}:{app.server.config.get('PORT', 8080)}/sensor")
-    print(f"Display window: {DISPLAY_WINDOW}s, Animation interval: {UPDATE_INTERVAL}ms, Data check interval: {DATA_CHECK_INTERVAL}ms")
-    app.run(debug=False, host='0.0.0.0', port=8080) 
\ No newline at end of file
+    print_startup_info()
+    serve.serve_wsgi(server)
@@ -0,0 +1,33 @@
+import numpy as np
+
+
+def m4_indices(times, values, bucket_width):
+    """Indices of the first, min, max and last sample of every time bucket (M4)
+
+    times must be non-decreasing. Buckets are aligned to multiples of
+    bucket_width, so consecutive batches of the same stream bucket the same way.
+    Returns sorted, unique indices into times/values.
+    """
+    buckets = np.floor(times / bucket_width).astype(np.int64)
+    # Stable sort by (bucket, value): within each bucket the first entry is the min, the last the max
+    order = np.lexsort((values, buckets))
+    starts = np.flatnonzero(np.diff(buckets, prepend=buckets[0] - 1))
+    ends = np.append(starts[1:], len(buckets)) - 1
+    return np.unique(np.concatenate((starts, ends, order[starts], order[ends])))
+
+
+def m4(times, values, bucket_width):
+    """Downsample a block per axis; returns [(times, values), ...] for each column of values
+
+    Blocks that already have no more than four samples per bucket are returned as is.
+    """
+    if len(times) == 0 or bucket_width <= 0:
+        return [(times, values[:, axis]) for axis in range(values.shape[1])]
+    span = int(np.floor(times[-1] / bucket_width) - np.floor(times[0] / bucket_width)) + 1
+    if len(times) <= 4 * span:
+        return [(times, values[:, axis]) for axis in range(values.shape[1])]
+    result = []
+    for axis in range(values.shape[1]):
+        idx = m4_indices(times, values[:, axis], bucket_width)
+        result.append((times[idx], values[idx, axis]))
+    return result
@@ -0,0 +1,73 @@
+import numpy as np
+
+signal = None # scipy.signal, imported by the first chain with stages: importing it takes about 1 s
+DEFAULT_ORDER = 4 # Butterworth order of every stage
+
+# Selectable filter chains: (btype, cutoff Hz) stages applied in order
+PRESETS = {
+    'none': [],
+    'gravity': [('highpass', 0.3)],
+    'lowpass': [('lowpass', 20.0)],
+    'highpass': [('highpass', 1.0)],
+    'bandpass': [('highpass', 0.3), ('lowpass', 20.0)],
+}
+PRESET_LABELS = {
+    'none': 'Raw (no filter)',
+    'gravity': 'Gravity removal (high-pass 0.3 Hz)',
+    'lowpass': 'Low-pass 20 Hz',
+    'highpass': 'High-pass 1 Hz',
+    'bandpass': 'Gravity removal + low-pass 20 Hz',
+}
+
+
+def _import_signal():
+    global signal
+    from scipy import signal
+
+
+class FilterChain:
+    """Cascade of Butterworth stages applied to (k, 3) blocks with sosfilt
+
+    The filter state (zi) is carried from one block to the next, so every
+    sample is filtered exactly once, as it is ingested, with the same result
+    as filtering the whole stream at once. The sections are designed on the
+    first block, from its timestamps unless sample_rate is given; stages at or
+    above the Nyquist frequency are left out. The state starts at the steady
+    state for the first sample, so there is no start-up transient.
+    """
+
+    def __init__(self, stages, order=DEFAULT_ORDER, sample_rate=None):
+        self.stages = list(stages)
+        self.order = order
+        self.sample_rate = sample_rate
+        self._designed = False
+        self._sos = None
+        self._zi = None
+        if self.stages and signal is None:
+            _import_signal() # Here rather than on the first block, which the ingest path would wait for
+
+    def _design(self):
+        nyquist = self.sample_rate / 2
+        sections = [
+            signal.butter(self.order, cutoff, btype=btype, fs=self.sample_rate, output='sos')
+            for btype, cutoff in self.stages if cutoff < nyquist
+        ]
+        self._sos = np.concatenate(sections) if sections else None
+        self._designed = True
+
+    def apply(self, times, values):
+        """Filter a (k, 3) block of values sampled at times (s); returns the filtered values"""
+        if not self.stages or len(values) == 0:
+            return values
+        if not self._designed:
+            if self.sample_rate is None:
+                if len(times) < 2 or times[-1] <= times[0]:
+                    return values # Wait for a block that shows the sample rate
+                self.sample_rate = (len(times) - 1) / (times[-1] - times[0])
+            self._design()
+        if self._sos is None:
+            return values
+        if self._zi is None:
+            self._zi = signal.sosfilt_zi(self._sos)[:, :, np.newaxis] * values[0]
+        filtered, self._zi = signal.sosfilt(self._sos, values, axis=0, zi=self._zi)
+        return filtered
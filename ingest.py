@@ -0,0 +1,41 @@
+import json
+
+import numpy as np
+
+# Use a faster JSON decoder when one is installed (drop-in: both accept bytes or str)
+try:
+    import orjson
+    loads = orjson.loads
+    JSON_DECODER = 'orjson'
+except ImportError:
+    loads = json.loads
+    JSON_DECODER = 'json'
+
+SENSOR_NAME = 'accelerometer'
+
+
+def accelerometer_columns(parsed):
+    """Turn a decoded Sensor Logger body into columnar arrays in one pass
+
+    Returns (times_ns, values): an int64 array of nanosecond timestamps and a
+    (k, 3) float64 array of x, y, z values.
+    """
+    payload = parsed.get('payload', []) if isinstance(parsed, dict) else parsed
+    entries = [entry for entry in payload if entry.get('name') == SENSOR_NAME]
+    k = len(entries)
+    times_ns = np.fromiter((entry['time'] for entry in entries), dtype=np.int64, count=k)
+    values = np.fromiter(
+        (component for entry in entries
+         for component in (entry['values']['x'], entry['values']['y'], entry['values']['z'])),
+        dtype=np.float64, count=3 * k,
+    ).reshape(k, 3)
+    return times_ns, values
+
+
+def make_block(times_ns, values, base_time):
+    """Build a (k, 4) [time, x, y, z] block with times in seconds relative to base_time (ns)"""
+    block = np.empty((len(times_ns), 4), dtype=np.float64)
+    # Subtract in int64 first so nanosecond precision is not lost in float64
+    block[:, 0] = (times_ns - np.int64(base_time)) / 1e9
+    block[:, 1:] = values
+    return block
@@ -0,0 +1,188 @@
+"""ZeroMQ batch ingest: the local broker between /sensor ingest workers and the session owner, and external sources
+
+Ingest workers decode Sensor Logger bodies (the expensive, parallel part)
+and forward each batch as one multipart message of packed arrays:
+
+    [b'B1', device_id (utf-8), times_ns (int64 bytes), values ((k, 3) float64 bytes)]
+
+The owner binds a PULL socket and hands every batch to the same ingest path
+as its own /sensor route, so reassembly, filtering, recording and the live
+updates see exactly one writer per device. External ZeroMQ sources use the
+same receiver and may also send JSON (see decode_message).
+"""
+import functools
+import threading
+
+import flask
+import numpy as np
+
+import ingest
+import sessions as device_sessions
+
+DEFAULT_ENDPOINT = 'tcp://127.0.0.1:5556'
+DEFAULT_HWM = 10000 # Batches queued per socket before senders get zmq.Again
+BATCH_TAG = b'B1'
+SOCKET_PATTERNS = {'pull': 'PULL', 'sub': 'SUB'} # zmq socket types
+zmq = None # pyzmq, imported with the first socket so processes without ZeroMQ sources never load it
+
+
+def _import_zmq():
+    global zmq
+    import zmq
+
+
+def encode_batch(device_id, times_ns, values):
+    """Multipart frames of one batch"""
+    return [
+        BATCH_TAG,
+        device_id.encode(),
+        np.ascontiguousarray(times_ns, dtype='<i8').tobytes(),
+        np.ascontiguousarray(values, dtype='<f8').tobytes(),
+    ]
+
+
+def decode_batch(frames):
+    """(device_id, times_ns, values) of a multipart batch; raises ValueError if it is malformed"""
+    if len(frames) != 4 or frames[0] != BATCH_TAG:
+        raise ValueError(f"not a batch message ({len(frames)} frames)")
+    times_ns = np.frombuffer(frames[2], dtype='<i8')
+    values = np.frombuffer(frames[3], dtype='<f8')
+    if len(values) != 3 * len(times_ns):
+        raise ValueError(f"{len(times_ns)} timestamps but {len(values)} values")
+    device_id = device_sessions.sanitize_device_id(bytes(frames[1]).decode('utf-8', 'replace'))
+    return device_id, times_ns, values.reshape(-1, 3)
+
+
+def decode_message(frames, default_device_id=device_sessions.DEFAULT_DEVICE_ID):
+    """(device_id, times_ns, values) of a message from an external ZeroMQ source
+
+    Accepts a binary batch (optionally after a PUB topic frame) or a JSON
+    frame holding either a Sensor Logger HTTP push body or
+    {"type": "accelerometer_data", "deviceId": ..., "data": point or [points]}
+    with points {"time": ns, "x": ..., "y": ..., "z": ...}.
+    """
+    if len(frames) == 5 and frames[1] == BATCH_TAG:
+        frames = frames[1:]
+    if frames[0] == BATCH_TAG:
+        return decode_batch(frames)
+    parsed = ingest.loads(bytes(frames[-1]))
+    if isinstance(parsed, dict) and parsed.get('type') == 'accelerometer_data':
+        points = parsed['data']
+        points = [points] if isinstance(points, dict) else points
+        times_ns = np.fromiter((point['time'] for point in points), dtype=np.int64, count=len(points))
+        values = np.array([(point['x'], point['y'], point['z']) for point in points], dtype=np.float64).reshape(-1, 3)
+    else:
+        times_ns, values = ingest.accelerometer_columns(parsed)
+    device_id = parsed.get(device_sessions.DEVICE_ID_PAYLOAD_KEY) if isinstance(parsed, dict) else None
+    return device_sessions.sanitize_device_id(device_id or default_device_id), times_ns, values
+
+
+class BatchForwarder:
+    """Sends batches to the owner; one PUSH socket per thread, since ZeroMQ sockets are not thread safe"""
+
+    def __init__(self, endpoint=DEFAULT_ENDPOINT, hwm=DEFAULT_HWM):
+        self.endpoint = endpoint
+        self.hwm = hwm
+        _import_zmq()
+        self._context = zmq.Context.instance()
+        self._local = threading.local()
+
+    def _socket(self):
+        sock = getattr(self._local, 'socket', None)
+        if sock is None:
+            sock = self._context.socket(zmq.PUSH)
+            sock.setsockopt(zmq.SNDHWM, self.hwm)
+            sock.setsockopt(zmq.LINGER, 1000)
+            sock.connect(self.endpoint)
+            self._local.socket = sock
+        return sock
+
+    def send(self, device_id, times_ns, values):
+        """Queue one batch; False if the owner is not keeping up (or not running) and the queue is full"""
+        try:
+            self._socket().send_multipart(encode_batch(device_id, times_ns, values), flags=zmq.NOBLOCK, copy=False)
+        except zmq.Again:
+            return False
+        return True
+
+
+class BatchReceiver(threading.Thread):
+    """Calls handler(device_id, times_ns, values) for every message received on a ZeroMQ socket
+
+    By default it binds a PULL socket for binary batches (the broker side).
+    pattern='sub' subscribes to a PUB socket; bind=False connects instead of
+    binding; decode turns the message frames into the handler arguments.
+    """
+
+    def __init__(self, handler, endpoint=DEFAULT_ENDPOINT, hwm=DEFAULT_HWM, poll_interval=0.5,
+                 pattern='pull', bind=True, decode=decode_batch, name='ingest-broker'):
+        super().__init__(name=name, daemon=True)
+        self.handler = handler
+        self.endpoint = endpoint
+        self.hwm = hwm
+        self.poll_interval = poll_interval
+        self.decode = decode
+        self.batches = 0
+        self.samples = 0
+        self.errors = 0
+        self._stop_event = threading.Event()
+        # Bind here rather than in run() so a taken endpoint fails at startup
+        _import_zmq()
+        self._socket = zmq.Context.instance().socket(getattr(zmq, SOCKET_PATTERNS[pattern]))
+        self._socket.setsockopt(zmq.RCVHWM, hwm)
+        if pattern == 'sub':
+            self._socket.setsockopt(zmq.SUBSCRIBE, b'')
+        if bind:
+            self._socket.bind(endpoint)
+        else:
+            self._socket.connect(endpoint)
+
+    def stop(self):
+        self._stop_event.set()
+
+    def run(self):
+        poll_ms = int(self.poll_interval * 1000)
+        try:
+            while not self._stop_event.is_set():
+                if not self._socket.poll(poll_ms):
+                    continue
+                frames = self._socket.recv_multipart(copy=False)
+                try:
+                    device_id, times_ns, values = self.decode([frame.buffer for frame in frames])
+                    self.handler(device_id, times_ns, values)
+                    self.batches += 1
+                    self.samples += len(times_ns)
+                except Exception as e:
+                    self.errors += 1
+                    print(f"Ingest broker error: {e}")
+        finally:
+            self._socket.close(linger=0)
+
+
+def zmq_source(handler, endpoint, pattern='sub', hwm=DEFAULT_HWM, default_device_id='zmq'):
+    """Receiver for an external ZeroMQ source: connects to a PUB socket (pattern='sub') or binds a PULL socket"""
+    return BatchReceiver(handler, endpoint, hwm, pattern=pattern, bind=pattern == 'pull', name='zmq-source',
+                         decode=functools.partial(decode_message, default_device_id=default_device_id))
+
+
+def create_ingest_app(send):
+    """Flask app with only the /sensor route; send(device_id, times_ns, values) returns False when it is full"""
+    app = flask.Flask('ingest_worker')
+
+    @app.route('/sensor', methods=['POST'])
+    def receive_sensor_data():
+        raw_body = b""
+        try:
+            raw_body = flask.request.get_data()
+            parsed = ingest.loads(raw_body)
+            times_ns, values = ingest.accelerometer_columns(parsed)
+            if len(times_ns) == 0: return "OK - No accelerometer data", 200
+            device_id = device_sessions.device_id_from_request(flask.request, parsed)
+            if not send(device_id, times_ns, values):
+                return "Busy - retry", 503 # Nothing was queued, so the batch can be sent again as is
+            return "OK", 200
+        except Exception as e:
+            print(f"Sensor data error: {e}, Data snippet: {raw_body[:200]!r}")
+            return flask.jsonify({'success': False, 'message': str(e)}), 500
+
+    return app
@@ -0,0 +1,82 @@
+import numpy as np
+
+LEVEL_FACTOR = 8 # Samples per bucket between consecutive pyramid levels
+BUILD_CHUNK_ROWS = 1 << 20 # Rows read at a time when building from a memory-mapped file
+
+
+class MinMaxPyramid:
+    """Min/max decimation pyramid over a [time, x, y, z] recording
+
+    Level k summarizes buckets of LEVEL_FACTOR**k raw samples with the time of
+    the first and last sample and the per-axis min and max. A query for a time
+    range picks the coarsest level that still gives about max_points points,
+    so every peak stays visible while only screen-resolution data is sent.
+    The raw samples can be a read-only np.memmap; they are only read in chunks
+    while building and sliced when zoomed in far enough.
+    """
+
+    def __init__(self, samples):
+        self.samples = samples
+        self.times = samples[:, 0]
+        self.levels = [] # (bucket_size, t_first, t_last, vmin (m, 3), vmax (m, 3))
+        self._build()
+
+    def __len__(self):
+        return len(self.samples)
+
+    @property
+    def time_span(self):
+        if len(self.samples) == 0:
+            return 0.0, 0.0
+        return float(self.times[0]), float(self.times[-1])
+
+    def _build(self):
+        n = len(self.samples)
+        if n <= LEVEL_FACTOR:
+            return
+        # Level 1 straight from the raw samples, chunk by chunk (chunks are multiples of LEVEL_FACTOR)
+        parts = []
+        chunk = BUILD_CHUNK_ROWS - BUILD_CHUNK_ROWS % LEVEL_FACTOR
+        for start in range(0, n, chunk):
+            rows = np.asarray(self.samples[start:start + chunk])
+            parts.append(_reduce(rows[:, 0], rows[:, 0], rows[:, 1:], rows[:, 1:]))
+        level = tuple(np.concatenate(columns) for columns in zip(*parts))
+        bucket_size = LEVEL_FACTOR
+        self.levels.append((bucket_size, *level))
+        while len(level[0]) > LEVEL_FACTOR:
+            level = _reduce(*level)
+            bucket_size *= LEVEL_FACTOR
+            self.levels.append((bucket_size, *level))
+
+    def query(self, t_start, t_end, max_points):
+        """Return (times, values (k, 3)) covering [t_start, t_end] with at most ~max_points points"""
+        lo = max(int(np.searchsorted(self.times, t_start, side='left')) - 1, 0)
+        hi = min(int(np.searchsorted(self.times, t_end, side='right')) + 1, len(self.samples))
+        if hi - lo <= max_points or not self.levels:
+            rows = np.asarray(self.samples[lo:hi])
+            return rows[:, 0], rows[:, 1:]
+
+        # Finest level that fits: each bucket yields two points (first time, min) and (last time, max)
+        for bucket_size, t_first, t_last, vmin, vmax in self.levels:
+            if 2 * (hi - lo) / bucket_size <= max_points:
+                break
+        b_lo, b_hi = lo // bucket_size, -(-hi // bucket_size)
+        times = np.empty(2 * (b_hi - b_lo))
+        values = np.empty((2 * (b_hi - b_lo), 3))
+        times[0::2] = t_first[b_lo:b_hi]
+        times[1::2] = t_last[b_lo:b_hi]
+        values[0::2] = vmin[b_lo:b_hi]
+        values[1::2] = vmax[b_lo:b_hi]
+        return times, values
+
+
+def _reduce(t_first, t_last, vmin, vmax):
+    """Merge every LEVEL_FACTOR consecutive buckets (the last one may be partial)"""
+    m = len(t_first)
+    starts = np.arange(0, m, LEVEL_FACTOR)
+    return (
+        t_first[starts],
+        t_last[np.minimum(starts + LEVEL_FACTOR, m) - 1],
+        np.minimum.reduceat(vmin, starts, axis=0),
+        np.maximum.reduceat(vmax, starts, axis=0),
+    )
@@ -0,0 +1,204 @@
+"""Lightweight counters, histograms and gauges rendered in the Prometheus text format
+
+No client library needed: every metric is a few floats behind a lock, cheap
+enough to stay on in the ingest and callback hot paths (about a microsecond
+per update). Gauges are functions evaluated only when /metrics is scraped.
+"""
+import bisect
+import functools
+import threading
+import time
+
+DURATION_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+SIZE_BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 10000)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in pairs)
+    return '{' + ','.join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values, **kwargs):
+        """Child metric for one combination of label values (created on first use)"""
+        key = tuple(str(v) for v in values) or tuple(str(kwargs[name]) for name in self.labelnames)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _samples(self):
+        if not self.labelnames:
+            yield from self._children_samples((), self._children.get(()) or self._new_child())
+            return
+        for key, child in list(self._children.items()):
+            yield from self._children_samples(key, child)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.kind}']
+        lines += [f'{name}{labels} {_format_value(value)}' for name, labels, value in self._samples()]
+        return '\n'.join(lines)
+
+
+class _CounterChild:
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+
+class Counter(_Metric):
+    kind = 'counter'
+    _new_child = _CounterChild
+
+    def inc(self, amount=1):
+        self.labels().inc(amount)
+
+    def _children_samples(self, key, child):
+        yield self.name, _format_labels(self.labelnames, key), child.value
+
+
+class _HistogramChild:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1) # Last slot is +Inf
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+
+    def time(self):
+        return _Timer(self)
+
+
+class _Timer:
+    """Observes the elapsed seconds; usable as a context manager or a decorator"""
+
+    def __init__(self, histogram):
+        self._histogram = histogram
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._histogram.observe(time.perf_counter() - self._start)
+
+    def __call__(self, func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self._histogram.observe(time.perf_counter() - start)
+        return wrapper
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, labelnames=(), buckets=DURATION_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, help_text, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value):
+        self.labels().observe(value)
+
+    def time(self):
+        return self.labels().time()
+
+    def _children_samples(self, key, child):
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float('inf'),), child.counts):
+            cumulative += count
+            yield f'{self.name}_bucket', _format_labels(self.labelnames, key, [('le', _format_value(float(bound)))]), cumulative
+        yield f'{self.name}_sum', _format_labels(self.labelnames, key), child.sum
+        yield f'{self.name}_count', _format_labels(self.labelnames, key), cumulative
+
+
+class Gauge(_Metric):
+    """Value computed at scrape time: func() returns a number, or {label values tuple: number}"""
+    kind = 'gauge'
+
+    def __init__(self, name, help_text, func, labelnames=()):
+        super().__init__(name, help_text, labelnames)
+        self.func = func
+
+    def _samples(self):
+        value = self.func()
+        if not self.labelnames:
+            if value is not None:
+                yield self.name, '', value
+            return
+        for key, item in (value or {}).items():
+            key = key if isinstance(key, tuple) else (key,)
+            yield self.name, _format_labels(self.labelnames, key), item
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, help_text, labelnames=()):
+        return self.register(Counter(name, help_text, labelnames))
+
+    def histogram(self, name, help_text, labelnames=(), buckets=DURATION_BUCKETS):
+        return self.register(Histogram(name, help_text, labelnames, buckets))
+
+    def gauge(self, name, help_text, func, labelnames=()):
+        return self.register(Gauge(name, help_text, func, labelnames))
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format"""
+        parts = []
+        for metric in list(self._metrics):
+            try:
+                parts.append(metric.render())
+            except Exception as e: # A broken gauge must not take the whole endpoint down
+                parts.append(f'# {metric.name} unavailable: {e}')
+        return '\n'.join(parts) + '\n'
+
+
+REGISTRY = Registry()
+counter = REGISTRY.counter
+histogram = REGISTRY.histogram
+gauge = REGISTRY.gauge
+render = REGISTRY.render
@@ -0,0 +1,139 @@
+import time
+from collections import deque
+
+import numpy as np
+
+DEFAULT_JITTER = 0.25 # s of sensor time a sample is held back for late batches to be merged in front of it
+DEFAULT_MAX_HOLD = 1.0 # s of wall clock time after which held samples are released even without newer data
+DEFAULT_HISTORY = 8192 # Released timestamps remembered to tell retried (duplicate) samples from dropped ones
+
+
+class Reassembler:
+    """Jitter buffer that puts HTTP batches back in time order and drops duplicates
+
+    Samples are keyed on their nanosecond sensor time. Each push merges the
+    batch into a small sorted pending buffer and releases, in order, every
+    sample that is more than `jitter` seconds older than the newest one seen.
+    Late batches that arrive within the jitter window are merged into place;
+    samples with a time that was already released or is already pending are
+    duplicates (e.g. a retried request), other samples behind the release
+    point are dropped. Samples held for longer than `max_hold` (the device
+    paused) are released before the next batch is merged, so that batch is
+    still held back for the ones sent before it. The work per push is
+    O(batch + pending).
+    """
+
+    def __init__(self, jitter=DEFAULT_JITTER, max_hold=DEFAULT_MAX_HOLD, history=DEFAULT_HISTORY):
+        self.jitter_ns = int(jitter * 1e9)
+        self.max_hold = max_hold
+        self.history = history
+        self.late_samples = 0 # Arrived after a newer sample, merged into place
+        self.duplicate_samples = 0 # Same timestamp as a pending or released sample
+        self.dropped_samples = 0 # Arrived after their place was already released
+        self.released_samples = 0
+        self.clear()
+
+    def clear(self):
+        self._times = np.empty(0, dtype=np.int64)
+        self._values = np.empty((0, 3), dtype=np.float64)
+        self._released = deque() # Chunks of the most recently released timestamps
+        self._released_count = 0
+        self.watermark = None # Newest released timestamp
+        self.newest = None # Newest timestamp seen
+        self._held_since = None # Wall clock time the oldest pending sample has been waiting since
+
+    @property
+    def pending(self):
+        return len(self._times)
+
+    def push(self, times_ns, values, now=None):
+        """Add a batch; returns the (times_ns, values) that are ready, in time order"""
+        now = time.monotonic() if now is None else now
+        held = self._release(now) if self._held_too_long(now) else None # Not merged with the batch after a pause
+        times_ns = np.asarray(times_ns, dtype=np.int64)
+        values = np.asarray(values, dtype=np.float64)
+        if len(times_ns):
+            if np.any(times_ns[1:] < times_ns[:-1]):
+                order = np.argsort(times_ns, kind='stable')
+                times_ns, values = times_ns[order], values[order]
+            keep = np.ones(len(times_ns), dtype=bool)
+            keep[1:] = times_ns[1:] != times_ns[:-1]
+            self.duplicate_samples += len(keep) - int(np.count_nonzero(keep))
+            if self.watermark is not None:
+                behind = keep & (times_ns <= self.watermark)
+                if behind.any():
+                    was_released = self._was_released(times_ns[behind])
+                    self.duplicate_samples += int(np.count_nonzero(was_released))
+                    self.dropped_samples += int(np.count_nonzero(~was_released))
+                    keep &= ~behind
+            if len(self._times):
+                pos = np.minimum(np.searchsorted(self._times, times_ns), len(self._times) - 1)
+                already_pending = keep & (self._times[pos] == times_ns)
+                self.duplicate_samples += int(np.count_nonzero(already_pending))
+                keep &= ~already_pending
+            times_ns, values = times_ns[keep], values[keep]
+        if len(times_ns):
+            self._merge(times_ns, values, now)
+        released = self._release(now)
+        if held is None or not len(released[0]):
+            return held or released
+        return np.concatenate((held[0], released[0])), np.concatenate((held[1], released[1]))
+
+    def flush_stale(self, now=None):
+        """Release held samples whose max_hold has expired (call periodically when batches may stop)"""
+        return self._release(time.monotonic() if now is None else now)
+
+    def flush(self):
+        """Release everything that is pending"""
+        return self._release(None, everything=True)
+
+    def _merge(self, times_ns, values, now):
+        if self.newest is not None:
+            self.late_samples += int(np.count_nonzero(times_ns < self.newest))
+        if not len(self._times):
+            self._times, self._values = times_ns, values
+            self._held_since = now
+        elif times_ns[0] > self._times[-1]:
+            self._times = np.concatenate((self._times, times_ns))
+            self._values = np.concatenate((self._values, values))
+        else:
+            merged_times = np.concatenate((self._times, times_ns))
+            order = np.argsort(merged_times, kind='stable')
+            self._times = merged_times[order]
+            self._values = np.concatenate((self._values, values))[order]
+        self.newest = int(self._times[-1]) if self.newest is None else max(self.newest, int(self._times[-1]))
+
+    def _release(self, now, everything=False):
+        if not len(self._times):
+            return self._times[:0], self._values[:0]
+        if everything or self._held_too_long(now):
+            n = len(self._times)
+        else:
+            n = int(np.searchsorted(self._times, self.newest - self.jitter_ns, side='right'))
+        if n == 0:
+            return self._times[:0], self._values[:0]
+        times_ns, values = self._times[:n], self._values[:n]
+        self._times, self._values = self._times[n:], self._values[n:]
+        if len(self._times):
+            self._held_since = now if now is not None else time.monotonic()
+        self.watermark = int(times_ns[-1])
+        self.released_samples += n
+        self._remember(times_ns)
+        return times_ns, values
+
+    def _held_too_long(self, now):
+        return len(self._times) > 0 and self.max_hold is not None and now - self._held_since >= self.max_hold
+
+    def _remember(self, times_ns):
+        self._released.append(times_ns)
+        self._released_count += len(times_ns)
+        while self._released_count - len(self._released[0]) >= self.history:
+            self._released_count -= len(self._released.popleft())
+
+    def _was_released(self, times_ns):
+        """Which of these timestamps (all <= watermark) are among the remembered released ones"""
+        if not self._released:
+            return np.zeros(len(times_ns), dtype=bool)
+        released = np.concatenate(self._released)
+        pos = np.minimum(np.searchsorted(released, times_ns), len(released) - 1)
+        return released[pos] == times_ns
@@ -0,0 +1,162 @@
+import os
+import queue
+import threading
+import time
+
+import numpy as np
+
+import metrics
+import recording_format
+
+CSV_HEADER = 'timestamp,ax,ay,az\n'
+CSV_ROW_FORMAT = '%r,%r,%r,%r\n' # Shortest round-trip float text, same as csv.writer
+
+DEFAULT_FLUSH_INTERVAL = 1.0 # s, how often buffered rows are handed to the OS
+DEFAULT_FSYNC_INTERVAL = 5.0 # s, how often the file is forced to disk (None = never)
+DEFAULT_MAX_QUEUE_BLOCKS = 1024 # Blocks waiting for the writer thread before new ones are dropped
+DEFAULT_CLOSE_TIMEOUT = 5.0 # s close() waits for the writer thread to drain and fsync
+
+WRITE_SECONDS = metrics.histogram('accel_recorder_write_seconds', 'Time to format and write one batch of queued blocks', ['format'])
+
+
+class AsyncRecorder:
+    """Writes [time, x, y, z] blocks to a CSV or binary (.accrec) file from a dedicated thread
+
+    The request thread only enqueues blocks (never blocks on disk). The writer
+    thread drains the queue, formats whole blocks at once and writes them to a
+    buffered file, flushing and fsync'ing on configurable intervals. When the
+    queue is full, new blocks are dropped and counted instead of stalling ingest.
+    If writing fails (e.g. disk full), the error is kept in `error` and the
+    writer thread goes on draining the queue, dropping and counting the
+    blocks, so neither ingest nor close() ever waits on a dead writer.
+    """
+
+    def __init__(self, filename, flush_interval=DEFAULT_FLUSH_INTERVAL,
+                 fsync_interval=DEFAULT_FSYNC_INTERVAL, max_queue_blocks=DEFAULT_MAX_QUEUE_BLOCKS,
+                 file_format='csv', metadata=None, close_timeout=DEFAULT_CLOSE_TIMEOUT):
+        if file_format not in ('csv', 'binary'):
+            raise ValueError(f"Unknown recording format: {file_format}")
+        self.filename = filename
+        self.file_format = file_format
+        self.flush_interval = flush_interval
+        self.fsync_interval = fsync_interval
+        self.close_timeout = close_timeout
+        self.error = None # Text of the first write failure; nothing is written after it
+        self.samples_written = 0
+        self.samples_dropped = 0
+        self._queued_samples = 0
+        self._counter_lock = threading.Lock()
+        self._queue = queue.Queue(maxsize=max_queue_blocks)
+        self._file = open(filename, mode='ab', buffering=1024 * 1024)
+        if self._file.tell() == 0:
+            if file_format == 'binary':
+                self._file.write(recording_format.encode_header(metadata))
+            else:
+                self._file.write(CSV_HEADER.encode('ascii'))
+        self._thread = threading.Thread(target=self._run, name=f'recorder:{os.path.basename(filename)}', daemon=True)
+        self._thread.start()
+
+    def write_block(self, block):
+        """Queue a (k, 4) block for writing; returns False if it was dropped"""
+        k = len(block)
+        if k == 0:
+            return True
+        if self.error is not None:
+            with self._counter_lock:
+                self.samples_dropped += k
+            return False
+        # Count before enqueueing so the writer thread never drives the backlog negative
+        with self._counter_lock:
+            self._queued_samples += k
+        try:
+            self._queue.put_nowait(np.array(block, dtype=np.float64, copy=True))
+        except queue.Full:
+            with self._counter_lock:
+                self._queued_samples -= k
+                self.samples_dropped += k
+            return False
+        return True
+
+    @property
+    def backlog(self):
+        """Samples queued but not yet written"""
+        return self._queued_samples
+
+    def close(self):
+        """Write everything still queued, fsync and close the file, waiting at most close_timeout seconds"""
+        deadline = time.monotonic() + self.close_timeout
+        try:
+            self._queue.put(None, timeout=self.close_timeout)
+        except queue.Full:
+            pass
+        self._thread.join(max(0.0, deadline - time.monotonic()))
+        if self._thread.is_alive() and self.error is None:
+            self.error = f"Writer did not finish within {self.close_timeout:g} s"
+
+    def _run(self):
+        last_flush = last_fsync = time.monotonic()
+        while True:
+            try:
+                block = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                block = ()
+            blocks = [block]
+            # Drain whatever else is waiting so it goes out in one write
+            while block is not None:
+                try:
+                    block = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                blocks.append(block)
+            closing = blocks[-1] is None
+            if closing:
+                blocks.pop()
+            blocks = [b for b in blocks if len(b)]
+
+            if self.error is None:
+                try:
+                    self._write_blocks(blocks)
+                    blocks = []
+                    now = time.monotonic()
+                    if closing or now - last_flush >= self.flush_interval:
+                        self._file.flush()
+                        last_flush = now
+                        if closing or (self.fsync_interval is not None and now - last_fsync >= self.fsync_interval):
+                            os.fsync(self._file.fileno())
+                            last_fsync = now
+                except Exception as e:
+                    self._fail(e)
+            self._drop_blocks(blocks) # Not written because the writer failed
+            if closing:
+                try:
+                    self._file.close()
+                except Exception as e:
+                    self._fail(e)
+                return
+
+    def _fail(self, error):
+        if self.error is None:
+            self.error = f"{type(error).__name__}: {error}"
+            print(f"Recorder error ({self.filename}): {self.error}")
+
+    def _drop_blocks(self, blocks):
+        k = sum(len(b) for b in blocks)
+        if k:
+            with self._counter_lock:
+                self._queued_samples -= k
+                self.samples_dropped += k
+
+    def _write_blocks(self, blocks):
+        if not blocks:
+            return
+        data = np.concatenate(blocks) if len(blocks) > 1 else blocks[0]
+        with WRITE_SECONDS.labels(self.file_format).time():
+            if self.file_format == 'binary':
+                self._file.write(recording_format.encode_rows(data))
+            else:
+                # Format the whole batch with a single % operation
+                text = (CSV_ROW_FORMAT * len(data)) % tuple(data.ravel().tolist())
+                self._file.write(text.encode('ascii'))
+        with self._counter_lock:
+            self.samples_written += len(data)
+            self._queued_samples -= len(data)
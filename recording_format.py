@@ -0,0 +1,229 @@
+"""Binary columnar recording format (.accrec)
+
+Layout:
+    8 bytes   magic b'ACCREC01'
+    4 bytes   little-endian uint32 length of the JSON metadata
+    N bytes   UTF-8 JSON metadata (columns, dtype, sample_rate, device_id, ...)
+    padding   spaces up to a 64-byte boundary
+    data      little-endian float64 rows of [timestamp, ax, ay, az]
+
+The row count is not stored; it follows from the file size, so a recording is
+valid at any point while it is being appended to (a torn last row is ignored)
+and can be memory-mapped directly.
+"""
+import csv
+import io
+import json
+import os
+import struct
+from datetime import datetime
+
+import numpy as np
+
+MAGIC = b'ACCREC01'
+BINARY_EXTENSION = '.accrec'
+CSV_EXTENSION = '.csv'
+COLUMNS = ('timestamp', 'ax', 'ay', 'az')
+DTYPE = np.dtype('<f8')
+ROW_BYTES = DTYPE.itemsize * len(COLUMNS)
+HEADER_ALIGNMENT = 64
+CSV_CHUNK_BYTES = 4 * 1024 * 1024 # Text parsed per step by read_csv
+_PREFIX = struct.Struct('<8sI')
+
+
+def encode_header(metadata=None):
+    """Header bytes for a new recording, padded so the data starts 64-byte aligned"""
+    meta = {
+        'version': 1,
+        'columns': list(COLUMNS),
+        'dtype': DTYPE.str,
+        'time_unit': 's',
+        'created': datetime.now().isoformat(timespec='seconds'),
+        **(metadata or {}),
+    }
+    body = json.dumps(meta).encode('utf-8')
+    size = _PREFIX.size + len(body)
+    padding = (-size) % HEADER_ALIGNMENT
+    return _PREFIX.pack(MAGIC, len(body) + padding) + body + b' ' * padding
+
+
+def decode_header(buffer):
+    """Return (metadata, data_offset) for the bytes at the start of a recording"""
+    if len(buffer) < _PREFIX.size:
+        raise ValueError("Not an .accrec recording (file too short)")
+    magic, length = _PREFIX.unpack_from(buffer, 0)
+    if magic != MAGIC:
+        raise ValueError("Not an .accrec recording (bad magic)")
+    offset = _PREFIX.size + length
+    metadata = json.loads(bytes(buffer[_PREFIX.size:offset]).decode('utf-8'))
+    return metadata, offset
+
+
+def encode_rows(block):
+    """Raw bytes of a (k, 4) block in the on-disk row layout"""
+    return np.ascontiguousarray(block, dtype=DTYPE).tobytes()
+
+
+def open_recording(path):
+    """Memory-map a recording file; returns (metadata, read-only (n, 4) array)"""
+    with open(path, 'rb') as f:
+        head = f.read(64 * 1024)
+        metadata, offset = decode_header(head)
+        f.seek(0, 2)
+        rows = (f.tell() - offset) // ROW_BYTES
+    if rows == 0:
+        return metadata, np.empty((0, len(COLUMNS)), dtype=DTYPE)
+    data = np.memmap(path, dtype=DTYPE, mode='r', offset=offset, shape=(rows, len(COLUMNS)))
+    return metadata, data
+
+
+def recording_from_bytes(raw):
+    """Zero-copy (metadata, (n, 4) array) view of a recording already in memory, e.g. an upload"""
+    metadata, offset = decode_header(raw)
+    rows = (len(raw) - offset) // ROW_BYTES
+    data = np.frombuffer(raw, dtype=DTYPE, count=rows * len(COLUMNS), offset=offset)
+    return metadata, data.reshape(rows, len(COLUMNS))
+
+
+def read_csv(chunks, size_hint=None):
+    """(n, 4) float64 array of a timestamp, ax, ay, az CSV given as an iterable of byte chunks
+
+    The header is checked once (any column order, extra columns ignored);
+    the rows are then parsed by NumPy's C text parser one chunk of whole
+    lines at a time and copied into one preallocated result, so apart from
+    it only about one chunk is held. size_hint is the total byte size, if
+    known: the result is sized from it and the bytes per row of the first
+    chunk, grown in place when that is short and trimmed at the end.
+    Chunks with quoted cells (e.g. "0.12" from spreadsheet exports) go
+    through the csv module instead, which unquotes them. Raises ValueError for a missing column or a malformed row.
+    """
+    consumed = 0
+
+    def counted():
+        nonlocal consumed
+        for chunk in chunks:
+            consumed += len(chunk)
+            yield chunk
+
+    result = None
+    rows = 0
+    for block in iter_csv(counted()):
+        if result is None:
+            capacity = len(block)
+            if size_hint:
+                # The header and a partial line count towards the first chunk: a little margin against a regrow
+                capacity = max(capacity, int(size_hint * len(block) / consumed * 1.02) + 1)
+            result = np.empty((capacity, len(COLUMNS)), dtype=DTYPE)
+        elif rows + len(block) > len(result):
+            # realloc: no second copy of the rows held when the block can grow in place
+            result.resize((max(rows + len(block), len(result) * 3 // 2), len(COLUMNS)), refcheck=False)
+        result[rows:rows + len(block)] = block
+        rows += len(block)
+    if result is None:
+        return np.empty((0, len(COLUMNS)), dtype=DTYPE)
+    result.resize((rows, len(COLUMNS)), refcheck=False)
+    return result
+
+
+def iter_csv(chunks):
+    """The rows of read_csv as (k, 4) blocks, one per chunk of whole lines"""
+    usecols = None
+    pending = b''
+    line_number = 1
+    for chunk in chunks:
+        pending += chunk
+        cut = pending.rfind(b'\n') + 1
+        if cut == 0:
+            continue # No complete line yet
+        lines, pending = pending[:cut], pending[cut:]
+        if usecols is None:
+            end = lines.index(b'\n') + 1
+            usecols = _csv_columns(lines[:end])
+            lines = lines[end:]
+            line_number += 1
+        if lines.strip():
+            yield _parse_csv_lines(lines, usecols, line_number)
+        line_number += lines.count(b'\n')
+    if usecols is None:
+        if not pending.strip():
+            raise ValueError("Empty CSV file")
+        usecols, pending = _csv_columns(pending), b''
+    if pending.strip():
+        yield _parse_csv_lines(pending, usecols, line_number)
+
+
+def _csv_columns(header_line):
+    """Indices of timestamp, ax, ay, az in a CSV header line"""
+    names = [name.strip().strip('"').lower() for name in header_line.decode('utf-8-sig').strip().split(',')]
+    missing = [column for column in COLUMNS if column not in names]
+    if missing:
+        raise ValueError(f"Expected column not found in CSV ({', '.join(missing)}). "
+                         f"Headers should be: {', '.join(COLUMNS)}.")
+    return [names.index(column) for column in COLUMNS]
+
+
+def _parse_csv_lines(lines, usecols, line_number):
+    try:
+        if b'"' in lines: # np.loadtxt does not unquote
+            return _parse_quoted_csv_lines(lines, usecols)
+        return np.loadtxt(io.BytesIO(lines), dtype=DTYPE, delimiter=',', usecols=usecols, ndmin=2)
+    except ValueError as e:
+        raise ValueError(f"Bad CSV data in the rows from line {line_number}: {e}") from None
+
+
+def _parse_quoted_csv_lines(lines, usecols):
+    """Slow path of _parse_csv_lines for chunks with quoted cells"""
+    rows = [row for row in csv.reader(io.StringIO(lines.decode('utf-8'))) if any(cell.strip() for cell in row)]
+    try:
+        values = [[float(row[i]) for i in usecols] for row in rows]
+    except IndexError:
+        raise ValueError(f"a row has fewer than {max(usecols) + 1} columns") from None
+    return np.array(values, dtype=DTYPE).reshape(len(values), len(usecols))
+
+
+def read_csv_file(path, chunk_bytes=CSV_CHUNK_BYTES):
+    """read_csv of a file on disk"""
+    with open(path, 'rb') as f:
+        return read_csv(iter(lambda: f.read(chunk_bytes), b''), size_hint=os.fstat(f.fileno()).st_size)
+
+
+def iter_recording(path, start_time=None, block_rows=65536):
+    """Lazily read a .accrec or CSV recording as (k, 4) blocks, from the first sample at or after start_time
+
+    Binary recordings are memory-mapped and the start is found by binary
+    search; CSV files are parsed a chunk at a time and skipped up to it.
+    Only about one block is held at a time.
+    """
+    if path.lower().endswith(BINARY_EXTENSION):
+        _, data = open_recording(path)
+        first = 0 if start_time is None else int(np.searchsorted(data[:, 0], start_time))
+        for i in range(first, len(data), block_rows):
+            yield np.array(data[i:i + block_rows])
+        return
+    with open(path, 'rb') as f:
+        for block in iter_csv(iter(lambda: f.read(CSV_CHUNK_BYTES), b'')):
+            if start_time is not None:
+                block = block[np.searchsorted(block[:, 0], start_time):]
+                if len(block) == 0:
+                    continue
+                start_time = None # Times only increase from here on
+            yield block
+
+
+def export_csv(path, csv_path):
+    """Write a binary recording out as the classic timestamp, ax, ay, az CSV"""
+    _, data = open_recording(path)
+    with open(csv_path, mode='w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(COLUMNS)
+        for start in range(0, len(data), 65536):
+            writer.writerows(data[start:start + 65536].tolist())
+    return csv_path
+
+
+if __name__ == '__main__':
+    import sys
+    if len(sys.argv) != 3:
+        print("Usage: python recording_format.py <recording.accrec> <output.csv>")
+        sys.exit(1)
+    print(f"Exported to {export_csv(sys.argv[1], sys.argv[2])}")
@@ -0,0 +1,185 @@
+"""Replay of recordings (.accrec or CSV) through the live ingest path at a configurable speed
+
+A Replayer thread reads the recording lazily (recording_format.iter_recording),
+cuts it into batches like a phone's pushes and hands each one to a sink with
+the same signature as the ingest path, sink(device_id, times_ns, values). In
+the dashboard the sink is dash_app.ingest_batch, so replayed data goes through
+reassembly, filters, recorders and the live updates like /sensor data.
+
+At a finite speed the batches are paced on the wall clock and the timestamps
+follow the playback clock, so the live view scrolls in step (at 10x it shows
+the recording compressed tenfold in time). speed=0 sends as fast as the sink
+accepts, keeping the recorded sample spacing: a realistic load generator.
+Seeking restarts reading at another recording time; the emitted timestamps
+keep increasing so the reassembly buffers accept the jump.
+
+As a script it POSTs the recording to a running server as Sensor Logger pushes:
+
+Usage: python replay.py RECORDING [--url http://localhost:8080/sensor] [--speed 1] [--device replay]
+           [--batch 50] [--start SECONDS] [--loop]
+"""
+import argparse
+import json
+import threading
+import time
+import urllib.request
+
+import numpy as np
+
+import recording_format
+
+DEFAULT_DEVICE_ID = 'replay'
+DEFAULT_BATCH = 50 # Samples per batch, about one Sensor Logger push
+DEFAULT_PERIOD_NS = 2_000_000 # Gap assumed before the first sample after a seek when the rate is unknown
+
+
+class Replayer(threading.Thread):
+    """Streams one recording into sink(device_id, times_ns, values) until it ends or stop() is called"""
+
+    def __init__(self, path, sink, speed=1.0, device_id=DEFAULT_DEVICE_ID, batch=DEFAULT_BATCH,
+                 start_time=None, loop=False):
+        super().__init__(name=f'replay:{device_id}', daemon=True)
+        self.path = path
+        self.sink = sink
+        self.device_id = device_id
+        self.batch = batch
+        self.loop = loop
+        self.speed = speed
+        self.position = start_time or 0.0 # Recording time of the last sample sent
+        self.samples = 0
+        self.batches = 0
+        self.finished = False
+        self.error = None
+        self._seek_to = start_time
+        self._restart = False
+        self._wake = threading.Event()
+        self._stop_event = threading.Event()
+        self._lock = threading.Lock()
+        self._last_ns = None
+        self._period_ns = DEFAULT_PERIOD_NS
+
+    def stop(self):
+        self._stop_event.set()
+        self._wake.set()
+
+    def seek(self, seconds):
+        """Continue from the first sample at or after this recording time"""
+        with self._lock:
+            self._seek_to = max(0.0, float(seconds))
+            self._restart = True
+        self._wake.set()
+
+    def set_speed(self, speed):
+        """Playback speed factor, 0 = as fast as possible; takes effect from the next batch"""
+        with self._lock:
+            self.speed = speed
+            self._restart = True # Re-anchor the pacing, not the reading position
+        self._wake.set()
+
+    def run(self):
+        try:
+            while not self._stop_event.is_set():
+                with self._lock:
+                    start_time, self._seek_to, self._restart = self._seek_to, None, False
+                if self._play(start_time if start_time is not None else self._resume_time()):
+                    continue # Seek or speed change: read again from the new position
+                if not self.loop:
+                    break
+                self.position = 0.0
+                self._seek_to = 0.0
+        except Exception as e:
+            self.error = e
+            print(f"Replay error ({self.path}): {e}")
+        finally:
+            self.finished = True
+
+    def _resume_time(self):
+        # After a speed change, continue just past the last sample sent
+        return np.nextafter(self.position, np.inf) if self.samples else self.position
+
+    def _play(self, start_time):
+        """Send the recording from start_time; True if interrupted by a seek or speed change"""
+        anchor = None # (wall clock, recording time, output ns) the pacing and timestamps are relative to
+        speed = self.speed
+        self._wake.clear()
+        for block in recording_format.iter_recording(self.path, start_time):
+            for i in range(0, len(block), self.batch):
+                if self._stop_event.is_set():
+                    return False
+                if self._restart:
+                    return True
+                rows = block[i:i + self.batch]
+                times = rows[:, 0]
+                if anchor is None:
+                    anchor = (time.monotonic(), times[0], self._next_start_ns())
+                wall_anchor, recording_anchor, ns_anchor = anchor
+                scale = 1.0 / speed if speed > 0 else 1.0
+                times_ns = ns_anchor + np.round((times - recording_anchor) * scale * 1e9).astype(np.int64)
+                if speed > 0:
+                    delay = wall_anchor + (times[-1] - recording_anchor) / speed - time.monotonic()
+                    if delay > 0 and self._wake.wait(delay):
+                        self._wake.clear()
+                        if self._stop_event.is_set():
+                            return False
+                        if self._restart:
+                            return True
+                self.sink(self.device_id, times_ns, rows[:, 1:])
+                if len(times_ns) > 1:
+                    self._period_ns = int(times_ns[-1] - times_ns[-2]) or self._period_ns
+                self._last_ns = int(times_ns[-1])
+                self.position = float(times[-1])
+                self.samples += len(rows)
+                self.batches += 1
+        return False
+
+    def _next_start_ns(self):
+        # Timestamps never go back, whatever was sought: the ingest path drops late samples
+        now_ns = time.time_ns()
+        if self._last_ns is None:
+            return now_ns
+        return max(now_ns, self._last_ns + self._period_ns) if self.speed > 0 else self._last_ns + self._period_ns
+
+
+def sensor_logger_body(device_id, times_ns, values):
+    """JSON body of a Sensor Logger HTTP push holding one batch"""
+    payload = [{'name': 'accelerometer', 'time': t, 'values': {'x': x, 'y': y, 'z': z}}
+               for t, (x, y, z) in zip(times_ns.tolist(), values.tolist())]
+    return json.dumps({'deviceId': device_id, 'payload': payload}).encode()
+
+
+def http_sink(url):
+    """sink posting every batch to a /sensor URL"""
+    def post(device_id, times_ns, values):
+        request = urllib.request.Request(url, data=sensor_logger_body(device_id, times_ns, values), method='POST',
+                                         headers={'Content-Type': 'application/json', 'X-Device-Id': device_id})
+        with urllib.request.urlopen(request) as response:
+            response.read()
+    return post
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('recording')
+    parser.add_argument('--url', default='http://localhost:8080/sensor')
+    parser.add_argument('--speed', type=float, default=1.0, help='Playback speed factor, 0 = as fast as possible')
+    parser.add_argument('--device', default=DEFAULT_DEVICE_ID)
+    parser.add_argument('--batch', type=int, default=DEFAULT_BATCH, help='Samples per POST')
+    parser.add_argument('--start', type=float, help='Recording time (s) to start at')
+    parser.add_argument('--loop', action='store_true')
+    args = parser.parse_args()
+
+    replayer = Replayer(args.recording, http_sink(args.url), args.speed, args.device, args.batch, args.start, args.loop)
+    started = time.perf_counter()
+    replayer.start()
+    try:
+        replayer.join()
+    except KeyboardInterrupt:
+        replayer.stop()
+        replayer.join()
+    seconds = time.perf_counter() - started
+    print(f"Sent {replayer.samples} samples in {replayer.batches} batches in {seconds:.1f} s "
+          f"({replayer.samples / max(seconds, 1e-9):.0f} samples/s), up to recording time {replayer.position:.3f} s")
+
+
+if __name__ == '__main__':
+    main()
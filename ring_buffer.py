@@ -0,0 +1,95 @@
+import numpy as np
+
+# Column indices
+T, X, Y, Z = 0, 1, 2, 3
+
+
+class RingBuffer:
+    """Preallocated (N, 4) float64 ring buffer holding [time, x, y, z] rows.
+
+    Every row is written twice (at i and i + N), so any run of the last N
+    samples is contiguous in memory and can be returned as a numpy view
+    without copying.
+    """
+
+    def __init__(self, capacity, columns=4):
+        self.capacity = int(capacity)
+        self.columns = columns
+        self._data = np.zeros((2 * self.capacity, columns), dtype=np.float64)
+        self._head = 0          # Next write position (0..N-1)
+        self._size = 0          # Number of valid samples
+        self.total_written = 0  # Samples written since clear (sequence number)
+
+    def __len__(self):
+        return self._size
+
+    def clear(self):
+        self._head = 0
+        self._size = 0
+        self.total_written = 0
+
+    def append(self, t, x, y, z):
+        """Append a single sample"""
+        self.append_block(np.array([[t, x, y, z]], dtype=np.float64))
+
+    def append_block(self, block):
+        """Append a (k, 4) block of samples in one vectorized write"""
+        block = np.asarray(block, dtype=np.float64)
+        if block.ndim != 2 or block.shape[1] != self.columns:
+            raise ValueError(f"Expected a (k, {self.columns}) block, got {block.shape}")
+        k = len(block)
+        if k == 0:
+            return
+        n = self.capacity
+        if k >= n:
+            # Only the last N samples are kept
+            block = block[-n:]
+            self._data[:n] = block
+            self._data[n:] = block
+            self._head = 0
+            self._size = n
+        else:
+            first = min(k, n - self._head)
+            self._write(self._head, block[:first])
+            if first < k:
+                self._write(0, block[first:])
+            self._head = (self._head + k) % n
+            self._size = min(n, self._size + k)
+        self.total_written += k # Last, so the sequence number never runs ahead of the rows
+
+    def discard_last(self, k):
+        """Drop the newest k samples; their sequence numbers are reused by the next append"""
+        k = max(0, min(int(k), self._size))
+        self._head = (self._head - k) % self.capacity
+        self._size -= k
+        self.total_written -= k
+
+    def _write(self, pos, rows):
+        end = pos + len(rows)
+        self._data[pos:end] = rows
+        self._data[pos + self.capacity:end + self.capacity] = rows
+
+    def view(self):
+        """All buffered samples, oldest first, as a view"""
+        return self.last(self._size)
+
+    def last(self, k):
+        """View of the last k samples - O(1)"""
+        k = max(0, min(int(k), self._size))
+        end = self._head + self.capacity
+        return self._data[end - k:end]
+
+    def since(self, seq):
+        """Samples appended since total_written was seq (minus any that were overwritten)"""
+        return self.last(self.total_written - seq)
+
+    def time_range(self, t_start, t_end):
+        """View of the samples with t_start <= t <= t_end
+
+        Assumes the time column is non-decreasing (uses binary search).
+        """
+        data = self.view()
+        times = data[:, T]
+        lo = np.searchsorted(times, t_start, side='left')
+        hi = np.searchsorted(times, t_end, side='right')
+        return data[lo:hi]
@@ -0,0 +1,136 @@
+"""Incremental per-axis statistics (mean, RMS, peak-to-peak, crest factor) over a sliding time window"""
+from collections import deque
+
+import numpy as np
+
+AXES = 3
+
+
+class _Block:
+    """One ingested block with the prefix sums and suffix extrema its eviction needs"""
+    __slots__ = ('index', 'times', 'sums', 'squares', 'suffix_min', 'suffix_max', 'start')
+
+    def __init__(self, index, block):
+        values = block[:, 1:]
+        self.index = index
+        self.times = block[:, 0].copy()
+        # Row i holds the sum over values[:i], so any evicted prefix is one subtraction
+        self.sums = np.zeros((len(block) + 1, AXES))
+        np.cumsum(values, axis=0, out=self.sums[1:])
+        self.squares = np.zeros((len(block) + 1, AXES))
+        np.cumsum(values * values, axis=0, out=self.squares[1:])
+        # Row i holds the min/max over values[i:], the part still in the window
+        self.suffix_min = np.minimum.accumulate(values[::-1], axis=0)[::-1]
+        self.suffix_max = np.maximum.accumulate(values[::-1], axis=0)[::-1]
+        self.start = 0 # Rows before this have left the window
+
+
+class RollingStats:
+    """Mean, RMS, peak-to-peak and crest factor per axis over the last window_seconds of samples
+
+    update() adds each block's sums and sums of squares to running totals and
+    keeps the block with its prefix sums; samples that fall out of the window
+    are subtracted with one lookup in those prefix sums instead of a rescan.
+    Min/max per axis come from suffix extrema of the oldest (partly evicted)
+    block and monotonic deques of the other blocks' extrema. Each update and
+    snapshot costs O(new samples) amortized, independent of the window length.
+    Time is the newest sample's time, so the window stops when the data does.
+    """
+
+    def __init__(self, window_seconds):
+        self.window_seconds = float(window_seconds)
+        self.clear()
+
+    def clear(self):
+        self._blocks = deque()
+        self._min = [deque() for _ in range(AXES)] # (block index, block min) with increasing values
+        self._max = [deque() for _ in range(AXES)] # (block index, block max) with decreasing values
+        self._next_index = 0
+        self._count = 0
+        self._sum = np.zeros(AXES)
+        self._sum_squares = np.zeros(AXES)
+        self.latest_time = None
+
+    def __len__(self):
+        return self._count
+
+    def update(self, block):
+        """Add a (k, 4) [time, x, y, z] block in time order and evict what left the window"""
+        if len(block) == 0:
+            return
+        entry = _Block(self._next_index, np.asarray(block, dtype=np.float64))
+        self._next_index += 1
+        self._blocks.append(entry)
+        self._count += len(entry.times)
+        self._sum += entry.sums[-1]
+        self._sum_squares += entry.squares[-1]
+        for axis in range(AXES):
+            low, high = entry.suffix_min[0, axis], entry.suffix_max[0, axis]
+            mins, maxs = self._min[axis], self._max[axis]
+            while mins and mins[-1][1] >= low:
+                mins.pop()
+            mins.append((entry.index, low))
+            while maxs and maxs[-1][1] <= high:
+                maxs.pop()
+            maxs.append((entry.index, high))
+        self.latest_time = max(entry.times[-1], self.latest_time if self.latest_time is not None else -np.inf)
+        self._evict(self.latest_time - self.window_seconds)
+
+    def _evict(self, cutoff):
+        """Drop samples older than cutoff"""
+        while self._blocks:
+            front = self._blocks[0]
+            end = int(np.searchsorted(front.times, cutoff, side='left'))
+            if end <= front.start:
+                return
+            self._count -= end - front.start
+            self._sum -= front.sums[end] - front.sums[front.start]
+            self._sum_squares -= front.squares[end] - front.squares[front.start]
+            front.start = end
+            if end < len(front.times):
+                return
+            self._blocks.popleft()
+            for queue in self._min + self._max:
+                if queue and queue[0][0] == front.index:
+                    queue.popleft()
+        # Empty window: start the running sums again from exact zeros
+        self._count = 0
+        self._sum[:] = 0.0
+        self._sum_squares[:] = 0.0
+
+    def _extremes(self):
+        """Per-axis (min, max) over the window"""
+        front = self._blocks[0]
+        low = front.suffix_min[front.start].copy()
+        high = front.suffix_max[front.start].copy()
+        for axis in range(AXES):
+            # The head of a monotonic deque is the extreme of all its blocks; if that is the
+            # partly evicted front block, the next entry covers the blocks after it
+            for queue, result, better in ((self._min[axis], low, min), (self._max[axis], high, max)):
+                entries = iter(queue)
+                head = next(entries, None)
+                if head is not None and head[0] == front.index:
+                    head = next(entries, None)
+                if head is not None:
+                    result[axis] = better(result[axis], head[1])
+        return low, high
+
+    def snapshot(self):
+        """Dict of per-axis lists ('mean', 'rms', 'peak_to_peak', 'crest_factor') plus 'count' and 'duration', or None if empty"""
+        if self._count == 0:
+            return None
+        mean = self._sum / self._count
+        rms = np.sqrt(np.maximum(self._sum_squares / self._count, 0.0)) # Rounding can leave a tiny negative
+        low, high = self._extremes()
+        peak = np.maximum(np.abs(low), np.abs(high))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            crest = np.where(rms > 0, peak / rms, np.nan)
+        front = self._blocks[0]
+        return {
+            'count': self._count,
+            'duration': float(self.latest_time - front.times[front.start]),
+            'mean': mean.tolist(),
+            'rms': rms.tolist(),
+            'peak_to_peak': (high - low).tolist(),
+            'crest_factor': crest.tolist(),
+        }
@@ -0,0 +1,204 @@
+"""Production serving of dash_app.py with a configurable bind address, threads and ingest workers
+
+The dashboard runs in one process under waitress, a multi-threaded WSGI
+server (werkzeug's threaded server is used if waitress is not installed).
+Every open live view holds one thread for its Server-Sent Events stream, so
+--threads should exceed the number of browser tabs.
+
+--ingest-workers N forks N processes that share one listening socket on
+--ingest-port and only serve /sensor: they decode the JSON bodies in parallel
+and forward packed batches over a local ZeroMQ broker (ingest_broker.py) to
+the dashboard process, which stays the single owner of the per-device
+buffers, reassembly, filters and recorders. Point the phones at
+http://HOST:INGEST_PORT/sensor. Workers need fork (Linux/macOS).
+
+--ingest-process moves that ownership out of the dashboard process: a
+separate process keeps the sessions and recorders and writes the live
+buffers to shared memory (shared_store.py), which the dashboard reads. It
+serves /sensor on --ingest-port itself unless ingest workers do. Slow
+dashboard callbacks then never delay the reply to a phone.
+
+--zmq ENDPOINT also takes batches from a ZeroMQ source (packed binary or
+JSON messages, see ingest_broker.decode_message): subscribed to a PUB
+socket at ENDPOINT, or with --zmq-pattern pull on a bound PULL socket. It
+feeds the session owner directly, like /sensor.
+
+Usage: python serve.py [--host 0.0.0.0] [--port 8080] [--threads 32]
+           [--ingest-workers N] [--ingest-process] [--ingest-port 8081] [--ingest-threads 8]
+           [--broker tcp://127.0.0.1:5556] [--control tcp://127.0.0.1:5557] [--wakeup tcp://127.0.0.1:5558]
+           [--zmq tcp://localhost:5555] [--zmq-pattern sub|pull] [--zmq-hwm 1000]
+"""
+import argparse
+import multiprocessing
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+
+import ingest_broker
+
+DEFAULT_HOST = '0.0.0.0'
+DEFAULT_PORT = 8080
+DEFAULT_THREADS = 32
+DEFAULT_INGEST_PORT = 8081
+DEFAULT_INGEST_THREADS = 8
+
+try:
+    import waitress
+except ImportError:
+    waitress = None
+
+
+def listen_socket(host, port, backlog=1024):
+    sock = socket.socket(socket.AF_INET6 if ':' in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    return sock
+
+
+def serve_wsgi(wsgi_app, host=DEFAULT_HOST, port=DEFAULT_PORT, threads=DEFAULT_THREADS, sock=None):
+    """Serve a WSGI app until interrupted, on sock if given (already listening) or on host:port"""
+    if waitress is not None:
+        options = {'sockets': [sock]} if sock is not None else {'host': host, 'port': port}
+        # Many connections are long-lived event streams; don't let them starve new requests
+        waitress.serve(wsgi_app, threads=threads, connection_limit=max(100, 4 * threads), channel_timeout=60, **options)
+        return
+    from werkzeug.serving import make_server
+    fd = sock.fileno() if sock is not None else None
+    make_server(host, port, wsgi_app, threaded=True, fd=fd).serve_forever()
+
+
+def run_ingest_worker(sock, broker, threads):
+    forwarder = ingest_broker.BatchForwarder(broker)
+    serve_wsgi(ingest_broker.create_ingest_app(forwarder.send), threads=threads, sock=sock)
+
+
+def start_ingest_workers(count, host, port, broker, threads):
+    """Fork count /sensor workers accepting on one shared socket; call before anything starts threads"""
+    if 'fork' not in multiprocessing.get_all_start_methods():
+        raise SystemExit("--ingest-workers needs a platform with fork (Linux/macOS)")
+    sock = listen_socket(host, port)
+    context = multiprocessing.get_context('fork')
+    workers = [context.Process(target=run_ingest_worker, args=(sock, broker, threads), name=f'ingest-worker-{i}',
+                               daemon=True)
+               for i in range(count)]
+    for worker in workers:
+        worker.start()
+    sock.close() # Only the workers accept on it
+    return workers
+
+
+def run_ingest_process(prefix, config, host, port, threads, broker, control, wakeup, zmq_options=None):
+    """Entry point of the --ingest-process process: owns the sessions, writes shared memory, serves /sensor unless port is None"""
+    import shared_store
+    registry = shared_store.SharedSessionRegistry(prefix, config['capacity'], config['reassembly_options'], wakeup)
+    registry.configure_filter(config['filter_stages'])
+    shared_store.ControlServer(registry, control).start()
+
+    def handle(device_id, times_ns, values):
+        if not registry.paused:
+            registry.ingest(device_id, times_ns, values)
+        return True
+
+    def flush_reassembly():
+        while True:
+            time.sleep(config['reassembly_flush_interval'])
+            try:
+                registry.flush_stale()
+            except Exception as e:
+                print(f"Reassembly flush error: {e}")
+
+    ingest_broker.BatchReceiver(handle, broker).start()
+    if zmq_options is not None:
+        ingest_broker.zmq_source(handle, **zmq_options).start()
+    threading.Thread(target=flush_reassembly, name='reassembly-flusher', daemon=True).start()
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        if port is None:
+            threading.Event().wait()
+        else:
+            serve_wsgi(ingest_broker.create_ingest_app(handle), host, port, threads)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        registry.close() # Finishes the recordings and removes the shared memory segments
+
+
+def start_ingest_process(dash_app, host, port, broker, control, wakeup, threads, zmq_options=None):
+    """Spawn the ingest process with dash_app's settings; returns the process and the segment prefix"""
+    prefix = f'accel{os.getpid()}'
+    config = {
+        'capacity': dash_app.BUFFER_SIZE,
+        'reassembly_options': dash_app.REASSEMBLY_OPTIONS,
+        'reassembly_flush_interval': dash_app.REASSEMBLY_FLUSH_INTERVAL,
+        'filter_stages': dash_app.sessions.filter_stages,
+    }
+    # Spawned, not forked: the dashboard process already runs threads
+    process = multiprocessing.get_context('spawn').Process(
+        target=run_ingest_process, args=(prefix, config, host, port, threads, broker, control, wakeup, zmq_options),
+        name='ingest-process')
+    process.start()
+    return process, prefix
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default=DEFAULT_HOST, help='Bind address')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help='Dashboard port (also serves /sensor)')
+    parser.add_argument('--threads', type=int, default=DEFAULT_THREADS, help='Dashboard request threads')
+    parser.add_argument('--ingest-workers', type=int, default=0, help='Processes serving /sensor on --ingest-port')
+    parser.add_argument('--ingest-process', action='store_true', help='Own the sessions in a separate process (shared memory)')
+    parser.add_argument('--ingest-port', type=int, default=DEFAULT_INGEST_PORT)
+    parser.add_argument('--ingest-threads', type=int, default=DEFAULT_INGEST_THREADS, help='Threads per ingest worker')
+    parser.add_argument('--broker', default=ingest_broker.DEFAULT_ENDPOINT, help='ZeroMQ endpoint between workers and dashboard')
+    parser.add_argument('--control', default='tcp://127.0.0.1:5557', help='ZeroMQ endpoint of the ingest process controls')
+    parser.add_argument('--wakeup', default='tcp://127.0.0.1:5558', help='ZeroMQ endpoint the ingest process signals new batches on')
+    parser.add_argument('--zmq', metavar='ENDPOINT', help='Also ingest batches from this ZeroMQ source')
+    parser.add_argument('--zmq-pattern', choices=('sub', 'pull'), default='sub', help='Subscribe to a PUB socket or bind a PULL socket')
+    parser.add_argument('--zmq-hwm', type=int, default=1000, help='Receive high-water mark (messages)')
+    args = parser.parse_args()
+
+    # Fork before dash_app is imported: it starts background threads, which do not survive a fork
+    workers = []
+    if args.ingest_workers > 0:
+        workers = start_ingest_workers(args.ingest_workers, args.host, args.ingest_port, args.broker, args.ingest_threads)
+
+    import dash_app
+    zmq_options = None
+    if args.zmq:
+        zmq_options = {'endpoint': args.zmq, 'pattern': args.zmq_pattern, 'hwm': args.zmq_hwm,
+                       'default_device_id': dash_app.ZMQ_DEVICE_ID}
+    if args.ingest_process:
+        process_port = None if workers else args.ingest_port
+        process, prefix = start_ingest_process(dash_app, args.host, process_port, args.broker, args.control,
+                                               args.wakeup, args.ingest_threads, zmq_options)
+        dash_app.use_shared_store(prefix, args.control, args.broker, args.wakeup)
+        workers.append(process)
+    else:
+        if workers:
+            dash_app.start_ingest_broker(args.broker)
+        if zmq_options is not None and dash_app.zmq_receiver is None:
+            dash_app.start_zmq_receiver(args.zmq, args.zmq_pattern, args.zmq_hwm)
+    dash_app.print_startup_info(args.port, args.ingest_port if workers else None)
+    print(f"Serving with {'waitress' if waitress else 'werkzeug (pip install waitress for production)'}, "
+          f"{args.threads} threads" + (f", {args.ingest_workers} ingest workers" if args.ingest_workers > 0 else "")
+          + (", separate ingest process" if args.ingest_process else "")
+          + (f", ZeroMQ source {args.zmq} ({args.zmq_pattern})" if args.zmq else ""))
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0)) # Clean up on `kill` as on Ctrl+C
+    try:
+        serve_wsgi(dash_app.server, args.host, args.port, args.threads)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        dash_app.cleanup()
+        for worker in workers:
+            worker.terminate()
+        for worker in workers:
+            worker.join(timeout=10) # The ingest process closes its recordings and shared memory
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,416 @@
+import os
+import re
+import collections
+import threading
+import time
+
+import numpy as np
+
+import ingest
+import recording_format
+import triggers
+from filters import FilterChain
+from reassembly import Reassembler
+from recorder import AsyncRecorder
+from rolling_stats import RollingStats
+from spectrogram import StreamingSTFT
+from ring_buffer import RingBuffer
+
+DEFAULT_DEVICE_ID = 'default'
+DEVICE_ID_HEADER = 'X-Device-Id'
+DEVICE_ID_QUERY_PARAM = 'device'
+DEVICE_ID_PAYLOAD_KEY = 'deviceId' # Top-level field in Sensor Logger HTTP pushes
+EVENT_LOG_SIZE = 20 # Captured trigger events kept for display
+
+
+def sanitize_device_id(device_id):
+    """Make a device ID safe for file names and component labels"""
+    cleaned = re.sub(r'[^A-Za-z0-9_.-]', '_', str(device_id).strip())[:64]
+    return cleaned or DEFAULT_DEVICE_ID
+
+
+def device_id_from_request(request, parsed):
+    """Device ID from the header, the query string or the payload metadata, in that order"""
+    device_id = request.headers.get(DEVICE_ID_HEADER) or request.args.get(DEVICE_ID_QUERY_PARAM)
+    if not device_id and isinstance(parsed, dict):
+        device_id = parsed.get(DEVICE_ID_PAYLOAD_KEY)
+    return sanitize_device_id(device_id) if device_id else DEFAULT_DEVICE_ID
+
+
+def recording_filename(directory, base_name, timestamp, file_format, device_id):
+    """<directory>/<name>_<timestamp><ext> for the default device, <name>_<device>_<timestamp><ext> for the others"""
+    extension = recording_format.BINARY_EXTENSION if file_format == 'binary' else recording_format.CSV_EXTENSION
+    if device_id == DEFAULT_DEVICE_ID:
+        return os.path.join(directory, f"{base_name}_{timestamp}{extension}")
+    return os.path.join(directory, f"{base_name}_{device_id}_{timestamp}{extension}")
+
+
+class DeviceSession:
+    """Buffer, time base, counters, recorder and optional reassembly/filter/spectrogram/statistics/triggers of a single sensor source"""
+
+    def __init__(self, device_id, capacity, on_ingest=None, spectrogram_options=None, reassembly_options=None,
+                 filter_stages=None, buffer=None, stats_options=None, trigger_options=None, on_event=None):
+        self.device_id = device_id
+        self.buffer = buffer if buffer is not None else RingBuffer(capacity)
+        self.lock = threading.Lock() # Guards the time base, buffer writes, the recorder, reassembler, filter, spectrogram, stats and triggers
+        self.base_time = None # Sensor time (ns) of the first sample
+        self.initial_wall_clock_time = None # Wall clock time when the first sample arrived
+        self.last_update_time = 0
+        self.total_points_received = 0
+        self.recorder = None
+        # Jitter buffer that reorders late batches and drops retried ones before anything is stored
+        self.reassembler = Reassembler(**reassembly_options) if reassembly_options is not None else None
+        self.filter = FilterChain(filter_stages) if filter_stages else None # Applied to the display buffer, not the recording
+        self.spectrogram = StreamingSTFT(**spectrogram_options) if spectrogram_options is not None else None
+        self.stats = RollingStats(**stats_options) if stats_options is not None else None
+        self.on_event = on_event # Called with a summary of every captured trigger event
+        self.triggers = self._create_triggers(trigger_options)
+        self.on_ingest = on_ingest # Called after every batch, outside the lock (wakes push subscribers)
+
+    def ingest(self, times_ns, values):
+        """Append one batch of samples; returns the [time, x, y, z] block that was stored
+
+        With reassembly the stored block holds the samples released by the jitter
+        buffer, which can be fewer (or more) than the batch that came in.
+        """
+        with self.lock:
+            if self.reassembler is not None:
+                times_ns, values = self.reassembler.push(times_ns, values)
+            block = self._append(times_ns, values)
+            self.last_update_time = time.time()
+        if self.on_ingest is not None:
+            self.on_ingest()
+        return block
+
+    def flush_reassembly(self, everything=False):
+        """Store held samples whose hold time has expired (or all of them); returns how many were stored"""
+        if self.reassembler is None:
+            return 0
+        with self.lock:
+            released = self.reassembler.flush() if everything else self.reassembler.flush_stale()
+            block = self._append(*released)
+        if len(block) and self.on_ingest is not None:
+            self.on_ingest()
+        return len(block)
+
+    def _append(self, times_ns, values):
+        """Store samples in order (lock held)"""
+        if len(times_ns) == 0:
+            return np.empty((0, 4))
+        if self.base_time is None:
+            self.base_time = int(times_ns[0])
+            self.initial_wall_clock_time = time.time()
+        block = ingest.make_block(times_ns, values, self.base_time)
+        if self.recorder is not None:
+            self.recorder.write_block(block) # Only enqueues (a copy of the raw block), the recorder thread does the disk I/O
+        raw_block = block
+        if self.filter is not None:
+            if self.triggers is not None:
+                raw_block = block.copy() # Event captures keep the raw values, like recordings
+            block[:, 1:] = self.filter.apply(block[:, 0], block[:, 1:]) # Each sample is filtered once, with carried state
+        self.buffer.append_block(block)
+        if self.spectrogram is not None:
+            self.spectrogram.update(block) # Only the frames completed by this block are FFT'd
+        if self.stats is not None:
+            self.stats.update(block) # Running sums; samples leaving the window are subtracted, not rescanned
+        if self.triggers is not None:
+            self.triggers.process(raw_block, block) # Vectorized checks; captured windows are written by another thread
+        self.total_points_received += len(block)
+        return block
+
+    def start_recording(self, filename, **recorder_options):
+        metadata = {'device_id': self.device_id, 'sample_rate': self.estimate_sample_rate()}
+        recorder = AsyncRecorder(filename, metadata=metadata, **recorder_options)
+        with self.lock:
+            previous, self.recorder = self.recorder, recorder
+        if previous is not None:
+            previous.close()
+
+    def stop_recording(self):
+        """Finish the recording; returns its write error, if any"""
+        self.flush_reassembly(everything=True) # Held samples still belong to this recording
+        self.flush_triggers()
+        with self.lock:
+            recorder, self.recorder = self.recorder, None
+        if recorder is None:
+            return None
+        recorder.close() # Drains the queue and fsyncs outside the ingest lock
+        return recorder.error
+
+    def read_since(self, seq):
+        """(copy of the samples stored since buffer.total_written was seq, new sequence number)
+
+        Everything buffered is returned if the buffer was reset after seq. The
+        copy and the sequence number are taken together under the lock, so a
+        reader that passes the returned number back never skips or repeats a
+        sample (unless it fell more than a buffer behind).
+        """
+        with self.lock:
+            total = self.buffer.total_written
+            return self.buffer.since(seq if seq <= total else 0).copy(), total
+
+    def estimate_sample_rate(self):
+        """Mean sample rate (Hz) of the buffered samples, or None if there are too few"""
+        with self.lock:
+            times = self.buffer.view()[:, 0].copy()
+        if len(times) < 2 or times[-1] <= times[0]:
+            return None
+        return float((len(times) - 1) / (times[-1] - times[0]))
+
+    def set_filter(self, filter_stages):
+        """Filter new samples with a fresh FilterChain of these stages (empty/None = raw values)"""
+        chain = FilterChain(filter_stages) if filter_stages else None
+        with self.lock:
+            self.filter = chain
+
+    def set_spectrogram(self, spectrogram_options):
+        """Start a fresh StreamingSTFT with the given options, or stop computing one (None)"""
+        engine = StreamingSTFT(**spectrogram_options) if spectrogram_options is not None else None
+        with self.lock:
+            self.spectrogram = engine
+
+    def set_stats(self, stats_options):
+        """Start fresh RollingStats with the given options, or stop computing them (None)"""
+        engine = RollingStats(**stats_options) if stats_options is not None else None
+        with self.lock:
+            self.stats = engine
+
+    def stats_snapshot(self):
+        """RollingStats.snapshot() of the current window, or None"""
+        with self.lock:
+            return self.stats.snapshot() if self.stats is not None else None
+
+    def _create_triggers(self, trigger_options):
+        if trigger_options is None:
+            return None
+        options = dict(trigger_options)
+        directory = options.pop('directory')
+        base_name = options.pop('base_name', triggers.DEFAULT_BASE_NAME)
+        file_format = options.get('file_format', 'csv')
+        os.makedirs(directory, exist_ok=True)
+        def filename(timestamp):
+            return recording_filename(directory, base_name, timestamp, file_format, self.device_id)
+        return triggers.TriggerEngine(filename=filename, device_id=self.device_id, on_event=self.on_event, **options)
+
+    def set_triggers(self, trigger_options):
+        """Arm a fresh TriggerEngine with the given options, or stop detecting events (None); a pending event is saved first"""
+        engine = self._create_triggers(trigger_options)
+        with self.lock:
+            previous, self.triggers = self.triggers, engine
+            if previous is not None:
+                previous.flush()
+
+    def flush_triggers(self, stale_only=False):
+        """Save an event still being captured (with stale_only, only if the device stopped sending)"""
+        with self.lock:
+            if self.triggers is not None:
+                self.triggers.flush(stale_only)
+
+    @property
+    def recording_filename(self):
+        recorder = self.recorder
+        return recorder.filename if recorder is not None else None
+
+
+class SessionRegistry:
+    """Device sessions keyed by device ID
+
+    Lookups of existing sessions are lock-free dict reads; the registry lock is
+    only taken when a new device shows up, so concurrent ingest for different
+    devices only contends on each session's own lock.
+    """
+
+    def __init__(self, capacity, reassembly_options=None):
+        self.capacity = capacity
+        self.reassembly_options = reassembly_options # Reassembler options for every session, None = store batches as they arrive
+        self.on_create = None # Optional callback(session)
+        self.recording = None # (directory, base_name, timestamp, file_format, recorder_options) while recording
+        self.paused = False # Set by the dashboard; used by ingest processes that cannot see its state
+        self.spectrogram_options = None # StreamingSTFT options for every session, None = no spectrogram
+        self.stats_options = None # RollingStats options for every session, None = no statistics
+        self.trigger_options = None # TriggerEngine options (plus 'directory', 'base_name') for every session, None = off
+        self.events = collections.deque(maxlen=EVENT_LOG_SIZE) # Summaries of the latest captured events, oldest first
+        self.filter_stages = [] # FilterChain stages for every session, empty = raw values
+        self._sessions = {}
+        self._lock = threading.Lock()
+        self.ingest_count = 0 # Batches ingested by any device, waited on by push subscribers
+        self._ingest_condition = threading.Condition()
+
+    def get(self, device_id):
+        """Return the session for device_id, creating it on first use"""
+        session = self._sessions.get(device_id)
+        if session is None:
+            with self._lock:
+                session = self._sessions.get(device_id)
+                if session is None:
+                    session = self._create_session(device_id)
+                    if self.recording is not None: # Devices that connect while recording get their own file
+                        try:
+                            self._start_session_recording(session)
+                        except Exception as e:
+                            print(f"Recording error for device {device_id}: {e}") # Keep ingesting it anyway
+                    if self.on_create is not None:
+                        self.on_create(session)
+                    # Publish a new dict so readers never iterate one that is being resized
+                    self._sessions = {**self._sessions, device_id: session}
+        return session
+
+    def _create_session(self, device_id):
+        return DeviceSession(device_id, self.capacity, on_ingest=self.notify_ingest,
+                             spectrogram_options=self.spectrogram_options,
+                             reassembly_options=self.reassembly_options,
+                             filter_stages=self.filter_stages, stats_options=self.stats_options,
+                             trigger_options=self.trigger_options, on_event=self.events.append)
+
+    def ingest(self, device_id, times_ns, values):
+        """Ingest one batch into the session of device_id"""
+        return self.get(device_id).ingest(times_ns, values)
+
+    def peek(self, device_id):
+        """Return the session for device_id or None, without creating it"""
+        return self._sessions.get(device_id)
+
+    def sessions(self):
+        return list(self._sessions.values())
+
+    def device_ids(self):
+        return list(self._sessions.keys())
+
+    def configure_filter(self, filter_stages):
+        """Apply filter stages to all current and future sessions"""
+        with self._lock:
+            self.filter_stages = list(filter_stages or [])
+            for session in self._sessions.values():
+                session.set_filter(self.filter_stages)
+
+    def configure_spectrogram(self, spectrogram_options):
+        """Apply StreamingSTFT options (or None to turn it off) to all current and future sessions"""
+        with self._lock:
+            self.spectrogram_options = spectrogram_options
+            for session in self._sessions.values():
+                session.set_spectrogram(spectrogram_options)
+
+    def configure_stats(self, stats_options):
+        """Apply RollingStats options (or None to turn them off) to all current and future sessions"""
+        with self._lock:
+            self.stats_options = stats_options
+            for session in self._sessions.values():
+                session.set_stats(stats_options)
+
+    def configure_triggers(self, trigger_options):
+        """Apply trigger options (or None to turn event capture off) to all current and future sessions"""
+        if trigger_options is not None:
+            triggers.validate(trigger_options['conditions'])
+        with self._lock:
+            self.trigger_options = trigger_options
+            for session in self._sessions.values():
+                session.set_triggers(trigger_options)
+
+    @property
+    def trigger_events(self):
+        """Latest captured events, newest first"""
+        return list(self.events)[::-1]
+
+    def set_paused(self, paused):
+        self.paused = bool(paused)
+
+    def start_recording(self, directory, base_name, timestamp, file_format='csv', **recorder_options):
+        """Record every current session, and every one created until stop_recording, to its own file
+
+        Returns the file names of the current sessions.
+        """
+        os.makedirs(directory, exist_ok=True)
+        with self._lock:
+            self.recording = (directory, base_name, timestamp, file_format, recorder_options)
+            current = list(self._sessions.values())
+        try:
+            for session in current:
+                self._start_session_recording(session)
+        except Exception:
+            self.stop_recording()
+            raise
+        return [session.recording_filename for session in current]
+
+    def stop_recording(self):
+        """Finish every recording; returns {device_id: write error} of the ones that failed"""
+        with self._lock:
+            self.recording = None
+        errors = {}
+        for session in self.sessions():
+            error = session.stop_recording()
+            if error is not None:
+                errors[session.device_id] = error
+        return errors
+
+    def _start_session_recording(self, session):
+        directory, base_name, timestamp, file_format, recorder_options = self.recording
+        filename = recording_filename(directory, base_name, timestamp, file_format, session.device_id)
+        session.start_recording(filename, file_format=file_format, **recorder_options)
+
+    def clear(self):
+        with self._lock:
+            old_sessions = self._sessions
+            self._sessions = {}
+        for session in old_sessions.values():
+            session.stop_recording()
+        self.notify_ingest()
+
+    def flush_stale(self):
+        """Release samples held by the jitter buffers for longer than their max_hold, save events of devices that went quiet"""
+        for session in self.sessions():
+            session.flush_reassembly()
+            session.flush_triggers(stale_only=True)
+
+    def notify_ingest(self):
+        """Wake everyone blocked in wait_for_ingest"""
+        with self._ingest_condition:
+            self.ingest_count += 1
+            self._ingest_condition.notify_all()
+
+    def wait_for_ingest(self, seen_count, timeout):
+        """Block until ingest_count differs from seen_count or timeout seconds pass; returns ingest_count"""
+        with self._ingest_condition:
+            self._ingest_condition.wait_for(lambda: self.ingest_count != seen_count, timeout)
+            return self.ingest_count
+
+    @property
+    def origin(self):
+        """Wall clock time of the first sample of any device (shared x-axis origin)"""
+        starts = [s.initial_wall_clock_time for s in self.sessions() if s.initial_wall_clock_time is not None]
+        return min(starts) if starts else None
+
+    def time_offset(self, session):
+        """Shift that puts a session's relative times on the shared x-axis"""
+        origin = self.origin
+        if origin is None or session.initial_wall_clock_time is None:
+            return 0.0
+        return session.initial_wall_clock_time - origin
+
+    @property
+    def total_points_received(self):
+        return sum(s.total_points_received for s in self.sessions())
+
+    @property
+    def recorder_backlog(self):
+        """Samples queued for disk across all devices"""
+        return sum(s.recorder.backlog for s in self.sessions() if s.recorder is not None)
+
+    @property
+    def recording_errors(self):
+        """{device_id: write error} of the active recorders that failed"""
+        recorders = [(s.device_id, s.recorder) for s in self.sessions() if s.recorder is not None]
+        return {device_id: r.error for device_id, r in recorders if r.error is not None}
+
+    @property
+    def reassembly_counters(self):
+        """Late (reordered), duplicate and dropped samples across all devices"""
+        reassemblers = [s.reassembler for s in self.sessions() if s.reassembler is not None]
+        return {
+            'late': sum(r.late_samples for r in reassemblers),
+            'duplicate': sum(r.duplicate_samples for r in reassemblers),
+            'dropped': sum(r.dropped_samples for r in reassemblers),
+        }
+
+    @property
+    def last_update_time(self):
+        return max((s.last_update_time for s in self.sessions()), default=0)
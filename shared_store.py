@@ -0,0 +1,713 @@
+"""Sample store in shared memory, so ingest and the dashboard can run in separate processes
+
+The ingest process owns a SharedSessionRegistry: the usual device sessions
+(reassembly, filters, recorders), with each live buffer in a
+SharedRingBuffer segment. The values that change with every batch (sample
+and reassembly counts, last update, recorder progress) go to numeric slots
+in the session's segment; a JSON status document (devices, their segments,
+recording, filter, events) is published in a SharedStatus segment only
+when it changes, so ingest never serializes it per batch.
+Dashboard processes use a SharedStoreClient, which offers the read side of
+SessionRegistry on top of those segments and forwards the few control
+operations (reset, filter, recording, pause) over a ZeroMQ REQ/REP socket.
+Neither side ever waits on a lock held by the other. Dashboard threads
+waiting for new samples (the live stream) block on a ZeroMQ SUB socket the
+ingest process signals, only while someone is waiting.
+"""
+import json
+import threading
+import time
+import types
+from multiprocessing import shared_memory
+
+import numpy as np
+import zmq
+
+import ingest_broker
+from ring_buffer import RingBuffer
+from sessions import DeviceSession, SessionRegistry
+from rolling_stats import RollingStats
+from spectrogram import StreamingSTFT
+
+DEFAULT_CONTROL_ENDPOINT = 'tcp://127.0.0.1:5557'
+DEFAULT_WAKEUP_ENDPOINT = 'tcp://127.0.0.1:5558' # PUB socket of the ingest process that wakes waiting dashboards
+CONTROL_TIMEOUT = 10.0 # s; stopping a recording drains and fsyncs its queue
+STATUS_BYTES = 1 << 20 # Room for the JSON status document
+WAKEUP_SAFETY_INTERVAL = 1.0 # s; a waiting dashboard rechecks the ingest count at least this often, in case a wakeup was lost
+STATUS_READ_TIMEOUT = 1.0 # s a status update may stay half-written before readers fall back to the last good document
+
+# int64 header slots of a SharedRingBuffer segment, followed by float64 counter slots for the owner
+WRITTEN, WRITING, CAPACITY, COLUMNS, DISCARDS, OLDEST = range(6)
+RING_HEADER_BYTES = 64
+COUNTER_SLOTS = 16
+# Counter slots of a session's segment, written after every batch of that session
+(INITIAL_WALL_CLOCK_TIME, LAST_UPDATE_TIME, TOTAL_POINTS, LATE_SAMPLES, DUPLICATE_SAMPLES, DROPPED_SAMPLES,
+ RECORDER_BACKLOG, SAMPLES_WRITTEN, SAMPLES_DROPPED) = range(9)
+DISCARD_RETRIES = 3 # Reads that raced a discard_last are retried this often before they return nothing
+
+
+class SharedRingBuffer(RingBuffer):
+    """RingBuffer in a shared memory segment with one writer process and any number of readers
+
+    Two sequence numbers in the segment header replace the lock: the writer
+    stores the end of a block in WRITING before it copies the rows, and in
+    WRITTEN once they are in place. A reader copies the rows it asked for,
+    then reads WRITING again; rows older than WRITING - capacity may have been
+    overwritten during the copy and are cut from the front of the result.
+    discard_last, which makes the next append reuse sequence numbers, is the
+    exception: it counts itself in DISCARDS (odd while it runs), and a read
+    that overlapped one is retried a few times, then returns no rows. The
+    writer never waits. Reads return copies of just the requested rows (the
+    mirrored layout keeps them contiguous).
+    """
+
+    def __init__(self, capacity=None, columns=4, name=None, create=True):
+        if create:
+            size = RING_HEADER_BYTES + COUNTER_SLOTS * 8 + 2 * int(capacity) * columns * 8
+            shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        else:
+            shm = shared_memory.SharedMemory(name=name)
+        self._header = np.ndarray((6,), dtype=np.int64, buffer=shm.buf)
+        if create:
+            self._header[:] = (0, 0, capacity, columns, 0, 0)
+        self.capacity = int(self._header[CAPACITY])
+        self.columns = int(self._header[COLUMNS])
+        # Values the writer publishes with the rows; each slot is read and written whole, no lock
+        self.counters = np.ndarray((COUNTER_SLOTS,), dtype=np.float64, buffer=shm.buf, offset=RING_HEADER_BYTES)
+        self._data = np.ndarray((2 * self.capacity, self.columns), dtype=np.float64, buffer=shm.buf,
+                                offset=RING_HEADER_BYTES + COUNTER_SLOTS * 8)
+        self.shm = shm # Set last: the arrays, which export its buffer, must be released before it is closed
+
+    @classmethod
+    def attach(cls, name):
+        return cls(name=name, create=False)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    @property
+    def total_written(self):
+        return int(self._header[WRITTEN])
+
+    @property
+    def _head(self):
+        return self.total_written % self.capacity
+
+    @property
+    def _size(self):
+        return self.total_written - int(self._header[OLDEST]) # Less than the capacity after a discard
+
+    def clear(self):
+        self._header[WRITTEN] = self._header[WRITING] = self._header[OLDEST] = 0
+
+    def append_block(self, block):
+        block = np.asarray(block, dtype=np.float64)
+        if block.ndim != 2 or block.shape[1] != self.columns:
+            raise ValueError(f"Expected a (k, {self.columns}) block, got {block.shape}")
+        if len(block) == 0:
+            return
+        n = self.capacity
+        end = self.total_written + len(block)
+        block = block[-n:]
+        self._header[WRITING] = end
+        self._header[OLDEST] = max(int(self._header[OLDEST]), end - n)
+        pos = (end - len(block)) % n
+        first = min(len(block), n - pos)
+        self._write(pos, block[:first])
+        if first < len(block):
+            self._write(0, block[first:])
+        self._header[WRITTEN] = end
+
+    def discard_last(self, k):
+        """Drop the newest k samples; their sequence numbers are reused by the next append"""
+        k = max(0, min(int(k), self._size))
+        if k == 0:
+            return
+        end = self.total_written - k
+        self._header[DISCARDS] += 1 # Odd: readers copying now may get rows the next append replaces
+        self._header[WRITTEN] = end
+        self._header[WRITING] = end
+        self._header[DISCARDS] += 1
+
+    def last(self, k):
+        """Copy of the last k samples"""
+        result = self._read(lambda total: k)
+        return result[0] if result is not None else np.empty((0, self.columns))
+
+    def since(self, seq):
+        return self.read_since(seq)[0]
+
+    def read_since(self, seq):
+        """(copy of the samples since total_written was seq, the total_written it is relative to)"""
+        result = self._read(lambda total: total - seq)
+        return result if result is not None else (np.empty((0, self.columns)), seq) # Nothing new, ask again later
+
+    def _read(self, count):
+        """(copy of the last count(total_written) rows, total_written), or None if discards kept overlapping the copy"""
+        for _ in range(DISCARD_RETRIES):
+            discards = int(self._header[DISCARDS])
+            if discards % 2 == 0:
+                total = self.total_written
+                rows = self._copy_last(total, count(total))
+                if int(self._header[DISCARDS]) == discards:
+                    return rows, total
+            time.sleep(0)
+        return None
+
+    def _copy_last(self, total, k):
+        n = self.capacity
+        k = max(0, min(int(k), total - int(self._header[OLDEST]), n))
+        end = total % n + n
+        rows = self._data[end - k:end].copy()
+        overwritten = int(self._header[WRITING]) - n - (total - k) # Oldest copied rows the writer may have reached
+        return rows[overwritten:] if overwritten > 0 else rows
+
+    def unlink(self):
+        try:
+            self.shm.unlink()
+        except FileNotFoundError:
+            pass
+
+
+class SharedStatus:
+    """JSON document in shared memory behind a seqlock
+
+    The sequence number is odd while the (single) writer is updating the
+    document; readers retry until they see the same even number before and
+    after their copy. It also counts updates, so readers can cheaply poll it
+    for changes. A separate header slot counts ingested batches, without
+    touching the document, and another one is set by readers that want a
+    wakeup with the next batch. If the writer process died in the middle of an update, the
+    number stays odd: after STATUS_READ_TIMEOUT readers return the last
+    document they read, and keep returning it at once while that update is
+    still unfinished.
+    """
+    _SEQ, _LENGTH, _INGESTS, _WAKEUP = 0, 1, 2, 3
+    _HEADER_BYTES = 32
+
+    def __init__(self, name, create=False, size=STATUS_BYTES):
+        shm = shared_memory.SharedMemory(name=name, create=create, size=size if create else 0)
+        self._header = np.ndarray((4,), dtype=np.int64, buffer=shm.buf)
+        if create:
+            self._header[:] = 0
+        self._lock = threading.Lock() # Writer threads of the owning process
+        self._last_read = (0, None) # (seq, document) of the last complete read
+        self._stuck_seq = None # Odd seq that outlasted STATUS_READ_TIMEOUT
+        self.shm = shm # Set last, see SharedRingBuffer
+
+    @property
+    def seq(self):
+        return int(self._header[self._SEQ])
+
+    @property
+    def ingest_count(self):
+        return int(self._header[self._INGESTS])
+
+    def count_ingest(self):
+        """Make ingest_count move; increments that race may collapse into one, which still shows a change"""
+        self._header[self._INGESTS] += 1
+
+    def request_wakeup(self):
+        """Reader side: ask the writer for a wakeup message with the next counted ingest"""
+        self._header[self._WAKEUP] = 1
+
+    def take_wakeup_request(self):
+        """Writer side: True (once) if a reader asked for a wakeup"""
+        if self._header[self._WAKEUP]:
+            self._header[self._WAKEUP] = 0
+            return True
+        return False
+
+    def write(self, document):
+        data = json.dumps(document, separators=(',', ':')).encode()
+        if len(data) > self.shm.size - self._HEADER_BYTES:
+            raise ValueError(f"Status of {len(data)} bytes does not fit in {self.shm.size}")
+        with self._lock:
+            self._header[self._SEQ] += 1
+            self._header[self._LENGTH] = len(data)
+            self.shm.buf[self._HEADER_BYTES:self._HEADER_BYTES + len(data)] = data
+            self._header[self._SEQ] += 1
+
+    def read(self):
+        """(seq, document), or (0, None) before the first write; the last good pair if the writer is stuck"""
+        deadline = None
+        while True:
+            seq = self.seq
+            if seq % 2:
+                if seq == self._stuck_seq:
+                    return self._last_read
+                if deadline is None:
+                    deadline = time.monotonic() + STATUS_READ_TIMEOUT
+                elif time.monotonic() > deadline:
+                    print(f"Shared status {self.shm.name} stuck mid-update; using the last complete status")
+                    self._stuck_seq = seq
+                    return self._last_read
+                time.sleep(0)
+                continue
+            length = int(self._header[self._LENGTH])
+            data = bytes(self.shm.buf[self._HEADER_BYTES:self._HEADER_BYTES + length])
+            if self.seq == seq:
+                self._last_read = (seq, json.loads(data) if seq else None)
+                return self._last_read
+
+    def unlink(self):
+        try:
+            self.shm.unlink()
+        except FileNotFoundError:
+            pass
+
+
+class SharedSessionRegistry(SessionRegistry):
+    """SessionRegistry of the ingest process: live buffers and per-batch counters in shared memory
+
+    Every batch writes its session's counter slots and bumps the ingest
+    count. The status document is republished by the batch that follows a
+    structural change (new session, new event), by control operations and
+    clear(), and by the flush_stale tick, which also refreshes the recorder
+    counters of sessions that went quiet.
+
+    Segments are named <prefix>_status and <prefix>_<n>, one per session.
+    """
+
+    def __init__(self, prefix, capacity, reassembly_options=None, wakeup_endpoint=DEFAULT_WAKEUP_ENDPOINT):
+        super().__init__(capacity, reassembly_options)
+        self.prefix = prefix
+        self._wakeup_socket = zmq.Context.instance().socket(zmq.PUB)
+        self._wakeup_socket.bind(wakeup_endpoint)
+        self._wakeup_lock = threading.Lock() # ZeroMQ sockets are not thread safe
+        self._segment_count = 0
+        self._dirty = False # Set by structural changes the status document does not show yet
+        self._published_segments = set()
+        self._published_errors = set() # Devices whose recorder error is in the status document
+        self._publish_lock = threading.Lock() # Documents are written in the order they were built
+        self.status = SharedStatus(f'{prefix}_status', create=True)
+        self.publish()
+
+    def _create_session(self, device_id):
+        self._segment_count += 1 # The registry lock is held
+        buffer = SharedRingBuffer(self.capacity, name=f'{self.prefix}_{self._segment_count}')
+        buffer.counters[INITIAL_WALL_CLOCK_TIME] = np.nan # No sample yet
+        session = DeviceSession(device_id, self.capacity, reassembly_options=self.reassembly_options,
+                                filter_stages=self.filter_stages, buffer=buffer,
+                                trigger_options=self.trigger_options, on_event=self._add_event)
+        session.on_ingest = lambda: self._session_ingested(session)
+        return session
+
+    def _add_event(self, event):
+        self.events.append(event)
+        self._dirty = True
+
+    def _session_ingested(self, session):
+        self._write_counters(session)
+        self._count_ingest()
+        SessionRegistry.notify_ingest(self)
+        if self._dirty or session.buffer.name not in self._published_segments:
+            self.publish()
+
+    def _write_counters(self, session):
+        """A session's per-batch values into the counter slots of its segment
+
+        Under the session lock, so writes from the ingest, flush and control
+        threads land in order and counters never step back.
+        """
+        counters = session.buffer.counters
+        with session.lock:
+            reassembler, recorder = session.reassembler, session.recorder
+            initial_time = session.initial_wall_clock_time
+            counters[INITIAL_WALL_CLOCK_TIME] = np.nan if initial_time is None else initial_time
+            counters[LAST_UPDATE_TIME] = session.last_update_time
+            counters[TOTAL_POINTS] = session.total_points_received
+            if reassembler is not None:
+                counters[LATE_SAMPLES:DROPPED_SAMPLES + 1] = (
+                    reassembler.late_samples, reassembler.duplicate_samples, reassembler.dropped_samples)
+            if recorder is not None:
+                counters[RECORDER_BACKLOG:SAMPLES_DROPPED + 1] = (
+                    recorder.backlog, recorder.samples_written, recorder.samples_dropped)
+                if recorder.error is not None and session.device_id not in self._published_errors:
+                    self._dirty = True # The writer failed since the last document
+
+    def notify_ingest(self):
+        # Called by clear(); batches go through _session_ingested
+        self._count_ingest()
+        super().notify_ingest()
+        self.publish()
+
+    def _count_ingest(self):
+        """Move the ingest count; send a wakeup only if a dashboard is waiting for one (one int read otherwise)"""
+        self.status.count_ingest()
+        if self.status.take_wakeup_request():
+            with self._wakeup_lock:
+                self._wakeup_socket.send(b'', zmq.NOBLOCK)
+
+    def flush_stale(self):
+        super().flush_stale()
+        for session in self.sessions():
+            self._write_counters(session) # Recorder queues keep draining after a device went quiet
+        if self._dirty: # Events of devices that went quiet
+            self.publish()
+
+    def clear(self):
+        old_sessions = self.sessions()
+        super().clear() # Publishes the empty registry before the segments go away
+        for session in old_sessions:
+            session.buffer.unlink() # Readers that still map it keep their copy
+
+    def close(self):
+        self.stop_recording()
+        for session in self.sessions():
+            session.buffer.unlink()
+        self.status.unlink()
+        self._wakeup_socket.close(linger=0)
+
+    def publish(self):
+        """Write the status document: sessions with their segments, recording, filter, pause and events"""
+        with self._publish_lock:
+            self._dirty = False # Changes from here on are either in this document or publish again
+            sessions = {}
+            for s in self.sessions():
+                self._write_counters(s) # Readers of a new document see the values that go with it
+                recorder = s.recorder
+                sessions[s.device_id] = {
+                    'segment': s.buffer.name,
+                    'reassembly': s.reassembler is not None,
+                    'recorder': recorder.filename if recorder is not None else None,
+                    'recorder_error': recorder.error if recorder is not None else None,
+                }
+            self.status.write({'sessions': sessions, 'filter_stages': self.filter_stages,
+                               'recording': self.recording is not None, 'paused': self.paused,
+                               'events': self.trigger_events})
+            self._published_segments = {session['segment'] for session in sessions.values()}
+            self._published_errors = {device_id for device_id, session in sessions.items() if session['recorder_error']}
+
+
+class ControlServer(threading.Thread):
+    """Applies the dashboard's control requests to a SharedSessionRegistry (REP socket)"""
+
+    def __init__(self, registry, endpoint=DEFAULT_CONTROL_ENDPOINT, poll_interval=0.5):
+        super().__init__(name='store-control', daemon=True)
+        self.registry = registry
+        self.poll_interval = poll_interval
+        self._socket = zmq.Context.instance().socket(zmq.REP)
+        self._socket.bind(endpoint)
+        self._stop_event = threading.Event()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def handle(self, request):
+        registry, op = self.registry, request['op']
+        if op == 'clear':
+            registry.clear()
+        elif op == 'configure_filter':
+            registry.configure_filter(request['filter_stages'])
+        elif op == 'set_paused':
+            registry.set_paused(request['paused'])
+        elif op == 'configure_triggers':
+            registry.configure_triggers(request['trigger_options'])
+        elif op == 'start_recording':
+            return registry.start_recording(request['directory'], request['base_name'], request['timestamp'],
+                                            request['file_format'], **request['recorder_options'])
+        elif op == 'stop_recording':
+            return registry.stop_recording()
+        else:
+            raise ValueError(f"Unknown control operation: {op}")
+
+    def run(self):
+        poll_ms = int(self.poll_interval * 1000)
+        try:
+            while not self._stop_event.is_set():
+                if not self._socket.poll(poll_ms):
+                    continue
+                request = self._socket.recv_json()
+                try:
+                    reply = {'ok': True, 'result': self.handle(request)}
+                except Exception as e:
+                    reply = {'ok': False, 'error': str(e)}
+                self.registry.publish()
+                self._socket.send_json(reply)
+        finally:
+            self._socket.close(linger=0)
+
+
+class RemoteSession:
+    """Read side of a DeviceSession in another process
+
+    The spectrogram and the rolling statistics are computed here, from the
+    shared buffer: reading them first feeds the engine the samples stored
+    since the last read (callers of the spectrogram attribute hold lock, as
+    with DeviceSession).
+    """
+
+    def __init__(self, device_id, segment, spectrogram_options=None, stats_options=None):
+        self.device_id = device_id
+        self.buffer = SharedRingBuffer.attach(segment)
+        self.lock = threading.Lock() # Guards the local spectrogram and stats engines
+        self._has_reassembly = False
+        self.recording_filename = None
+        self._spectrogram = StreamingSTFT(**spectrogram_options) if spectrogram_options is not None else None
+        self._fed_seq = 0
+        self._stats = RollingStats(**stats_options) if stats_options is not None else None
+        self._stats_fed_seq = 0
+
+    def update(self, status):
+        self._has_reassembly = status['reassembly']
+        self.recording_filename = status['recorder']
+        self.recording_error = status['recorder_error']
+
+    # Values that change with every batch, read from the segment's counter slots
+    @property
+    def initial_wall_clock_time(self):
+        value = float(self.buffer.counters[INITIAL_WALL_CLOCK_TIME])
+        return None if np.isnan(value) else value
+
+    @property
+    def last_update_time(self):
+        return float(self.buffer.counters[LAST_UPDATE_TIME])
+
+    @property
+    def total_points_received(self):
+        return int(self.buffer.counters[TOTAL_POINTS])
+
+    @property
+    def reassembly(self):
+        """[late, duplicate, dropped] sample counts, or None without reassembly"""
+        if not self._has_reassembly:
+            return None
+        return [int(count) for count in self.buffer.counters[LATE_SAMPLES:DROPPED_SAMPLES + 1]]
+
+    @property
+    def recorder(self):
+        if self.recording_filename is None:
+            return None
+        backlog, written, dropped = (int(count) for count in self.buffer.counters[RECORDER_BACKLOG:SAMPLES_DROPPED + 1])
+        return types.SimpleNamespace(filename=self.recording_filename, backlog=backlog, samples_written=written,
+                                     samples_dropped=dropped, error=self.recording_error)
+
+    def read_since(self, seq):
+        """Same as DeviceSession.read_since, without a lock"""
+        total = self.buffer.total_written
+        return self.buffer.read_since(seq if seq <= total else 0)
+
+    def set_spectrogram(self, spectrogram_options):
+        engine = StreamingSTFT(**spectrogram_options) if spectrogram_options is not None else None
+        with self.lock:
+            self._spectrogram = engine
+            self._fed_seq = self.buffer.total_written # Start from new samples, like a new engine in the ingest process
+
+    @property
+    def spectrogram(self):
+        if self._spectrogram is not None:
+            self._fed_seq = self._feed(self._spectrogram, self._fed_seq)
+        return self._spectrogram
+
+    def set_stats(self, stats_options):
+        engine = RollingStats(**stats_options) if stats_options is not None else None
+        with self.lock:
+            self._stats = engine
+            self._stats_fed_seq = 0 # The window can start from everything still buffered
+
+    def stats_snapshot(self):
+        with self.lock:
+            if self._stats is None:
+                return None
+            self._stats_fed_seq = self._feed(self._stats, self._stats_fed_seq)
+            return self._stats.snapshot()
+
+    def _feed(self, engine, fed_seq):
+        """Update engine with the samples stored since fed_seq (all of them after a clear); returns the new fed_seq"""
+        rows, total = self.read_since(fed_seq)
+        if len(rows):
+            engine.update(rows)
+        return total
+
+
+class SharedStoreClient:
+    """SessionRegistry look-alike for dashboard processes, backed by an ingest process's SharedSessionRegistry
+
+    Batches passed to ingest() are forwarded to the ingest process over the
+    ingest broker; reads come from shared memory.
+    """
+
+    def __init__(self, prefix, control_endpoint=DEFAULT_CONTROL_ENDPOINT, broker_endpoint=ingest_broker.DEFAULT_ENDPOINT,
+                 reassembly_options=None, connect_timeout=10.0, wakeup_endpoint=DEFAULT_WAKEUP_ENDPOINT):
+        deadline = time.monotonic() + connect_timeout
+        while True:
+            try:
+                self.status = SharedStatus(f'{prefix}_status')
+                break
+            except FileNotFoundError:
+                if time.monotonic() > deadline:
+                    raise
+                time.sleep(0.05)
+        self.control_endpoint = control_endpoint
+        self.wakeup_endpoint = wakeup_endpoint
+        self.reassembly_options = reassembly_options # For display only; the ingest process applies its own
+        self.spectrogram_options = None # The spectrogram is computed in this process
+        self.stats_options = None # So are the rolling statistics
+        self.on_create = None
+        self._forwarder = ingest_broker.BatchForwarder(broker_endpoint)
+        self._control_socket = None
+        self._control_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._seen_seq = -1
+        self._document = {'sessions': {}, 'filter_stages': [], 'recording': False, 'paused': False, 'events': []}
+        self._sessions = {}
+        self._ingest_condition = threading.Condition()
+        self._waiters = 0 # Threads in wait_for_ingest
+        self._watcher = None # Thread turning wakeup messages into notifications, started by the first wait
+
+    def _refresh(self):
+        """Current status document, re-read only when its sequence number moved"""
+        if self.status.seq == self._seen_seq:
+            return self._document
+        with self._lock:
+            seq, document = self.status.read()
+            if seq != self._seen_seq and document is not None:
+                sessions = {}
+                for device_id, status in document['sessions'].items():
+                    session = self._sessions.get(device_id)
+                    if session is None or session.buffer.name.lstrip('/') != status['segment'].lstrip('/'):
+                        session = RemoteSession(device_id, status['segment'], self.spectrogram_options, self.stats_options)
+                    session.update(status)
+                    sessions[device_id] = session
+                self._sessions, self._document = sessions, document
+            self._seen_seq = seq
+        return self._document
+
+    def _control(self, op, **arguments):
+        with self._control_lock:
+            if self._control_socket is None:
+                self._control_socket = zmq.Context.instance().socket(zmq.REQ)
+                self._control_socket.setsockopt(zmq.LINGER, 0)
+                self._control_socket.connect(self.control_endpoint)
+            self._control_socket.send_json({'op': op, **arguments})
+            if not self._control_socket.poll(int(CONTROL_TIMEOUT * 1000)):
+                self._control_socket.close() # A REQ socket cannot send again before it got its reply
+                self._control_socket = None
+                raise TimeoutError(f"Ingest process did not answer '{op}' within {CONTROL_TIMEOUT}s")
+            reply = self._control_socket.recv_json()
+        if not reply['ok']:
+            raise RuntimeError(reply['error'])
+        return reply['result']
+
+    def ingest(self, device_id, times_ns, values):
+        if not self._forwarder.send(device_id, times_ns, values):
+            raise RuntimeError("Ingest process is not keeping up")
+
+    def peek(self, device_id):
+        self._refresh()
+        return self._sessions.get(device_id)
+
+    def sessions(self):
+        self._refresh()
+        return list(self._sessions.values())
+
+    def device_ids(self):
+        self._refresh()
+        return list(self._sessions.keys())
+
+    @property
+    def filter_stages(self):
+        return [tuple(stage) for stage in self._refresh()['filter_stages']]
+
+    @property
+    def recording(self):
+        return self._refresh()['recording']
+
+    @property
+    def paused(self):
+        return self._refresh()['paused']
+
+    def configure_filter(self, filter_stages):
+        self._control('configure_filter', filter_stages=list(filter_stages or []))
+
+    def configure_spectrogram(self, spectrogram_options):
+        self.spectrogram_options = spectrogram_options
+        for session in self.sessions():
+            session.set_spectrogram(spectrogram_options)
+
+    def configure_stats(self, stats_options):
+        self.stats_options = stats_options
+        for session in self.sessions():
+            session.set_stats(stats_options)
+
+    def configure_triggers(self, trigger_options):
+        self._control('configure_triggers', trigger_options=trigger_options)
+
+    @property
+    def trigger_events(self):
+        return self._refresh()['events']
+
+    def set_paused(self, paused):
+        self._control('set_paused', paused=bool(paused))
+
+    def start_recording(self, directory, base_name, timestamp, file_format='csv', **recorder_options):
+        return self._control('start_recording', directory=directory, base_name=base_name, timestamp=timestamp,
+                             file_format=file_format, recorder_options=recorder_options)
+
+    def stop_recording(self):
+        return self._control('stop_recording')
+
+    def clear(self):
+        self._control('clear')
+
+    def flush_stale(self):
+        pass # Done by the ingest process
+
+    def notify_ingest(self):
+        pass # The ingest process counts and signals its batches
+
+    @property
+    def ingest_count(self):
+        return self.status.ingest_count
+
+    def wait_for_ingest(self, seen_count, timeout):
+        """Block until the ingest count differs from seen_count or timeout seconds pass; returns the count"""
+        with self._ingest_condition:
+            if self._watcher is None:
+                self._watcher = threading.Thread(target=self._watch_ingest, name='store-ingest-watcher', daemon=True)
+                self._watcher.start()
+            self._waiters += 1
+            self._ingest_condition.notify_all() # Wakes the watcher if nobody was waiting
+            try:
+                self._ingest_condition.wait_for(lambda: self.status.ingest_count != seen_count, timeout)
+            finally:
+                self._waiters -= 1
+        return self.status.ingest_count
+
+    def _watch_ingest(self):
+        """While threads wait for ingest: ask the ingest process for a wakeup, block until it comes, notify them
+
+        Idle (blocked on the condition) while nobody waits. The wakeup flag and
+        the ingest count are plain shared memory, so a request can rarely miss
+        the batch it raced with; the count is then rechecked after
+        WAKEUP_SAFETY_INTERVAL.
+        """
+        socket = zmq.Context.instance().socket(zmq.SUB)
+        socket.setsockopt(zmq.SUBSCRIBE, b'')
+        socket.connect(self.wakeup_endpoint)
+        safety_ms = int(WAKEUP_SAFETY_INTERVAL * 1000)
+        while True:
+            with self._ingest_condition:
+                self._ingest_condition.wait_for(lambda: self._waiters > 0)
+            count = self.status.ingest_count
+            self.status.request_wakeup()
+            if self.status.ingest_count == count and socket.poll(safety_ms):
+                while socket.poll(0):
+                    socket.recv() # Wakeups of earlier requests are all answered by this one
+            with self._ingest_condition:
+                self._ingest_condition.notify_all()
+
+    # Aggregates, same as SessionRegistry
+    origin = SessionRegistry.origin
+    time_offset = SessionRegistry.time_offset
+    total_points_received = SessionRegistry.total_points_received
+    recorder_backlog = SessionRegistry.recorder_backlog
+    recording_errors = SessionRegistry.recording_errors
+    last_update_time = SessionRegistry.last_update_time
+
+    @property
+    def reassembly_counters(self):
+        counts = [s.reassembly for s in self.sessions() if s.reassembly is not None]
+        return dict(zip(('late', 'duplicate', 'dropped'), (sum(c[i] for c in counts) for i in range(3))))
@@ -1,23 +1,26 @@
 from flask import Flask, request
 import threading
 import queue
-import json
-import matplotlib.pyplot as plt
-import matplotlib.animation as animation
 import numpy as np
 import time
 from scipy.interpolate import PchipInterpolator
-from collections import deque
+from ring_buffer import T, X, Y, Z
+from windowing import SlidingWindow
+from reassembly import Reassembler
+from filters import FilterChain, PRESETS
+import ingest
+import serve
 
 # Flask sunucusu
 app = Flask(__name__)
+FLASK_HOST = "0.0.0.0"  # Bağlama adresi
+FLASK_PORT = 6000
+FLASK_THREADS = 8       # Eşzamanlı /sensor isteği sayısı (waitress yüklüyse)
 
 # Veri tamponları
 BUFFER_SIZE = 10000
-times_buffer = deque(maxlen=BUFFER_SIZE)
-x_buffer = deque(maxlen=BUFFER_SIZE)
-y_buffer = deque(maxlen=BUFFER_SIZE)
-z_buffer = deque(maxlen=BUFFER_SIZE)
+sample_buffer = SlidingWindow(BUFFER_SIZE)  # Zamana göre sıralı [zaman, x, y, z] satırları, pencere min/max'ı artımlı
+reassembler = Reassembler()  # Geç gelen paketleri sıraya koyar, tekrar gönderilen paketleri atar
 
 # Animasyon parametreleri
 DISPLAY_WINDOW = 8.0  # saniye
@@ -31,6 +34,8 @@ density_update_rate = 0.3  # veri yoğunluğu güncelleme hızı
 
 # Veri filtreleme ve eksen parametreleri
 ENABLE_FILTERING = False      # Veri filtreleme aktif/pasif
+FILTER_PRESET = 'gravity'     # ENABLE_FILTERING açıkken kullanılan filters.PRESETS zinciri
+filter_chain = FilterChain(PRESETS[FILTER_PRESET]) if ENABLE_FILTERING else None  # Durumlu IIR filtre zinciri
 FIXED_Y_SCALE = False         # Y ekseni sabit ölçeklendirme
 Y_MIN = -0.15                 # Y ekseni minimum değeri (sabit ölçekle kullanılır)
 Y_MAX = 0.15                  # Y ekseni maksimum değeri (sabit ölçekle kullanılır)
@@ -60,24 +65,29 @@ y_scale_update_rate = 0.2  # Y ekseni ölçeğinin yumuşak değişim oranı (da
 
 # Veri ve ekran noktaları - başlangıçta varsayılan değerlerle doldur
 n_points = 100  # Başlangıç için varsayılan değer
-display_times = np.linspace(0, DISPLAY_WINDOW, n_points)
-display_x = np.zeros(n_points)
-display_y = np.zeros(n_points)
-display_z = np.zeros(n_points)
+
+def empty_display_data():
+    """Veri gelmeden önce gösterilen (n_points, 4) [zaman, x, y, z] dizisi"""
+    data = np.zeros((n_points, 4))
+    data[:, T] = np.linspace(0, DISPLAY_WINDOW, n_points)
+    return data
+
+# Animasyon thread'i kilitsiz okur: sütunlar tek bir dizide tutulur ve dizi tek atamayla değiştirilir,
+# böylece zaman ve x/y/z sütunları hiçbir zaman farklı güncellemelerden gelmez
+display_data = empty_display_data()
 
 def reset_all_buffers():
     """Tüm tamponları ve zamanlamayı sıfırla"""
-    global times_buffer, x_buffer, y_buffer, z_buffer
     global start_time, base_time, virtual_time_offset, last_data_time
-    global display_times, display_x, display_y, display_z
-    global y_min_value, y_max_value, points_per_second, last_density_calc_time
+    global display_data
+    global y_min_value, y_max_value, points_per_second, last_density_calc_time, filter_chain
     global last_data_count, data_received, RESET_NEEDED
     
     # Tamponları temizle
-    times_buffer.clear()
-    x_buffer.clear()
-    y_buffer.clear()
-    z_buffer.clear()
+    sample_buffer.clear()
+    reassembler.clear()
+    # Filtre durumu yeni akışla baştan başlar
+    filter_chain = FilterChain(PRESETS[FILTER_PRESET]) if ENABLE_FILTERING else None
     
     # Zaman referanslarını sıfırla
     start_time = None
@@ -88,10 +98,7 @@ def reset_all_buffers():
     last_data_count = 0
     
     # Ekran verilerini sıfırla
-    display_times = np.linspace(0, DISPLAY_WINDOW, n_points)
-    display_x = np.zeros(n_points)
-    display_y = np.zeros(n_points)
-    display_z = np.zeros(n_points)
+    display_data = empty_display_data()
     
     # Y-ekseni sınırlarını varsayılan değerlere ayarla
     y_min_value = -0.1
@@ -108,10 +115,8 @@ def reset_all_buffers():
 @app.route('/sensor', methods=['POST'])
 def receive_data():
     global data_received, last_data_time, virtual_time_offset, last_data_count, FLOW_PAUSED, RESET_NEEDED
-    data = request.data.decode('utf-8')
     try:
-        parsed = json.loads(data)
-        acc_data = [entry for entry in parsed['payload'] if entry['name'] == 'accelerometer']
+        times_ns, values = ingest.accelerometer_columns(ingest.loads(request.get_data()))
         
         with buffer_lock:
             # Eğer önceden akış durdurulduysa ve yeni veri geldiyse, tamamen sıfırla
@@ -124,41 +129,45 @@ def receive_data():
                 if 'fig' in globals() and 'ax' in globals():
                     ax.set_title("Gerçek Zamanlı İvmeölçer Verisi - Ham Veri")
             
-            # Yeni verileri işle
-            for entry in acc_data:
-                process_data_point(entry)
+            # Yeni verileri tek blok halinde işle
+            if len(times_ns) > 0:
+                process_data_block(times_ns, values)
             
             # Veri yoğunluğu hesaplaması için veri sayısını artır
-            last_data_count += len(acc_data)
+            last_data_count += len(times_ns)
             
             data_received = True
             last_data_time = time.time()
             
-        print(f"Veri alındı: {len(acc_data)} nokta, toplam: {len(times_buffer)}")
+        print(f"Veri alındı: {len(times_ns)} nokta, toplam: {len(sample_buffer)}")
     except Exception as e:
         print(f"Hata: {e}")
     return "OK", 200
 
-def process_data_point(entry):
-    """Her bir veri noktasını işle ve tampona ekle"""
+def process_data_block(times_ns, values):
+    """Bir paketteki tüm veri noktalarını tek blok halinde tampona ekle"""
+    # Titreşim tamponundan çıkan (sıralı, tekrarsız) örnekler
+    store_samples(*reassembler.push(times_ns, values))
+
+def store_samples(times_ns, values):
+    """Sıralanmış örnekleri tampona yaz"""
     global base_time, start_time
     
-    current_time = entry['time']
+    if len(times_ns) == 0:
+        return
     
     # İlk veri için referans zamanlarını ayarla
     if base_time is None:
-        base_time = current_time
+        base_time = int(times_ns[0])
         start_time = time.time()
         print(f"İlk veri alındı, referans zamanı: {base_time}")
     
-    # Sensör verisinden gerçek zamanı hesapla (saniye)
-    real_time = (current_time - base_time) / 1e9
-    
-    # Verileri tampona ekle
-    times_buffer.append(real_time)
-    x_buffer.append(entry['values']['x'])
-    y_buffer.append(entry['values']['y'])
-    z_buffer.append(entry['values']['z'])
+    # Sensör verisinden gerçek zamanı hesapla (saniye) ve verileri tampona ekle
+    block = ingest.make_block(times_ns, values, base_time)
+    # Her örnek geldiğinde bir kez filtrelenir; filtre durumu paketler arasında korunur
+    if filter_chain is not None:
+        block[:, 1:] = filter_chain.apply(block[:, T], block[:, 1:])
+    sample_buffer.append_block(block)
 
 def update_data_density():
     """Saniyede gelen veri noktası sayısını hesapla ve güncelle"""
@@ -225,7 +234,7 @@ def get_virtual_time():
 
 def update_display_data():
     """Görüntülenecek verileri günceller"""
-    global display_times, display_x, display_y, display_z, y_min_value, y_max_value
+    global display_data, y_min_value, y_max_value
     
     # Veri yoğunluğunu güncelle
     update_data_density()
@@ -238,6 +247,9 @@ def update_display_data():
         return
     
     with buffer_lock:
+        # Veri kesildiyse titreşim tamponunda bekleyen örnekleri bırak
+        store_samples(*reassembler.flush_stale())
+        
         # Mevcut sanal zamanı al
         current_time = max(0.1, get_virtual_time())
         
@@ -245,36 +257,17 @@ def update_display_data():
         window_start = max(0, current_time - DISPLAY_WINDOW)
         
         # Gösterilecek zaman değerlerini ham verileri kullanarak belirle
-        if len(times_buffer) > 0:
-            # Gerçek veri noktaları
-            real_times = np.array(list(times_buffer))
-            real_x = np.array(list(x_buffer))
-            real_y = np.array(list(y_buffer))
-            real_z = np.array(list(z_buffer))
-            
-            # Verileri sırala (zaman sırasına göre)
-            sort_idx = np.argsort(real_times)
-            real_times = real_times[sort_idx]
-            real_x = real_x[sort_idx]
-            real_y = real_y[sort_idx]
-            real_z = real_z[sort_idx]
+        if len(sample_buffer) > 0:
+            # Tampon zaten zamana göre sıralı: pencere sınırları ikili aramayla, min/max monoton kuyruklardan
+            visible, vmin, vmax = sample_buffer.window(window_start, current_time)
             
-            # Son DISPLAY_WINDOW saniyedeki verileri filtrele
-            visible_indices = np.where((real_times >= window_start) & (real_times <= current_time))[0]
-            
-            if len(visible_indices) > 0:
-                # Görünür penceredeki verileri hazırla
-                display_times = real_times[visible_indices]
-                display_x = real_x[visible_indices]
-                display_y = real_y[visible_indices]
-                display_z = real_z[visible_indices]
+            if len(visible) > 0:
+                # Görünür penceredeki verileri hazırla (animasyon thread'i kilitsiz okuduğu için kopya, tek atamayla yayınlanır)
+                display_data = visible.copy()
                 
                 # Y ekseni için sınırları güncelle
-                if len(display_x) > 0 and not FIXED_Y_SCALE:
-                    all_values = np.concatenate([display_x, display_y, display_z])
-                    if len(all_values) > 0:
-                        vmin, vmax = np.nanmin(all_values), np.nanmax(all_values)
-                        
+                if not FIXED_Y_SCALE:
+                    if vmin is not None:
                         # Extreme değerleri filtrele
                         if not np.isnan(vmin) and not np.isnan(vmax):
                             # Y eksenini kademeli olarak güncelle
@@ -297,20 +290,20 @@ def display_update_loop():
         time.sleep(1.0 / ANIMATION_FPS)
 
 def run_flask():
-    app.run(host="0.0.0.0", port=6000)
+    serve.serve_wsgi(app, FLASK_HOST, FLASK_PORT, FLASK_THREADS)
 
 # Grafik animasyon fonksiyonu
 def animate(i):
-    global display_times, display_x, display_y, display_z
+    data = display_data # Tek okuma: tüm sütunlar aynı güncellemeden
     
     # Dizilerin boyutlarını kontrol et
-    if len(display_times) < 2:
+    if len(data) < 2:
         return line_x, line_y, line_z
     
     # Verileri grafik çizgilerine uygula
-    line_x.set_data(display_times, display_x)
-    line_y.set_data(display_times, display_y)
-    line_z.set_data(display_times, display_z)
+    line_x.set_data(data[:, T], data[:, X])
+    line_y.set_data(data[:, T], data[:, Y])
+    line_z.set_data(data[:, T], data[:, Z])
     
     # X ekseni - her zaman son DISPLAY_WINDOW saniyeyi göster
     current_time = get_virtual_time()
@@ -331,38 +324,43 @@ def animate(i):
     
     return line_x, line_y, line_z
 
-# Flask sunucusunu başlat
-flask_thread = threading.Thread(target=run_flask)
-flask_thread.daemon = True
-flask_thread.start()
+# Sunucu ve arayüz sadece doğrudan çalıştırıldığında başlar (benchmarks/ gibi araçlar modülü GUI olmadan içe aktarabilir)
+if __name__ == '__main__':
+    import matplotlib.pyplot as plt
+    import matplotlib.animation as animation
+
+    # Flask sunucusunu başlat
+    flask_thread = threading.Thread(target=run_flask)
+    flask_thread.daemon = True
+    flask_thread.start()
 
-# Veri güncelleme döngüsünü başlat
-update_thread = threading.Thread(target=display_update_loop)
-update_thread.daemon = True
-update_thread.start()
+    # Veri güncelleme döngüsünü başlat
+    update_thread = threading.Thread(target=display_update_loop)
+    update_thread.daemon = True
+    update_thread.start()
 
-print("Server başlatıldı, veri bekleniyor... (Port: 6000)")
-print(f"Ham veri görüntüleniyor, Y-ekseni: {'Sabit' if FIXED_Y_SCALE else 'Otomatik'}")
-print("Veri yoğunluğu otomatik hesaplanıyor (başlangıç: 20 nokta/sn)")
-print(f"{MAX_NO_DATA_TIME} saniye veri gelmezse akış durdurulacak ve yeni veri geldiğinde baştan başlayacak")
+    print("Server başlatıldı, veri bekleniyor... (Port: 6000)")
+    print(f"Ham veri görüntüleniyor, Y-ekseni: {'Sabit' if FIXED_Y_SCALE else 'Otomatik'}")
+    print("Veri yoğunluğu otomatik hesaplanıyor (başlangıç: 20 nokta/sn)")
+    print(f"{MAX_NO_DATA_TIME} saniye veri gelmezse akış durdurulacak ve yeni veri geldiğinde baştan başlayacak")
 
-# Grafik arayüzünü hazırla
-fig, ax = plt.subplots(figsize=(12, 6))
-ax.set_xlabel("Zaman (dakika:saniye)")
-ax.set_ylabel("İvme (m/s²)")
-ax.set_title("Gerçek Zamanlı İvmeölçer Verisi - Ham Veri")
-ax.grid(True)
+    # Grafik arayüzünü hazırla
+    fig, ax = plt.subplots(figsize=(12, 6))
+    ax.set_xlabel("Zaman (dakika:saniye)")
+    ax.set_ylabel("İvme (m/s²)")
+    ax.set_title("Gerçek Zamanlı İvmeölçer Verisi - Ham Veri")
+    ax.grid(True)
 
-# Grafik çizgilerini oluştur
-line_x, = ax.plot([], [], 'b-', label="X", linewidth=1.5)
-line_y, = ax.plot([], [], 'r-', label="Y", linewidth=1.5)
-line_z, = ax.plot([], [], 'g-', label="Z", linewidth=1.5)
-ax.legend(loc="upper right")
+    # Grafik çizgilerini oluştur
+    line_x, = ax.plot([], [], 'b-', label="X", linewidth=1.5)
+    line_y, = ax.plot([], [], 'r-', label="Y", linewidth=1.5)
+    line_z, = ax.plot([], [], 'g-', label="Z", linewidth=1.5)
+    ax.legend(loc="upper right")
 
-# X ekseni başlangıç ayarı
-ax.set_xlim(0, DISPLAY_WINDOW)
-ax.set_ylim(-0.1, 0.1)  # Başlangıç için varsayılan değerler
+    # X ekseni başlangıç ayarı
+    ax.set_xlim(0, DISPLAY_WINDOW)
+    ax.set_ylim(-0.1, 0.1)  # Başlangıç için varsayılan değerler
 
-# Animasyonu başlat
-ani = animation.FuncAnimation(fig, animate, interval=1000/ANIMATION_FPS, blit=True)
-plt.show()
\ No newline at end of file
+    # Animasyonu başlat
+    ani = animation.FuncAnimation(fig, animate, interval=1000/ANIMATION_FPS, blit=True)
+    plt.show()
@@ -0,0 +1,72 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from ring_buffer import RingBuffer
+
+DEFAULT_WINDOW_SIZE = 256 # Samples per FFT frame
+DEFAULT_HOP = 64 # Samples between consecutive frames
+DEFAULT_COLUMNS = 512 # Spectral columns kept per session
+AXES = 3
+DB_FLOOR = 1e-6 # Magnitude floor before taking the log
+
+
+class StreamingSTFT:
+    """Incremental short-time Fourier transform of [time, x, y, z] blocks
+
+    Only the frames completed by each new block are transformed; the samples
+    that do not yet fill a frame (plus the window/hop overlap) are carried over
+    to the next block. Every frame becomes one spectral column
+    [center time, x magnitudes (dB)..., y..., z...] in a ring buffer, so
+    readers fetch new columns with since(seq) like the sample buffers.
+    Each frame has its mean removed first, so gravity does not swamp the DC bin.
+    """
+
+    def __init__(self, window_size=DEFAULT_WINDOW_SIZE, hop=DEFAULT_HOP, columns=DEFAULT_COLUMNS,
+                 window='hann', sample_rate=None):
+        if not 0 < hop <= window_size:
+            raise ValueError(f"hop must be in 1..{window_size}, got {hop}")
+        self.window_size = int(window_size)
+        self.hop = int(hop)
+        self.sample_rate = sample_rate # Estimated from the first frames when None
+        from scipy import signal # Deferred to the first engine: most dashboards never show the spectrogram
+        self._window = signal.get_window(window, self.window_size)
+        self._scale = 2.0 / self._window.sum() # Amplitude of a sinusoid that fills a bin
+        self.n_freqs = self.window_size // 2 + 1
+        self.columns = RingBuffer(columns, columns=1 + AXES * self.n_freqs)
+        self._pending = np.empty((0, 4))
+
+    @property
+    def frequencies(self):
+        """Frequency of every bin in Hz (None until the sample rate is known)"""
+        if not self.sample_rate:
+            return None
+        return np.fft.rfftfreq(self.window_size, 1.0 / self.sample_rate)
+
+    def update(self, block):
+        """Feed a (k, 4) sample block; returns the number of new spectral columns"""
+        data = np.concatenate((self._pending, block)) if len(self._pending) else np.asarray(block, dtype=np.float64)
+        n_frames = (len(data) - self.window_size) // self.hop + 1
+        if n_frames <= 0:
+            self._pending = data.copy()
+            return 0
+        if not self.sample_rate:
+            times = data[:self.window_size, 0]
+            if times[-1] > times[0]:
+                self.sample_rate = (self.window_size - 1) / (times[-1] - times[0])
+
+        # (n_frames, 3, window_size) strided view, no copy until the window is applied
+        frames = sliding_window_view(data[:, 1:], self.window_size, axis=0)[::self.hop][:n_frames]
+        frames = (frames - frames.mean(axis=-1, keepdims=True)) * self._window
+        magnitude = np.abs(np.fft.rfft(frames, axis=-1)) * self._scale
+
+        rows = np.empty((n_frames, self.columns.columns))
+        rows[:, 0] = data[np.arange(n_frames) * self.hop + self.window_size // 2, 0]
+        rows[:, 1:] = 20.0 * np.log10(np.maximum(magnitude, DB_FLOOR)).reshape(n_frames, -1)
+        self.columns.append_block(rows)
+        self._pending = data[n_frames * self.hop:].copy()
+        return n_frames
+
+    def since(self, seq):
+        """(times, dB (k, 3, n_freqs)) of the columns added since columns.total_written was seq"""
+        rows = self.columns.since(seq)
+        return rows[:, 0], rows[:, 1:].reshape(len(rows), AXES, self.n_freqs)
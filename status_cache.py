@@ -0,0 +1,70 @@
+"""Server-side status snapshots shared by every dashboard tab and sent to each one as changes only"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_HISTORY = 16 # Snapshots kept to diff against; a tab further behind gets every value
+
+
+class SnapshotCache:
+    """Calls compute() at most once per max_age seconds, whatever the number of callers, and versions the results
+
+    compute() returns a dict of output values (JSON-able, compared with ==).
+    The version only changes when some value changed. The last `history`
+    snapshots are kept so changes(version) can return just the values that
+    differ from the snapshot a client already shows: memory is bounded by
+    history, not by the number of clients. Versions are strings carrying a
+    per-instance token, so a tab still open from before a server restart
+    gets every value instead of a diff against an unrelated snapshot.
+    """
+
+    def __init__(self, compute, max_age=1.0, history=DEFAULT_HISTORY):
+        self.compute = compute
+        self.max_age = max_age
+        self.history = history
+        self.computed = 0 # compute() calls, for comparison with the number of requests served
+        self._token = os.urandom(4).hex()
+        self._count = 0
+        self._snapshots = OrderedDict() # version -> values, oldest first
+        self._computed_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def version(self):
+        return f"{self._token}.{self._count}"
+
+    def _refresh(self):
+        now = time.monotonic()
+        if self._computed_at is not None and now - self._computed_at < self.max_age:
+            return
+        values = self.compute()
+        self._computed_at = now
+        self.computed += 1
+        if values != self._snapshots.get(self.version):
+            self._count += 1
+            self._snapshots[self.version] = values
+            while len(self._snapshots) > self.history:
+                self._snapshots.popitem(last=False)
+
+    def invalidate(self):
+        """Recompute on the next call, e.g. right after an action that changed the values"""
+        with self._lock:
+            self._computed_at = None
+
+    def get(self):
+        """(version, values) of the current snapshot, recomputed if it is older than max_age"""
+        with self._lock:
+            self._refresh()
+            return self.version, self._snapshots[self.version]
+
+    def changes(self, known_version):
+        """(version, values that differ from snapshot known_version); every value if that one is unknown or gone"""
+        with self._lock:
+            self._refresh()
+            version = self.version
+            values = self._snapshots[version]
+            known = self._snapshots.get(known_version)
+        if known is None:
+            return version, dict(values)
+        return version, {key: value for key, value in values.items() if known.get(key) != value}
@@ -0,0 +1,207 @@
+"""Threshold, magnitude and slope triggers with pre/post-trigger capture of events
+
+Conditions are tuples, like filter stages:
+
+    ('threshold', axis, level)   |value| >= level on axis 'x', 'y', 'z' or 'any'
+    ('magnitude', level)         sqrt(x^2 + y^2 + z^2) >= level
+    ('slope', axis, level)       |d value / dt| >= level (units per second), also across batches
+
+A TriggerEngine evaluates them on every stored block with a few array
+operations and keeps the last pre_seconds of raw samples. When a condition is
+met it collects the samples up to post_seconds after the trigger and hands
+the event window to a background writer thread, so ingest never waits on disk.
+"""
+import queue
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+import numpy as np
+
+from recorder import AsyncRecorder
+
+AXES = {'x': 0, 'y': 1, 'z': 2}
+DEFAULT_PRE_SECONDS = 1.0
+DEFAULT_POST_SECONDS = 2.0
+DEFAULT_BASE_NAME = 'event'
+STALE_GRACE = 2.0 # s of wall clock time past the post-trigger window before a quiet device's event is saved as is
+MAX_PENDING_WRITES = 64 # Event windows waiting for the writer thread before new ones are dropped
+
+
+def describe(condition):
+    """Short label of a condition, e.g. '|z| ≥ 15' or '|a| ≥ 20'"""
+    kind, *args = condition
+    if kind == 'magnitude':
+        return f"|a| ≥ {args[0]:g}"
+    axis, level = args
+    name = axis if axis != 'any' else 'x/y/z'
+    return f"|{name}| ≥ {level:g}" if kind == 'threshold' else f"|d{name}/dt| ≥ {level:g}"
+
+
+def validate(conditions):
+    """Raise ValueError for an unknown condition kind or axis"""
+    for condition in conditions:
+        kind, *args = condition
+        if kind == 'magnitude' and len(args) == 1:
+            continue
+        if kind in ('threshold', 'slope') and len(args) == 2 and (args[0] in AXES or args[0] == 'any'):
+            continue
+        raise ValueError(f"Invalid trigger condition: {condition!r}")
+
+
+def _axis_values(values, axis):
+    return np.abs(values if axis == 'any' else values[:, AXES[axis]:AXES[axis] + 1])
+
+
+def first_trigger(conditions, block, previous=None):
+    """(row index, condition, value) of the first sample of a (k, 4) block meeting any condition, or None
+
+    previous is the [time, x, y, z] row before the block, for slopes across batches.
+    """
+    best = None
+    values = block[:, 1:]
+    for condition in conditions:
+        kind, *args = condition
+        if kind == 'magnitude':
+            measure = np.sqrt(np.einsum('ij,ij->i', values, values))[:, None]
+            level = args[0]
+        elif kind == 'threshold':
+            axis, level = args
+            measure = _axis_values(values, axis)
+        else: # slope
+            axis, level = args
+            rows = block if previous is None else np.vstack((previous, block))
+            dt = np.diff(rows[:, 0])
+            with np.errstate(divide='ignore', invalid='ignore'):
+                slopes = np.diff(rows[:, 1:], axis=0) / dt[:, None]
+            slopes[dt <= 0] = 0.0 # Repeated timestamps carry no slope
+            measure = _axis_values(slopes, axis)
+            if previous is None: # The first row has no slope of its own
+                measure = np.vstack((np.zeros((1, measure.shape[1])), measure))
+        hits = np.flatnonzero((measure >= level).any(axis=1))
+        if len(hits) and (best is None or hits[0] < best[0]):
+            best = (int(hits[0]), condition, float(measure[hits[0]].max()))
+    return best
+
+
+class EventWriter(threading.Thread):
+    """Writes captured event windows to files, one AsyncRecorder per event, off the ingest path"""
+
+    def __init__(self):
+        super().__init__(name='event-writer', daemon=True)
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=MAX_PENDING_WRITES)
+
+    def submit(self, filename, block, file_format, metadata):
+        try:
+            self._queue.put_nowait((filename, block, file_format, metadata))
+        except queue.Full:
+            self.dropped += 1
+            return False
+        return True
+
+    def run(self):
+        while True:
+            filename, block, file_format, metadata = self._queue.get()
+            try:
+                recorder = AsyncRecorder(filename, file_format=file_format, metadata=metadata)
+                recorder.write_block(block)
+                recorder.close()
+            except Exception as e:
+                print(f"Event write error ({filename}): {e}")
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def event_writer():
+    """The process-wide EventWriter, started on first use"""
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = EventWriter()
+            _writer.start()
+    return _writer
+
+
+class TriggerEngine:
+    """Detects events in one device's stream and captures pre_seconds before to post_seconds after each
+
+    process() is called with every stored block (under the session lock):
+    detection runs on the displayed (possibly filtered) values, the captured
+    window holds the raw values, like recordings. While an event is being
+    captured, further triggers are part of it; detection re-arms afterwards.
+    filename(timestamp) names the file of an event; on_event(event) receives
+    a summary dict once its window is complete and queued for writing.
+    """
+
+    def __init__(self, conditions, filename, pre_seconds=DEFAULT_PRE_SECONDS, post_seconds=DEFAULT_POST_SECONDS,
+                 file_format='csv', device_id=None, on_event=None):
+        validate(conditions)
+        self.conditions = [tuple(condition) for condition in conditions]
+        self.filename = filename
+        self.pre_seconds = float(pre_seconds)
+        self.post_seconds = float(post_seconds)
+        self.file_format = file_format
+        self.device_id = device_id
+        self.on_event = on_event
+        self.events = 0
+        self._history = deque() # Raw blocks covering at least pre_seconds before the newest block
+        self._previous = None # Last displayed row, for slopes across batches
+        self._pending = None # Event being captured
+
+    def process(self, raw_block, block):
+        if len(block) == 0:
+            return
+        self._history.append(raw_block)
+        latest = float(raw_block[-1, 0])
+        # A trigger can be on the block's first sample, so keep pre_seconds before that, not before the latest
+        while len(self._history) > 1 and self._history[1][0, 0] <= raw_block[0, 0] - self.pre_seconds:
+            self._history.popleft()
+        if self._pending is not None:
+            self._pending['blocks'].append(raw_block)
+        else:
+            hit = first_trigger(self.conditions, block, self._previous)
+            if hit is not None:
+                index, condition, value = hit
+                trigger_time = float(block[index, 0])
+                self._pending = {
+                    'blocks': list(self._history),
+                    'trigger_time': trigger_time,
+                    'wall_time': time.time() - (latest - trigger_time),
+                    'condition': condition,
+                    'value': value,
+                }
+        self._previous = block[-1].copy()
+        if self._pending is not None and latest >= self._pending['trigger_time'] + self.post_seconds:
+            self._finish()
+
+    def flush(self, stale_only=False):
+        """Save the event being captured with what has arrived; with stale_only, only once the device went quiet"""
+        pending = self._pending
+        if pending is None:
+            return
+        if stale_only and time.time() < pending['wall_time'] + self.post_seconds + STALE_GRACE:
+            return
+        self._finish()
+
+    def _finish(self):
+        pending, self._pending = self._pending, None
+        data = np.concatenate(pending['blocks'])
+        trigger_time = pending['trigger_time']
+        times = data[:, 0]
+        data = data[(times >= trigger_time - self.pre_seconds) & (times <= trigger_time + self.post_seconds)]
+        timestamp = datetime.fromtimestamp(pending['wall_time']).strftime("%Y%m%d_%H%M%S_%f")[:-3]
+        filename = self.filename(timestamp)
+        condition = describe(pending['condition'])
+        metadata = {'device_id': self.device_id, 'trigger': condition, 'trigger_time': trigger_time,
+                    'trigger_value': pending['value'], 'pre_seconds': self.pre_seconds, 'post_seconds': self.post_seconds}
+        written = event_writer().submit(filename, data, self.file_format, metadata)
+        self.events += 1
+        if self.on_event is not None:
+            self.on_event({
+                'device_id': self.device_id, 'time': pending['wall_time'], 'condition': condition,
+                'value': pending['value'], 'samples': len(data), 'filename': filename if written else None,
+            })
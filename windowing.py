@@ -0,0 +1,122 @@
+from collections import deque
+
+import numpy as np
+
+from ring_buffer import RingBuffer, T
+
+
+class SlidingWindow:
+    """Time-sorted [time, x, y, z] buffer with incremental window bounds and extrema
+
+    Blocks that start at or after the newest buffered time are appended as is
+    (the usual case). A late block only re-sorts the tail of the buffer it
+    overlaps. Window bounds come from binary search on the sorted time column,
+    and the min/max over all three axes in the window is kept in two monotonic
+    deques, so each window() call costs O(new samples) amortized. A late block
+    only invalidates the deque entries of the rows it re-sorted.
+    """
+
+    def __init__(self, capacity):
+        self.buffer = RingBuffer(capacity)
+        self.out_of_order_blocks = 0 # Blocks that needed a tail re-sort
+        self._min = deque() # (seq, value) with increasing values
+        self._max = deque() # (seq, -value) with increasing negated values, so both deques share one code path
+        self._pushed = 0 # Rows before this sequence number are in the deques
+        self._left = 0 # Left edge of the last window; rows before it no longer matter
+
+    def __len__(self):
+        return len(self.buffer)
+
+    def clear(self):
+        self.buffer.clear()
+        self._reset_extrema(0)
+
+    def append_block(self, block):
+        """Insert a (k, 4) block, keeping the buffer sorted by time"""
+        block = np.asarray(block, dtype=np.float64)
+        if len(block) == 0:
+            return
+        times = block[:, T]
+        if np.any(times[1:] < times[:-1]):
+            block = block[np.argsort(times, kind='stable')]
+        if len(self.buffer) == 0 or block[0, T] >= self.buffer.last(1)[0, T]:
+            self.buffer.append_block(block)
+            return
+
+        # Out of order: merge the block with the part of the buffer it overlaps
+        self.out_of_order_blocks += 1
+        view = self.buffer.view()
+        pos = int(np.searchsorted(view[:, T], block[0, T], side='right'))
+        merged = np.concatenate((view[pos:], block))
+        merged = merged[np.argsort(merged[:, T], kind='stable')]
+        first_changed = self.buffer.total_written - (len(view) - pos)
+        self.buffer.discard_last(len(view) - pos)
+        self.buffer.append_block(merged)
+        self._repair_extrema(first_changed)
+
+    def window(self, t_start, t_end):
+        """(rows view, vmin, vmax) for t_start <= t <= t_end; vmin/vmax are None for an empty window"""
+        data = self.buffer.view()
+        times = data[:, T]
+        lo = int(np.searchsorted(times, t_start, side='left'))
+        hi = int(np.searchsorted(times, t_end, side='right'))
+        oldest = self._oldest_seq()
+        lo_seq, hi_seq = oldest + lo, oldest + hi
+
+        if hi_seq < self._pushed or lo_seq > self._pushed or lo_seq < self._left:
+            # The window moved backwards, widened to the left or jumped past unprocessed rows: start over from its left edge
+            self._reset_extrema(lo_seq)
+        if hi_seq > self._pushed:
+            self._push(data[self._pushed - oldest:hi], self._pushed)
+        while self._min and self._min[0][0] < lo_seq:
+            self._min.popleft()
+        while self._max and self._max[0][0] < lo_seq:
+            self._max.popleft()
+        self._left = lo_seq
+
+        if not self._min:
+            return data[lo:hi], None, None
+        return data[lo:hi], self._min[0][1], -self._max[0][1]
+
+    def _oldest_seq(self):
+        return self.buffer.total_written - len(self.buffer)
+
+    def _reset_extrema(self, seq):
+        self._min.clear()
+        self._max.clear()
+        self._pushed = seq
+        self._left = seq
+
+    def _repair_extrema(self, seq):
+        """Forget the rows from seq on (they were replaced) without rescanning the ones before it
+
+        An entry only ever leaves the back of a deque when a later row is
+        pushed. So once the entries at or after seq are dropped, the rows
+        before seq that the replaced rows had evicted all come after the last
+        remaining entry. Pushing again from there, usually a few rows, gives
+        the deques of the rows before seq; window() pushes the rest.
+        """
+        if self._pushed <= seq:
+            return # The replaced rows were never pushed
+        data = self.buffer.view()
+        oldest = self._oldest_seq()
+        for extrema, reduce, sign in ((self._min, np.fmin, 1), (self._max, np.fmax, -1)):
+            while extrema and extrema[-1][0] >= seq:
+                extrema.pop()
+            start = max(extrema[-1][0] + 1 if extrema else self._left, oldest)
+            if start < seq:
+                self._push_values(extrema, sign * reduce.reduce(data[start - oldest:seq - oldest, 1:], axis=1), start)
+        self._pushed = seq
+
+    def _push(self, rows, first_seq):
+        self._push_values(self._min, np.fmin.reduce(rows[:, 1:], axis=1), first_seq) # fmin/fmax skip NaN axes
+        self._push_values(self._max, -np.fmax.reduce(rows[:, 1:], axis=1), first_seq)
+        self._pushed = first_seq + len(rows)
+
+    @staticmethod
+    def _push_values(extrema, values, first_seq):
+        for seq, value in zip(range(first_seq, first_seq + len(values)), values.tolist()):
+            if value == value: # Not NaN
+                while extrema and extrema[-1][1] >= value:
+                    extrema.pop()
+                extrema.append((seq, value))